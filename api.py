@@ -1,15 +1,34 @@
 
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 import httpx 
-from typing import List
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from typing import AsyncIterator, List, Optional
 import os
 
+try:
+    import h2  # noqa: F401 -- HTTP/2 di httpx butuh paket ini
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
 
 
 OLLAMA_API_URL = os.getenv("OLLAMA_API_URL", "http://127.0.0.1:11434")
 OLLAMA_MODEL_ID = os.getenv("OLLAMA_MODEL_ID", "gemma3:latest") 
 STORY_SEPARATOR_TOKEN = "[SEPARATOR]" # Definisikan token separator
+OLLAMA_MAX_CONNECTIONS = int(os.getenv("OLLAMA_MAX_CONNECTIONS", "20"))
+OLLAMA_MAX_KEEPALIVE = int(os.getenv("OLLAMA_MAX_KEEPALIVE", "10"))
+OLLAMA_KEEPALIVE_EXPIRY = float(os.getenv("OLLAMA_KEEPALIVE_EXPIRY", "60"))
+OLLAMA_CONNECT_TIMEOUT = float(os.getenv("OLLAMA_CONNECT_TIMEOUT", "10"))
+OLLAMA_READ_TIMEOUT = float(os.getenv("OLLAMA_READ_TIMEOUT", "180"))
+OLLAMA_HTTP2 = os.getenv("OLLAMA_HTTP2", "1") == "1" # Hanya berlaku jika paket h2 terpasang
+STORY_CACHE_TTL = float(os.getenv("STORY_CACHE_TTL", "600")) # Detik; 0 = cache dimatikan
+STORY_CACHE_MAX_ENTRIES = int(os.getenv("STORY_CACHE_MAX_ENTRIES", "512"))
+STORY_PROMPT_VERSION = "1" # Naikkan setiap kali isi build_story_prompt diubah agar cache lama tidak terpakai
 
 app = FastAPI(
     title="Story Generator API",
@@ -25,10 +44,10 @@ class StoryGenerationResponse(BaseModel):
     model_used: str = Field(OLLAMA_MODEL_ID)
     segment_count: int # Jumlah segmen yang diharapkan (sama dengan jumlah caption)
 
-async def query_ollama_for_story(captions: List[str]) -> str:
+def build_story_prompt(captions: List[str]) -> str:
     num_captions = len(captions)
     if num_captions == 0: # Tambahkan pemeriksaan eksplisit
-        print("ERROR (Story API): query_ollama_for_story called with an empty captions list.")
+        print("ERROR (Story API): build_story_prompt called with an empty captions list.")
         raise HTTPException(status_code=400, detail="Cannot generate story from empty captions.")
 
     prompt_header = "You are a creative storyteller. Based on the following descriptions from a sequence of images, write a coherent and engaging short story that connects them all into a single narrative.\n\n"
@@ -59,6 +78,51 @@ async def query_ollama_for_story(captions: List[str]) -> str:
     else:
         full_prompt_content = prompt_header + joined_numbered_captions + "\n\nStory:"
 
+    return full_prompt_content
+
+
+# Client Ollama seumur aplikasi: koneksi keep-alive dipakai ulang lintas request.
+ollama_client: Optional[httpx.AsyncClient] = None
+ollama_stats = {"requests": 0, "errors": 0}
+
+
+async def _count_ollama_request(request: httpx.Request):
+    ollama_stats["requests"] += 1
+
+
+def get_ollama_client() -> httpx.AsyncClient:
+    global ollama_client
+    if ollama_client is None:
+        ollama_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=OLLAMA_MAX_CONNECTIONS,
+                max_keepalive_connections=OLLAMA_MAX_KEEPALIVE,
+                keepalive_expiry=OLLAMA_KEEPALIVE_EXPIRY),
+            timeout=httpx.Timeout(
+                connect=OLLAMA_CONNECT_TIMEOUT, read=OLLAMA_READ_TIMEOUT,
+                write=OLLAMA_CONNECT_TIMEOUT, pool=OLLAMA_CONNECT_TIMEOUT),
+            http2=OLLAMA_HTTP2 and HTTP2_AVAILABLE,
+            event_hooks={"request": [_count_ollama_request]},
+        )
+    return ollama_client
+
+
+@app.on_event("startup")
+async def start_ollama_client():
+    get_ollama_client()
+
+
+@app.on_event("shutdown")
+async def close_ollama_client():
+    global ollama_client
+    if ollama_client is not None:
+        await ollama_client.aclose()
+        ollama_client = None
+
+
+async def query_ollama_for_story(captions: List[str]) -> str:
+    full_prompt_content = build_story_prompt(captions)
+
     payload = {
         "model": OLLAMA_MODEL_ID,
         "prompt": full_prompt_content,
@@ -71,17 +135,21 @@ async def query_ollama_for_story(captions: List[str]) -> str:
     print(f"DEBUG (Story API): FINAL PROMPT being sent to Ollama at {target_ollama_url} with model {OLLAMA_MODEL_ID}:\n---------------- PROMPT START ----------------\n{full_prompt_content}\n---------------- PROMPT END ----------------")
 
     try:
-        async with httpx.AsyncClient(timeout=180.0) as client:
-            response = await client.post(target_ollama_url, json=payload)
-            # ... (sisa kode error handling dan parsing respons tetap sama) ...
-            response.raise_for_status()
-            response_data = response.json()
-            generated_text = response_data.get("response", "").strip()
-
-            if not generated_text:
-                print("Ollama returned an empty response.")
-                raise HTTPException(status_code=500, detail="Ollama returned an empty story.")
-            return generated_text
+        response = await get_ollama_client().post(target_ollama_url, json=payload)
+        # ... (sisa kode error handling dan parsing respons tetap sama) ...
+        response.raise_for_status()
+        response_data = response.json()
+        generated_text = response_data.get("response", "").strip()
+
+        if not generated_text:
+            print("Ollama returned an empty response.")
+            raise HTTPException(status_code=500, detail="Ollama returned an empty story.")
+        return generated_text
+
+    except httpx.RequestError as e:
+        ollama_stats["errors"] += 1
+        print(f"ERROR (Story API): Ollama request failed: {e}")
+        raise
 
     except httpx.HTTPStatusError as e:
         error_detail = f"Ollama API error: {e.response.status_code} - Response: {e.response.text[:500]}" # Tampilkan sebagian respons error
@@ -90,6 +158,240 @@ async def query_ollama_for_story(captions: List[str]) -> str:
              raise HTTPException(status_code=502, detail=f"Ollama service error: 404 Not Found. Check model '{OLLAMA_MODEL_ID}' or API path '{target_ollama_url}'. Ollama response: {e.response.text[:200]}")
         raise HTTPException(status_code=502, detail=f"Error from Ollama service: {e.response.status_code}")
 
+class StoryCache:
+    """Cache cerita hasil Ollama dengan TTL, batas jumlah entri (LRU) dan penggabungan request.
+
+    Kunci = (model, versi prompt, caption yang dinormalisasi). Request identik
+    yang datang saat generasi untuk kunci yang sama masih berjalan tidak
+    memanggil Ollama lagi, tetapi menunggu hasil panggilan yang sudah ada.
+    Kegagalan tidak disimpan sehingga request berikutnya mencoba ulang.
+    """
+
+    def __init__(self, ttl: float = STORY_CACHE_TTL, max_entries: int = STORY_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._inflight = {}
+        self._stats = {"hits": 0, "misses": 0, "coalesced": 0, "evictions": 0, "expired": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_entries > 0
+
+    @staticmethod
+    def normalize_captions(captions: List[str]) -> tuple:
+        # Urutan caption tetap bagian dari kunci: urutan gambar = urutan cerita.
+        return tuple(" ".join(caption.split()).lower() for caption in captions)
+
+    def make_key(self, captions: List[str]) -> tuple:
+        return (OLLAMA_MODEL_ID, STORY_PROMPT_VERSION, self.normalize_captions(captions))
+
+    def get(self, key) -> Optional[str]:
+        """Mengembalikan cerita yang masih berlaku untuk `key` tanpa menghitung hit/miss."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        story, expires_at = entry
+        if time.monotonic() >= expires_at:
+            del self._entries[key]
+            self._stats["expired"] += 1
+            return None
+        self._entries.move_to_end(key)
+        return story
+
+    def lookup(self, key) -> Optional[str]:
+        """Seperti get(), tetapi dihitung sebagai hit/miss (dipakai jalur streaming)."""
+        story = self.get(key) if self.enabled else None
+        self._stats["hits" if story is not None else "misses"] += 1
+        return story
+
+    def put(self, key, story: str):
+        if not self.enabled:
+            return
+        self._entries[key] = (story, time.monotonic() + self.ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    async def get_or_generate(self, captions: List[str], generate_fn) -> str:
+        """Cerita dari cache, dari panggilan yang sedang berjalan, atau dari `generate_fn(captions)`."""
+        if not self.enabled:
+            self._stats["misses"] += 1
+            return await generate_fn(captions)
+        key = self.make_key(captions)
+        story = self.get(key)
+        if story is not None:
+            self._stats["hits"] += 1
+            return story
+        task = self._inflight.get(key)
+        if task is not None:
+            self._stats["coalesced"] += 1
+        else:
+            self._stats["misses"] += 1
+            task = asyncio.ensure_future(generate_fn(captions))
+            self._inflight[key] = task
+            task.add_done_callback(lambda done, key=key: self._on_generated(key, done))
+        # shield: request yang dibatalkan (klien putus) tidak membatalkan generasi milik penunggu lain.
+        return await asyncio.shield(task)
+
+    def _on_generated(self, key, task):
+        self._inflight.pop(key, None)
+        if not task.cancelled() and task.exception() is None:
+            self.put(key, task.result())
+
+    def stats(self) -> dict:
+        lookups = self._stats["hits"] + self._stats["misses"] + self._stats["coalesced"]
+        return dict(self._stats,
+                    entries=len(self._entries),
+                    inflight=len(self._inflight),
+                    max_entries=self.max_entries,
+                    ttl_s=self.ttl,
+                    prompt_version=STORY_PROMPT_VERSION,
+                    hit_ratio=(self._stats["hits"] + self._stats["coalesced"]) / lookups if lookups else 0.0)
+
+
+story_cache = StoryCache()
+
+
+class StorySegmenter:
+    """Memecah aliran token Ollama menjadi segmen cerita di setiap STORY_SEPARATOR_TOKEN.
+
+    feed() mengembalikan event ('token', ...) untuk teks yang sudah pasti
+    bukan bagian separator dan ('segment', ...) begitu separator lengkap
+    terlihat. Akhiran yang mungkin merupakan awal separator (mis. "[SEP")
+    ditahan sampai token berikutnya datang.
+    """
+
+    def __init__(self, separator: str = STORY_SEPARATOR_TOKEN):
+        self.separator = separator
+        self.text = ""
+        self.segments: List[str] = []
+        self._current = ""
+        self._pending = ""
+
+    def _token_event(self, text):
+        self._current += text
+        return ("token", {"segment": len(self.segments), "text": text})
+
+    def _close_segment(self):
+        segment = self._current.strip()
+        event = ("segment", {"index": len(self.segments), "text": segment})
+        self.segments.append(segment)
+        self._current = ""
+        return event
+
+    def feed(self, text: str):
+        self.text += text
+        self._pending += text
+        events = []
+        while self.separator in self._pending:
+            before, self._pending = self._pending.split(self.separator, 1)
+            if before:
+                events.append(self._token_event(before))
+            events.append(self._close_segment())
+        hold = 0
+        for size in range(min(len(self.separator) - 1, len(self._pending)), 0, -1):
+            if self._pending.endswith(self.separator[:size]):
+                hold = size
+                break
+        ready = self._pending[:len(self._pending) - hold]
+        self._pending = self._pending[len(self._pending) - hold:]
+        if ready:
+            events.append(self._token_event(ready))
+        return events
+
+    def finish(self):
+        events = []
+        if self._pending:
+            events.append(self._token_event(self._pending))
+            self._pending = ""
+        if self._current.strip():
+            events.append(self._close_segment())
+        return events
+
+
+def format_sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def stream_ollama_story(captions: List[str]) -> AsyncIterator[str]:
+    """Meneruskan token Ollama ("stream": True) sebagai Server-Sent Events.
+
+    Event: `token` (potongan teks + indeks segmen), `segment` (segmen selesai,
+    dikirim begitu [SEPARATOR] muncul), lalu `done` berisi cerita lengkap,
+    atau `error` jika Ollama gagal di tengah jalan. Cerita yang sudah ada di
+    story_cache diputar ulang langsung tanpa memanggil Ollama.
+    """
+    cache_key = story_cache.make_key(captions)
+    cached_story = story_cache.lookup(cache_key)
+    if cached_story is not None:
+        segmenter = StorySegmenter()
+        for event, data in segmenter.feed(cached_story) + segmenter.finish():
+            yield format_sse(event, data)
+        yield format_sse("done", {
+            "story": cached_story,
+            "model_used": OLLAMA_MODEL_ID,
+            "segment_count": len(captions),
+            "segments_emitted": len(segmenter.segments),
+            "cached": True,
+        })
+        return
+
+    payload = {
+        "model": OLLAMA_MODEL_ID,
+        "prompt": build_story_prompt(captions),
+        "stream": True,
+    }
+    target_ollama_url = f"{OLLAMA_API_URL}/api/generate"
+    segmenter = StorySegmenter()
+    try:
+        async with get_ollama_client().stream("POST", target_ollama_url, json=payload) as response:
+            if response.status_code != 200:
+                error_text = (await response.aread()).decode("utf-8", "replace")[:500]
+                print(f"ERROR (Story API): Ollama stream error {response.status_code}: {error_text}")
+                yield format_sse("error", {"detail": f"Error from Ollama service: {response.status_code}"})
+                return
+            async for line in response.aiter_lines():
+                if not line.strip():
+                    continue
+                try:
+                    chunk = json.loads(line)
+                    if not isinstance(chunk, dict):
+                        raise ValueError("NDJSON line is not an object")
+                except ValueError:
+                    # Baris NDJSON rusak/terpotong: hentikan stream dengan event error agar UI tidak menggantung.
+                    print(f"ERROR (Story API): Invalid NDJSON line from Ollama: {line[:200]!r}")
+                    yield format_sse("error", {"detail": "Invalid response from Ollama service."})
+                    return
+                if chunk.get("error"):
+                    yield format_sse("error", {"detail": f"Ollama error: {chunk['error']}"})
+                    return
+                for event, data in segmenter.feed(chunk.get("response", "")):
+                    yield format_sse(event, data)
+                if chunk.get("done"):
+                    break
+    except httpx.RequestError as e:
+        ollama_stats["errors"] += 1
+        print(f"ERROR (Story API): Ollama stream request failed: {e}")
+        yield format_sse("error", {"detail": "Ollama service is unavailable."})
+        return
+
+    for event, data in segmenter.finish():
+        yield format_sse(event, data)
+    story = segmenter.text.strip()
+    if not story:
+        yield format_sse("error", {"detail": "Ollama returned an empty story."})
+        return
+    story_cache.put(cache_key, story)
+    yield format_sse("done", {
+        "story": story,
+        "model_used": OLLAMA_MODEL_ID,
+        "segment_count": len(captions),
+        "segments_emitted": len(segmenter.segments),
+    })
+
+
 @app.post("/generate-story/", response_model=StoryGenerationResponse)
 async def generate_story_endpoint(request: StoryGenerationRequest):
     if not request.captions:
@@ -99,13 +401,37 @@ async def generate_story_endpoint(request: StoryGenerationRequest):
     print(f"DEBUG (Story API): Received {num_captions} captions for story generation.")
 
     try:
-        story_text = await query_ollama_for_story(request.captions)
+        story_text = await story_cache.get_or_generate(request.captions, query_ollama_for_story)
         return StoryGenerationResponse(story=story_text, model_used=OLLAMA_MODEL_ID, segment_count=num_captions)
     except HTTPException as e:
         raise e
     except Exception as e:
         raise HTTPException(status_code=500, detail="Failed to generate story due to an internal server error.")
 
+@app.post("/generate-story/stream/")
+async def generate_story_stream_endpoint(request: StoryGenerationRequest):
+    """Versi streaming /generate-story/: text/event-stream dengan event token/segment/done/error."""
+    if not request.captions:
+        raise HTTPException(status_code=400, detail="No captions provided.")
+    print(f"DEBUG (Story API): Streaming story for {len(request.captions)} captions.")
+    return StreamingResponse(
+        stream_ollama_story(request.captions),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.get("/stats/")
+async def read_stats():
+    return {
+        "story_cache": story_cache.stats(),
+        "ollama_pool": dict(
+            ollama_stats,
+            http2_enabled=OLLAMA_HTTP2 and HTTP2_AVAILABLE,
+            max_connections=OLLAMA_MAX_CONNECTIONS,
+            max_keepalive_connections=OLLAMA_MAX_KEEPALIVE,
+        ),
+    }
+
 @app.get("/")
 async def root():
     return {"message": "Story Generator API with segment support is running."}
\ No newline at end of file
@@ -4,6 +4,7 @@ import base64
 import os
 import numpy as np
 from PIL import Image
+from werkzeug.exceptions import RequestEntityTooLarge
 import io
 
 # You'll need to import your model implementations here
@@ -11,7 +12,12 @@ import io
 # from models.rnn_attention import RNNAttentionModel
 # from models.vision_transformer import VisionTransformerModel
 
+MAX_IMAGE_BYTES = int(os.getenv("IMAGE_MAX_BYTES", str(25 * 1024 * 1024)))
+MAX_IMAGE_PIXELS = int(os.getenv("IMAGE_MAX_PIXELS", "64000000")) # 48 MP phone photos still pass
+
 app = Flask(__name__)
+# The JSON body carries base64 (4/3 of the image size); Werkzeug rejects larger bodies with 413 before reading them
+app.config['MAX_CONTENT_LENGTH'] = MAX_IMAGE_BYTES * 4 // 3 + 64 * 1024
 CORS(app)
 
 # Placeholder for actual model loading
@@ -73,9 +79,20 @@ def generate_caption():
             image_bytes = base64.b64decode(image_data)
             print(f"Decoded image bytes length: {len(image_bytes)}")
             
-            # Open as an image to validate it
+            if len(image_bytes) > MAX_IMAGE_BYTES:
+                return jsonify({
+                    "message": "Image too large",
+                    "error": f"Image exceeds {MAX_IMAGE_BYTES} bytes"
+                }), 413
+
+            # Open as an image to validate it (PIL only parses the header here, pixels are not decoded)
             image = Image.open(io.BytesIO(image_bytes))
             width, height = image.size
+            if width * height > MAX_IMAGE_PIXELS:
+                return jsonify({
+                    "message": "Image too large",
+                    "error": f"Image dimensions {width}x{height} exceed {MAX_IMAGE_PIXELS} pixels"
+                }), 413
             print(f"Image opened successfully. Size: {width}x{height}, Format: {image.format}")
             
             # For demonstration, we'll return a placeholder caption
@@ -100,6 +117,8 @@ def generate_caption():
                 "error": str(e)
             }), 400
         
+    except RequestEntityTooLarge:
+        raise
     except Exception as e:
         print(f"Server error: {str(e)}")
         return jsonify({
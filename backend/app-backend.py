@@ -1,20 +1,59 @@
-from fastapi import FastAPI, File, UploadFile, Form, HTTPException
+from fastapi import FastAPI, File, UploadFile, Form, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
 import uvicorn
 import shutil
 import os
 import tempfile
 import httpx
+import asyncio
+import time
 from typing import List 
 from pydantic import BaseModel, Field 
 
 
-from caption_generator import load_model_assets, generate_caption_simple
-from instagram_uploader import login_instagram, upload_image_to_instagram
+from caption_generator import load_model_assets, caption_requests_batch, warm_up_models, decode_image_for_inception
+from attention_heatmap import ATTENTION_FORMATS, render_attention
+from caption_cache import CaptionCache, files_fingerprint, image_cache_key
+from image_ingest import MAX_IMAGE_BYTES, ImageDecodeError, ImageTooLargeError, check_payload_size, open_image
+from http_clients import PooledHttpClient
+from request_limits import BodySizeLimitMiddleware
+from instagram_uploader import SESSION_FILE, InstagramClientPool
+from micro_batcher import MicroBatcher, QueueFullError
+from inference_bundle import (
+    BUNDLE_MANIFEST_FILE, BUNDLE_WEIGHTS_FILE, MODEL_ASSET_FILES, bundle_is_current, export_inference_bundle,
+    load_inference_bundle
+)
+from serving_pool import ProcessInferencePool
 
 
-STORY_GENERATOR_API_URL = "https://u1029-story.gpu3.petra.ac.id/generate-story/"
+STORY_GENERATOR_API_URL = os.getenv("STORY_GENERATOR_API_URL", "https://u1029-story.gpu3.petra.ac.id/generate-story/")
+STORY_GENERATOR_STREAM_URL = os.getenv("STORY_GENERATOR_STREAM_URL", "https://u1029-story.gpu3.petra.ac.id/generate-story/stream/")
 STORY_SEPARATOR_TOKEN = "[SEPARATOR]"
+STORY_API_MAX_CONNECTIONS = int(os.getenv("STORY_API_MAX_CONNECTIONS", "20"))
+STORY_API_MAX_KEEPALIVE = int(os.getenv("STORY_API_MAX_KEEPALIVE", "10"))
+STORY_API_KEEPALIVE_EXPIRY = float(os.getenv("STORY_API_KEEPALIVE_EXPIRY", "60"))
+STORY_API_CONNECT_TIMEOUT = float(os.getenv("STORY_API_CONNECT_TIMEOUT", "10"))
+STORY_API_READ_TIMEOUT = float(os.getenv("STORY_API_READ_TIMEOUT", "180"))
+STORY_API_HTTP2 = os.getenv("STORY_API_HTTP2", "1") == "1" # Aktif jika paket h2 terpasang
+CAPTION_BATCH_MAX_SIZE = int(os.getenv("CAPTION_BATCH_MAX_SIZE", "8"))
+CAPTION_BATCH_MAX_WAIT_MS = float(os.getenv("CAPTION_BATCH_MAX_WAIT_MS", "10"))
+CAPTION_INFERENCE_WORKERS = int(os.getenv("CAPTION_INFERENCE_WORKERS", "1"))
+CAPTION_QUEUE_MAX_SIZE = int(os.getenv("CAPTION_QUEUE_MAX_SIZE", "64"))
+CAPTION_INFERENCE_MODE = os.getenv("CAPTION_INFERENCE_MODE", "graph") # "eager", "graph" atau "numpy" (encoder/decoder lewat numpy_decoder)
+CAPTION_PRECISION = os.getenv("CAPTION_PRECISION", "float32") # "float32", "float16" atau "int8" (InceptionV3 via TFLite)
+CAPTION_NUMPY_STATEFUL_GRU = os.getenv("CAPTION_NUMPY_STATEFUL_GRU", "0") == "1" # Mode numpy: sel GRU meneruskan hidden state (lihat numpy_decoder)
+CAPTION_MAX_BEAM_WIDTH = int(os.getenv("CAPTION_MAX_BEAM_WIDTH", "10"))
+CAPTION_SET_MAX_IMAGES = int(os.getenv("CAPTION_SET_MAX_IMAGES", "10")) # Batas gambar per request /generate-captions-batch/
+UPLOAD_FORM_OVERHEAD_BYTES = int(os.getenv("UPLOAD_FORM_OVERHEAD_BYTES", str(64 * 1024))) # Header multipart + field form selain gambar
+CAPTION_CACHE_MAX_MB = float(os.getenv("CAPTION_CACHE_MAX_MB", "256"))
+CAPTION_CACHE_DIR = os.getenv("CAPTION_CACHE_DIR") # Kosong = tanpa tier disk
+CAPTION_SERVING_MODE = os.getenv("CAPTION_SERVING_MODE", "thread") # "thread" atau "process"
+CAPTION_PROCESS_WORKERS = int(os.getenv("CAPTION_PROCESS_WORKERS", "2"))
+CAPTION_BUNDLE_DIR = os.getenv("CAPTION_BUNDLE_DIR") # Kosong = muat dari MODEL_DIR
+CAPTION_LOAD_RETRY_DELAY = float(os.getenv("CAPTION_LOAD_RETRY_DELAY", "5"))
+CAPTION_LOAD_RETRY_MAX_DELAY = float(os.getenv("CAPTION_LOAD_RETRY_MAX_DELAY", "300"))
+INSTAGRAM_SESSION_FILE = os.getenv("INSTAGRAM_SESSION_FILE", SESSION_FILE) # Settings sesi per akun Instagram; simpan di luar git
 
 class StoryFromLocalApiResponse(BaseModel):
     story: str
@@ -40,6 +79,16 @@ origins = [
     "http://localhost:3000",
 
 ]
+# Upload kebesaran ditolak dari Content-Length / stream body, sebelum
+# Starlette mem-parse multipart dan menyimpannya ke file sementara.
+app.add_middleware(
+    BodySizeLimitMiddleware,
+    limits={
+        "/generate-caption/": MAX_IMAGE_BYTES + UPLOAD_FORM_OVERHEAD_BYTES,
+        "/generate-captions-batch/": CAPTION_SET_MAX_IMAGES * (MAX_IMAGE_BYTES + UPLOAD_FORM_OVERHEAD_BYTES),
+        "/post-to-instagram/": MAX_IMAGE_BYTES + UPLOAD_FORM_OVERHEAD_BYTES,
+    },
+)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
@@ -53,49 +102,372 @@ MODEL_DIR = "image_captioning_model_assets"
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 MODEL_PATH_ABS = os.path.join(BASE_DIR, MODEL_DIR)
 
-try:
-    print(f"Mencoba memuat model caption dari: {MODEL_PATH_ABS}")
-    encoder, decoder, tokenizer, inception_model, config = load_model_assets(MODEL_PATH_ABS)
-    print("Model caption berhasil dimuat saat startup.")
-    models_loaded = True
-except Exception as e:
-    print(f"GAGAL memuat model caption saat startup: {e}")
-    encoder, decoder, tokenizer, inception_model, config = [None] * 5
-    models_loaded = False
+SERVING_BUNDLE_DIR = CAPTION_BUNDLE_DIR or os.path.join(BASE_DIR, "caption_bundle")
+
+process_pool = None
+encoder, decoder, tokenizer, inception_model, config = [None] * 5
+models_loaded = False
+startup_timings = {}
+model_load_state = {"status": "loading", "attempts": 0, "last_error": None}
+model_loader_task = None
+
+
+def _load_caption_models():
+    """Memuat (atau menyiapkan worker) model caption lalu menjalankan warm-up.
+
+    Dipanggil di thread latar belakang oleh _model_loader; variabel global
+    model baru diisi setelah warm-up selesai sehingga request tidak pernah
+    melihat model setengah jadi.
+    """
+    global encoder, decoder, tokenizer, inception_model, config, process_pool
+    timings = {}
+    if CAPTION_SERVING_MODE == "process":
+        # Worker memuat model dari bundle inferensi; jika belum ada bundle (atau
+        # formatnya lama / aset model lebih baru), supervisor memuat aset sekali
+        # untuk mengekspornya.
+        if not CAPTION_BUNDLE_DIR and bundle_is_current(SERVING_BUNDLE_DIR, MODEL_PATH_ABS):
+            print(f"Bundle inferensi {SERVING_BUNDLE_DIR} masih sesuai aset model; ekspor dilewati.")
+        elif not CAPTION_BUNDLE_DIR:
+            print(f"Mencoba memuat model caption dari: {MODEL_PATH_ABS}")
+            enc, dec, tok, inception, cfg = load_model_assets(MODEL_PATH_ABS, inference_mode="eager", timings=timings)
+            export_inference_bundle(SERVING_BUNDLE_DIR, inception, enc, dec, tok, cfg)
+            del enc, dec, inception
+        pool = ProcessInferencePool(
+            SERVING_BUNDLE_DIR, num_workers=CAPTION_PROCESS_WORKERS, inference_mode=CAPTION_INFERENCE_MODE,
+            precision=CAPTION_PRECISION, stateful_gru=CAPTION_NUMPY_STATEFUL_GRU
+        )
+        started = time.perf_counter()
+        try:
+            pool.start() # Setiap worker menjalankan warm-up sendiri sebelum melapor siap.
+        except Exception:
+            pool.close()
+            raise
+        timings["workers_ready"] = round(time.perf_counter() - started, 4)
+        process_pool = pool
+    else:
+        if CAPTION_BUNDLE_DIR:
+            print(f"Mencoba memuat bundle inferensi dari: {CAPTION_BUNDLE_DIR}")
+            assets = load_inference_bundle(CAPTION_BUNDLE_DIR, inference_mode=CAPTION_INFERENCE_MODE, timings=timings, precision=CAPTION_PRECISION, stateful_gru=CAPTION_NUMPY_STATEFUL_GRU)
+        else:
+            print(f"Mencoba memuat model caption dari: {MODEL_PATH_ABS}")
+            assets = load_model_assets(MODEL_PATH_ABS, inference_mode=CAPTION_INFERENCE_MODE, timings=timings, precision=CAPTION_PRECISION, stateful_gru=CAPTION_NUMPY_STATEFUL_GRU)
+        enc, dec, tok, inception, cfg = assets
+        timings["warmup"] = round(warm_up_models(inception, enc, dec, tok, cfg), 4)
+        encoder, decoder, tokenizer, inception_model, config = assets
+    return timings
+
+
+async def _model_loader():
+    """Memuat model di latar belakang; jika gagal, diulang dengan backoff eksponensial."""
+    global models_loaded
+    delay = CAPTION_LOAD_RETRY_DELAY
+    while True:
+        model_load_state["attempts"] += 1
+        model_load_state["status"] = "loading"
+        try:
+            timings = await asyncio.to_thread(_load_caption_models)
+        except Exception as e:
+            model_load_state["status"] = "failed"
+            model_load_state["last_error"] = f"{type(e).__name__}: {e}"
+            print(f"GAGAL memuat model caption (percobaan {model_load_state['attempts']}): {e}; "
+                  f"mencoba lagi dalam {delay:.0f} detik.")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, CAPTION_LOAD_RETRY_MAX_DELAY)
+            continue
+        startup_timings.update(timings)
+        model_load_state["status"] = "ready"
+        model_load_state["last_error"] = None
+        models_loaded = True
+        print(f"Model caption berhasil dimuat dan di-warm-up: {startup_timings}")
+        return
+
+
+def _model_fingerprint():
+    """Sidik jari file model yang dilayani: bundle CAPTION_BUNDLE_DIR, atau aset MODEL_DIR
+    (bundle mode process diekspor dari aset tersebut)."""
+    if CAPTION_BUNDLE_DIR:
+        paths = [os.path.join(CAPTION_BUNDLE_DIR, name) for name in (BUNDLE_MANIFEST_FILE, BUNDLE_WEIGHTS_FILE)]
+    else:
+        paths = [os.path.join(MODEL_PATH_ABS, name) for name in MODEL_ASSET_FILES]
+    return files_fingerprint(paths)
+
+
+# Caption bergantung pada bobot model, precision InceptionV3 (TFLite berbeda
+# sedikit dari float32), mode inferensi dan varian sel GRU NumPy; cache
+# (termasuk tier disk yang bertahan antar restart) dipisah per kombinasi.
+CAPTION_CACHE_NAMESPACE = ":".join([
+    CAPTION_PRECISION,
+    CAPTION_INFERENCE_MODE + ("-stateful_gru" if CAPTION_INFERENCE_MODE == "numpy" and CAPTION_NUMPY_STATEFUL_GRU else ""),
+    _model_fingerprint(),
+])
+caption_cache = CaptionCache(
+    max_bytes=int(CAPTION_CACHE_MAX_MB * 1024 * 1024),
+    disk_dir=CAPTION_CACHE_DIR or None,
+)
+
+
+def _caption_batch(requests):
+    """Menjalankan satu batch request caption.
+
+    Setiap request berisi cache_key, image (byte gambar atau piksel hasil
+    decode_image_for_inception; None jika fitur sudah ada), features (None
+    jika belum ada di cache), beam_width, length_penalty dan opsional attention. Batch dikerjakan di proses
+    ini atau, pada mode "process", oleh salah satu worker ProcessInferencePool.
+    Fitur dan caption baru disimpan ke cache; hasil sesuai urutan request,
+    berupa caption atau (caption, bobot attention) untuk request dengan attention.
+    """
+    payload = [{
+        "image": req["image"],
+        "features": req["features"],
+        "beam_width": req["beam_width"],
+        "length_penalty": req["length_penalty"],
+        "attention": req.get("attention", False),
+    } for req in requests]
+    if process_pool is not None:
+        outputs = process_pool.run(payload)
+    else:
+        outputs = caption_requests_batch(payload, inception_model, encoder, decoder, tokenizer, config)
+
+    for req, (features, caption, _) in zip(requests, outputs):
+        if req["features"] is None:
+            caption_cache.put_features(req["cache_key"], features)
+        caption_cache.put_caption(req["cache_key"], caption,
+                                  beam_width=req["beam_width"], length_penalty=req["length_penalty"])
+    return [caption if attention is None else (caption, attention) for _, caption, attention in outputs]
+
+
+caption_batcher = MicroBatcher(
+    _caption_batch,
+    max_batch_size=CAPTION_BATCH_MAX_SIZE,
+    max_wait_ms=CAPTION_BATCH_MAX_WAIT_MS,
+    num_workers=CAPTION_PROCESS_WORKERS if CAPTION_SERVING_MODE == "process" else CAPTION_INFERENCE_WORKERS,
+    max_queue_size=CAPTION_QUEUE_MAX_SIZE,
+)
+
+
+# Client instagrapi per akun dipakai ulang antar request; login penuh hanya jika sesinya tidak ada/ditolak.
+instagram_pool = InstagramClientPool(session_file=INSTAGRAM_SESSION_FILE)
+
+
+# Satu client untuk semua request ke Story Generator API (koneksi TLS dipakai ulang).
+story_api_http = PooledHttpClient(
+    "story_api",
+    max_connections=STORY_API_MAX_CONNECTIONS,
+    max_keepalive_connections=STORY_API_MAX_KEEPALIVE,
+    keepalive_expiry=STORY_API_KEEPALIVE_EXPIRY,
+    connect_timeout=STORY_API_CONNECT_TIMEOUT,
+    read_timeout=STORY_API_READ_TIMEOUT,
+    http2=STORY_API_HTTP2,
+)
+
+
+@app.on_event("startup")
+async def start_story_api_client():
+    story_api_http.get()
+
+
+@app.on_event("startup")
+async def start_model_loader():
+    # Server langsung menerima koneksi (/healthz); model dimuat di latar belakang.
+    global model_loader_task
+    model_loader_task = asyncio.create_task(_model_loader())
+
+
+@app.on_event("shutdown")
+async def shutdown_caption_batcher():
+    if model_loader_task is not None and not model_loader_task.done():
+        model_loader_task.cancel()
+    await caption_batcher.close()
+    await story_api_http.aclose()
+    if process_pool is not None:
+        await asyncio.to_thread(process_pool.close)
 
 
 @app.get("/")
 async def read_root():
     return {"message": "Selamat datang di API Image Captioning, Instagram & Story!"}
 
+@app.get("/healthz")
+async def healthz():
+    """Liveness: proses hidup dan event loop merespons, apa pun status modelnya."""
+    return {"status": "ok"}
+
+@app.get("/readyz")
+async def readyz():
+    """Readiness: 200 hanya jika model sudah dimuat dan di-warm-up."""
+    ready = models_loaded and (process_pool is None or process_pool.stats()["workers_ready"] > 0)
+    body = dict(model_load_state, ready=ready)
+    if not ready:
+        return JSONResponse(status_code=503, content=body)
+    return body
+
+@app.get("/stats/")
+async def read_stats():
+    return {
+        "caption_cache": caption_cache.stats(),
+        "caption_cache_namespace": CAPTION_CACHE_NAMESPACE,
+        "caption_queue": caption_batcher.stats(),
+        "process_pool": process_pool.stats() if process_pool is not None else None,
+        "startup_timings": startup_timings,
+        "model_load": model_load_state,
+        "story_api_pool": story_api_http.stats(),
+        "instagram_pool": instagram_pool.stats(),
+    }
+
+async def read_image_upload(upload):
+    """Membaca upload paling banyak MAX_IMAGE_BYTES dan memeriksa dimensi dari header.
+
+    Body request sudah dibatasi BodySizeLimitMiddleware sebelum parsing
+    multipart; di sini batas diperiksa per gambar, dan gambar yang terlalu
+    besar ditolak dengan ImageTooLargeError sebelum masuk cache maupun
+    antrean inferensi.
+    """
+    image_bytes = await upload.read(MAX_IMAGE_BYTES + 1)
+    check_payload_size(len(image_bytes))
+    open_image(image_bytes).close()
+    return image_bytes
+
 @app.post("/generate-caption/")
-async def api_generate_caption(image: UploadFile = File(...)):
+async def api_generate_caption(
+    image: UploadFile = File(...),
+    beam_width: int = Query(1, ge=1, le=CAPTION_MAX_BEAM_WIDTH, description="1 = greedy decoding"),
+    length_penalty: float = Query(0.6, ge=0.0, le=5.0, description="Alpha normalisasi panjang untuk beam search"),
+    attention: bool = Query(False, description="Sertakan heatmap attention per kata caption"),
+    attention_format: str = Query("png", description="'png' (sprite heatmap) atau 'float16' (grid 8x8 mentah)"),
+    attention_tile: int = Query(224, ge=64, le=512, description="Sisi terpanjang tiap tile sprite PNG")
+):
+    """Caption untuk satu gambar; dengan `attention=true` heatmap per kata ikut dikembalikan.
+
+    Format 'png' berisi satu sprite PNG (base64) dengan satu tile per kata,
+    berurutan baris demi baris sebanyak `columns` per baris; 'float16' berisi
+    bobot attention mentah (jumlah kata, 8, 8) sebagai byte float16 little-endian.
+    """
     if not models_loaded:
-        raise HTTPException(status_code=503, detail="Model caption tidak berhasil dimuat, layanan tidak tersedia.")
-    temp_image_path = None 
+        raise HTTPException(status_code=503, detail="Model caption belum siap, coba lagi nanti.",
+                            headers={"Retry-After": str(int(CAPTION_LOAD_RETRY_DELAY))})
+    if attention and attention_format not in ATTENTION_FORMATS:
+        raise HTTPException(status_code=400, detail=f"attention_format harus salah satu dari {ATTENTION_FORMATS}.")
     try:
-        temp_upload_dir = os.path.join(BASE_DIR, "temp_uploads")
-        os.makedirs(temp_upload_dir, exist_ok=True)
-        with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(image.filename)[1], dir=temp_upload_dir) as tmp_file:
-            shutil.copyfileobj(image.file, tmp_file)
-            temp_image_path = tmp_file.name
-        print(f"Gambar (caption) disimpan sementara di: {temp_image_path}")
-        caption = generate_caption_simple(
-            temp_image_path, encoder, decoder, tokenizer, inception_model, config
-        )
-        return {"filename": image.filename, "caption": caption}
+        image_bytes = await read_image_upload(image)
+        cache_key = image_cache_key(image_bytes, namespace=CAPTION_CACHE_NAMESPACE)
+        # Cache caption tidak menyimpan attention; request attention tetap lewat decoder (fitur tetap dari cache).
+        caption = None if attention else caption_cache.get_caption(
+            cache_key, beam_width=beam_width, length_penalty=length_penalty)
+        if caption is not None:
+            return {"filename": image.filename, "caption": caption}
+
+        features = caption_cache.get_features(cache_key)
+        # Decode di sini, bukan di worker: upload rusak cukup gagal sendiri (400) tanpa menggagalkan batch bersama.
+        pixels = await asyncio.to_thread(decode_image_for_inception, image_bytes) if features is None else None
+        output = await caption_batcher.submit({
+            "cache_key": cache_key,
+            "image": pixels,
+            "features": features,
+            "beam_width": beam_width,
+            "length_penalty": length_penalty,
+            "attention": attention,
+        })
+        if not attention:
+            return {"filename": image.filename, "caption": output}
+        caption, attention_plot = output
+        rendered = await asyncio.to_thread(render_attention, image_bytes, caption.split(), attention_plot,
+                                           attention_format, attention_tile)
+        return {"filename": image.filename, "caption": caption, "attention": rendered}
+    except ImageTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ImageDecodeError as e:
+        raise HTTPException(status_code=400, detail=f"Gambar tidak dapat dibaca: {e}")
+    except QueueFullError as e:
+        print(f"Antrean caption penuh, request ditolak: {e}")
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
     except Exception as e:
         print(f"Error saat generate caption: {e}")
         raise HTTPException(status_code=500, detail=f"Gagal menghasilkan caption: {str(e)}")
     finally:
         if image and hasattr(image, 'file') and not image.file.closed:
             image.file.close()
-        if temp_image_path and os.path.exists(temp_image_path):
-            try:
-                os.remove(temp_image_path)
-                print(f"File temporer (caption) {temp_image_path} dihapus.")
-            except Exception as e_del:
-                print(f"Gagal menghapus file temporer (caption) {temp_image_path}: {e_del}")
+
+@app.post("/generate-captions-batch/")
+async def api_generate_captions_batch(
+    images: List[UploadFile] = File(...),
+    beam_width: int = Query(1, ge=1, le=CAPTION_MAX_BEAM_WIDTH, description="1 = greedy decoding"),
+    length_penalty: float = Query(0.6, ge=0.0, le=5.0, description="Alpha normalisasi panjang untuk beam search"),
+    with_story: bool = Query(False, description="Langsung lanjut membuat cerita dari caption yang berhasil")
+):
+    """Caption untuk satu set gambar (multipart, field `images` berulang) dalam satu request.
+
+    Upload dibaca dan di-decode paralel, lalu semua gambar yang belum ada di
+    cache masuk antrean inferensi bersamaan sehingga diproses sebagai satu
+    batch. Gambar yang gagal hanya mengisi `error` miliknya sendiri. Dengan
+    `with_story=true` cerita dari caption yang berhasil ikut dikembalikan.
+    """
+    if not models_loaded:
+        raise HTTPException(status_code=503, detail="Model caption belum siap, coba lagi nanti.",
+                            headers={"Retry-After": str(int(CAPTION_LOAD_RETRY_DELAY))})
+    if len(images) > CAPTION_SET_MAX_IMAGES:
+        raise HTTPException(status_code=400, detail=f"Maksimal {CAPTION_SET_MAX_IMAGES} gambar per request.")
+    try:
+        images_bytes = await asyncio.gather(*[read_image_upload(image) for image in images],
+                                            return_exceptions=True)
+    finally:
+        for image in images:
+            if hasattr(image, 'file') and not image.file.closed:
+                image.file.close()
+
+    results = [{"filename": image.filename, "caption": None, "error": None} for image in images]
+    pending = []
+    for idx, image_bytes in enumerate(images_bytes):
+        if isinstance(image_bytes, Exception):
+            results[idx]["error"] = f"Gambar ditolak: {image_bytes}"
+            continue
+        cache_key = image_cache_key(image_bytes, namespace=CAPTION_CACHE_NAMESPACE)
+        caption = caption_cache.get_caption(cache_key, beam_width=beam_width, length_penalty=length_penalty)
+        if caption is not None:
+            results[idx]["caption"] = caption
+        else:
+            pending.append((idx, cache_key, image_bytes, caption_cache.get_features(cache_key)))
+
+    # Decode (PIL melepas GIL) berjalan paralel di thread; gambar rusak ketahuan sebelum inferensi.
+    decoded = await asyncio.gather(*[
+        asyncio.to_thread(decode_image_for_inception, image_bytes)
+        for _, _, image_bytes, features in pending if features is None
+    ], return_exceptions=True)
+    decoded = iter(decoded)
+    batch_requests, batch_indices = [], []
+    for idx, cache_key, _, features in pending:
+        pixels = next(decoded) if features is None else None
+        if isinstance(pixels, Exception):
+            results[idx]["error"] = f"Gambar tidak dapat dibaca: {pixels}"
+            continue
+        batch_requests.append({
+            "cache_key": cache_key,
+            "image": pixels,
+            "features": features,
+            "beam_width": beam_width,
+            "length_penalty": length_penalty,
+        })
+        batch_indices.append(idx)
+
+    if batch_requests:
+        try:
+            outputs = await caption_batcher.submit_many(batch_requests)
+        except QueueFullError as e:
+            print(f"Antrean caption penuh, request batch ditolak: {e}")
+            raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+        for idx, output in zip(batch_indices, outputs):
+            if isinstance(output, Exception):
+                print(f"Error saat generate caption untuk {results[idx]['filename']}: {output}")
+                results[idx]["error"] = f"Gagal menghasilkan caption: {output}"
+            else:
+                results[idx]["caption"] = output
+
+    response = {"captions": results}
+    if with_story:
+        captions = [result["caption"] for result in results if result["caption"]]
+        if not captions:
+            raise HTTPException(status_code=422, detail="Tidak ada caption yang berhasil untuk membuat cerita.")
+        response["story"] = await _fetch_story(captions)
+    return response
 
 @app.post("/post-to-instagram/")
 async def api_post_to_instagram(
@@ -112,8 +484,8 @@ async def api_post_to_instagram(
             shutil.copyfileobj(image.file, tmp_file)
             temp_image_path = tmp_file.name
         print(f"Gambar (IG) disimpan sementara di: {temp_image_path}")
-        client = login_instagram(username, password)
-        upload_image_to_instagram(client, temp_image_path, caption)
+        # instagrapi blocking; jalankan di thread agar event loop tetap melayani request lain.
+        await asyncio.to_thread(instagram_pool.post_photo, username, password, temp_image_path, caption)
         return {"message": "Berhasil diposting ke Instagram!"}
     except Exception as e:
         print(f"Error saat posting ke Instagram: {e}")
@@ -130,44 +502,87 @@ async def api_post_to_instagram(
             except Exception as e_del:
                 print(f"Gagal menghapus file temporer (IG) {temp_image_path}: {e_del}")
 
-@app.post("/generate-story-from-captions/", response_model=StoryFromLocalApiResponse) # Ubah response_model
-async def api_generate_story_from_captions(request_data: CaptionsRequest):
-    captions_to_send = request_data.captions
-    if not captions_to_send:
-        raise HTTPException(status_code=400, detail="No captions provided to generate story.")
-
+async def _fetch_story(captions_to_send: List[str]) -> StoryFromLocalApiResponse:
+    """Meminta cerita ke Story Generator API untuk daftar caption (dipakai ulang oleh endpoint batch)."""
     print(f"DEBUG (Local API): Menerima {len(captions_to_send)} caption, mengirim ke: {STORY_GENERATOR_API_URL}")
 
     try:
-        async with httpx.AsyncClient(timeout=180.0) as client:
-            payload_to_story_api = {"captions": captions_to_send}
-            response_from_story_api = await client.post(STORY_GENERATOR_API_URL, json=payload_to_story_api)
+        client = story_api_http.get()
+        payload_to_story_api = {"captions": captions_to_send}
+        response_from_story_api = await client.post(STORY_GENERATOR_API_URL, json=payload_to_story_api)
 
-            if response_from_story_api.status_code != 200:
-                # ... (error handling sama seperti sebelumnya) ...
-                raise HTTPException(status_code=response_from_story_api.status_code, detail="Story Generator API error")
+        if response_from_story_api.status_code != 200:
+            # ... (error handling sama seperti sebelumnya) ...
+            raise HTTPException(status_code=response_from_story_api.status_code, detail="Story Generator API error")
 
-            story_api_response_data = response_from_story_api.json()
-            generated_story_text = story_api_response_data.get("story")
-            segment_count_from_api = story_api_response_data.get("segment_count", 0) # Ambil segment_count
+        story_api_response_data = response_from_story_api.json()
+        generated_story_text = story_api_response_data.get("story")
+        segment_count_from_api = story_api_response_data.get("segment_count", 0) # Ambil segment_count
 
-            if not generated_story_text:
-                raise HTTPException(status_code=500, detail="Story Generator API returned an empty story.")
+        if not generated_story_text:
+            raise HTTPException(status_code=500, detail="Story Generator API returned an empty story.")
 
-            is_story_segmented = len(captions_to_send) > 1 and STORY_SEPARATOR_TOKEN in generated_story_text
-            
-            return StoryFromLocalApiResponse(
-                story=generated_story_text,
-                is_segmented=is_story_segmented, # Jika input > 1 caption
-                segment_count=segment_count_from_api
-            )
+        is_story_segmented = len(captions_to_send) > 1 and STORY_SEPARATOR_TOKEN in generated_story_text
+        
+        return StoryFromLocalApiResponse(
+            story=generated_story_text,
+            is_segmented=is_story_segmented, # Jika input > 1 caption
+            segment_count=segment_count_from_api
+        )
 
     # ... (error handling httpx.RequestError dan Exception umum tetap sama) ...
+    except HTTPException:
+        raise
     except httpx.RequestError as e:
+        story_api_http.record_error()
         raise HTTPException(status_code=503, detail="Story Generator service is unavailable.")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to generate story: {str(e)}")
 
 
+@app.post("/generate-story-from-captions/", response_model=StoryFromLocalApiResponse) # Ubah response_model
+async def api_generate_story_from_captions(request_data: CaptionsRequest):
+    captions_to_send = request_data.captions
+    if not captions_to_send:
+        raise HTTPException(status_code=400, detail="No captions provided to generate story.")
+    return await _fetch_story(captions_to_send)
+
+
+@app.post("/generate-story-from-captions/stream/")
+async def api_generate_story_from_captions_stream(request_data: CaptionsRequest):
+    """Meneruskan stream SSE Story Generator API (token/segment/done/error) ke UI apa adanya."""
+    captions_to_send = request_data.captions
+    if not captions_to_send:
+        raise HTTPException(status_code=400, detail="No captions provided to generate story.")
+
+    print(f"DEBUG (Local API): Streaming cerita untuk {len(captions_to_send)} caption dari: {STORY_GENERATOR_STREAM_URL}")
+    client = story_api_http.get()
+    try:
+        upstream_request = client.build_request("POST", STORY_GENERATOR_STREAM_URL, json={"captions": captions_to_send})
+        upstream = await client.send(upstream_request, stream=True)
+    except httpx.RequestError:
+        story_api_http.record_error()
+        raise HTTPException(status_code=503, detail="Story Generator service is unavailable.")
+    if upstream.status_code != 200:
+        await upstream.aclose()
+        raise HTTPException(status_code=upstream.status_code, detail="Story Generator API error")
+
+    async def relay():
+        try:
+            # Diteruskan per chunk tanpa di-parse supaya setiap token langsung sampai ke UI.
+            async for chunk in upstream.aiter_raw():
+                yield chunk
+        except httpx.RequestError:
+            story_api_http.record_error()
+            yield b'event: error\ndata: {"detail": "Story Generator stream terputus."}\n\n'
+        finally:
+            await upstream.aclose()
+
+    return StreamingResponse(
+        relay(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
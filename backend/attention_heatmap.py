@@ -0,0 +1,94 @@
+import base64
+import io
+
+import numpy as np
+from PIL import Image
+
+from image_ingest import decode_image
+
+ATTENTION_FORMATS = ('png', 'float16')
+
+
+def bilinear_matrix(out_size, in_size):
+    """Matriks (out_size, in_size) interpolasi bilinear half-pixel (seperti tf.image.resize)."""
+    centers = np.clip((np.arange(out_size) + 0.5) * (in_size / out_size) - 0.5, 0, in_size - 1)
+    low = np.floor(centers).astype(np.int64)
+    high = np.minimum(low + 1, in_size - 1)
+    frac = (centers - low).astype(np.float32)
+    matrix = np.zeros((out_size, in_size), dtype=np.float32)
+    rows = np.arange(out_size)
+    matrix[rows, low] += 1.0 - frac
+    matrix[rows, high] += frac
+    return matrix
+
+
+def upsample_attention(attention_plot, height, width):
+    """Bobot attention (T, 64) menjadi heatmap (T, height, width) bernilai [0, 1].
+
+    Grid 8x8 setiap token di-upsample bilinear dengan dua perkalian matriks
+    untuk semua token sekaligus, lalu dinormalisasi min-max per token (skala
+    yang sama dengan imshow pada plot lama).
+    """
+    attention_plot = np.asarray(attention_plot, dtype=np.float32)
+    grid = int(round(np.sqrt(attention_plot.shape[-1])))
+    maps = attention_plot.reshape(-1, grid, grid)
+    heatmaps = bilinear_matrix(height, grid) @ maps @ bilinear_matrix(width, grid).T
+    heatmaps -= heatmaps.min(axis=(1, 2), keepdims=True)
+    heatmaps /= np.maximum(heatmaps.max(axis=(1, 2), keepdims=True), 1e-12)
+    return heatmaps
+
+
+def blend_heatmaps(image, heatmaps, alpha=0.6):
+    """Menumpuk heatmap abu-abu (T, H, W) di atas gambar uint8 (H, W, 3) -> (T, H, W, 3) uint8."""
+    base = image.astype(np.float32) * (1.0 - alpha)
+    blended = heatmaps[..., None] * (alpha * 255.0) + base
+    return blended.astype(np.uint8)
+
+
+def tile_sprite(tiles, columns=None):
+    """Menyusun tile (T, H, W, 3) menjadi satu sprite grid; kolom default ceil(sqrt(T))."""
+    count, height, width, channels = tiles.shape
+    columns = columns or int(np.ceil(np.sqrt(count)))
+    rows = int(np.ceil(count / columns))
+    padded = np.zeros((rows * columns, height, width, channels), dtype=tiles.dtype)
+    padded[:count] = tiles
+    sprite = padded.reshape(rows, columns, height, width, channels).transpose(0, 2, 1, 3, 4)
+    return sprite.reshape(rows * height, columns * width, channels), columns
+
+
+def thumbnail_pixels(image, tile_size=224):
+    """Gambar (byte atau array HxWx3) diperkecil sehingga sisi terpanjangnya `tile_size`."""
+    if isinstance(image, (bytes, bytearray, memoryview)):
+        image = decode_image(bytes(image), min_side=tile_size)
+    img = Image.fromarray(np.asarray(image, dtype=np.uint8))
+    img.thumbnail((tile_size, tile_size), Image.BILINEAR)
+    return np.asarray(img)
+
+
+def render_attention(image, tokens, attention_plot, output_format='png', tile_size=224, alpha=0.6):
+    """Heatmap attention per token untuk dikirim lewat API, tanpa matplotlib.
+
+    `attention_plot` berisi satu baris (64,) per token di `tokens`.
+    output_format 'png': semua token di-upsample dan di-blend ke thumbnail
+    gambar sekaligus, lalu disusun menjadi satu sprite PNG (base64) berurutan
+    baris demi baris. 'float16': bobot mentah grid 8x8 per token sebagai byte
+    float16 little-endian (base64); `image` tidak dipakai.
+    """
+    if output_format not in ATTENTION_FORMATS:
+        raise ValueError(f"output_format harus salah satu dari {ATTENTION_FORMATS}")
+    tokens = list(tokens)
+    attention_plot = np.asarray(attention_plot, dtype=np.float32)[:len(tokens)]
+    grid = int(round(np.sqrt(attention_plot.shape[-1])))
+    if output_format == 'float16':
+        data = attention_plot.reshape(-1, grid, grid).astype('<f2')
+        return {'format': 'float16', 'tokens': tokens, 'shape': list(data.shape),
+                'data': base64.b64encode(data.tobytes()).decode('ascii')}
+
+    pixels = thumbnail_pixels(image, tile_size)
+    height, width = pixels.shape[:2]
+    tiles = blend_heatmaps(pixels, upsample_attention(attention_plot, height, width), alpha)
+    sprite, columns = tile_sprite(tiles) if len(tokens) else (pixels, 1)
+    buffer = io.BytesIO()
+    Image.fromarray(sprite).save(buffer, format='PNG', compress_level=1)
+    return {'format': 'png', 'tokens': tokens, 'tile_width': width, 'tile_height': height,
+            'columns': columns, 'data': base64.b64encode(buffer.getvalue()).decode('ascii')}
@@ -0,0 +1,319 @@
+"""Caption massal offline untuk folder, glob atau manifest dengan output shard yang bisa dilanjutkan.
+
+Contoh:
+    python bulk_caption.py --input /arsip/foto --output_dir captions_out --workers 2
+    python bulk_caption.py --input "/arsip/2019/**/*.jpg" --output_dir captions_out --format parquet
+    python bulk_caption.py --input daftar_foto.txt --output_dir captions_out --bundle_dir caption_bundle
+
+Setiap shard (`part-<run>-w<worker>-<nomor>.jsonl|.parquet`) ditulis atomik
+begitu berisi `--shard_size` baris atau `--flush_interval` detik setelah
+shard sebelumnya, dan sisa shard ditulis saat proses dihentikan (Ctrl+C).
+Jika worker mati mendadak (SIGKILL/OOM), yang hilang paling banyak hasil
+satu interval itu. Menjalankan ulang perintah yang sama melewati gambar
+yang sudah ada di shard mana pun di `--output_dir`.
+"""
+import argparse
+import csv
+import glob
+import json
+import multiprocessing as mp
+import os
+import queue
+import tempfile
+import time
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.gif', '.webp')
+MANIFEST_EXTENSIONS = ('.txt', '.lst', '.csv', '.jsonl')
+SHARD_FORMATS = ('jsonl', 'parquet')
+
+
+def resolve_inputs(spec):
+    """Daftar path gambar (terurut) dari direktori, pola glob atau file manifest.
+
+    Manifest .txt/.lst berisi satu path per baris (baris '#' diabaikan), .csv
+    memakai kolom 'path' atau kolom pertama, .jsonl memakai field 'path'.
+    Path relatif di manifest dianggap relatif terhadap lokasi manifest.
+    """
+    if os.path.isdir(spec):
+        paths = []
+        for root, _, files in os.walk(spec):
+            paths.extend(os.path.join(root, name) for name in files
+                         if name.lower().endswith(IMAGE_EXTENSIONS))
+        return sorted(paths)
+    if os.path.isfile(spec) and spec.lower().endswith(MANIFEST_EXTENSIONS):
+        base_dir = os.path.dirname(os.path.abspath(spec))
+        with open(spec, 'r', encoding='utf-8') as f:
+            if spec.lower().endswith('.jsonl'):
+                paths = [json.loads(line)['path'] for line in f if line.strip()]
+            elif spec.lower().endswith('.csv'):
+                rows = list(csv.reader(f))
+                column = rows[0].index('path') if rows and 'path' in rows[0] else 0
+                start = 1 if rows and 'path' in rows[0] else 0
+                paths = [row[column] for row in rows[start:] if row]
+            else:
+                paths = [line.strip() for line in f if line.strip() and not line.startswith('#')]
+        return [path if os.path.isabs(path) else os.path.join(base_dir, path) for path in paths]
+    if os.path.isfile(spec):
+        return [spec]
+    return sorted(glob.glob(spec, recursive=True))
+
+
+def _read_shard(path):
+    if path.endswith('.parquet'):
+        if pq is None:
+            raise RuntimeError(f"Shard {path} butuh pyarrow untuk dibaca.")
+        return pq.read_table(path, columns=['path', 'error']).to_pylist()
+    with open(path, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def completed_paths(output_dir, retry_errors=False):
+    """Path yang sudah tercatat di shard yang ada (checkpoint = shard itu sendiri)."""
+    done = set()
+    for shard in sorted(glob.glob(os.path.join(output_dir, 'part-*'))):
+        if not shard.endswith(tuple('.' + fmt for fmt in SHARD_FORMATS)):
+            continue
+        for record in _read_shard(shard):
+            if retry_errors and record.get('error'):
+                continue
+            done.add(record['path'])
+    return done
+
+
+class ShardWriter:
+    """Menampung record lalu menulisnya sebagai shard JSONL/Parquet atomik.
+
+    Shard ditutup begitu berisi `shard_size` baris atau `flush_interval` detik
+    (None = tanpa batas waktu) setelah shard sebelumnya ditulis, mana yang
+    lebih dulu, karena shard adalah satu-satunya checkpoint.
+    """
+
+    def __init__(self, output_dir, prefix, shard_size=1000, fmt='jsonl', flush_interval=60.0):
+        if fmt == 'parquet' and pq is None:
+            raise RuntimeError("Format parquet membutuhkan paket pyarrow.")
+        self.output_dir = output_dir
+        self.prefix = prefix
+        self.shard_size = shard_size
+        self.fmt = fmt
+        self.flush_interval = flush_interval
+        self.records = []
+        self.shards_written = 0
+        self._last_flush = time.monotonic()
+
+    def add(self, record):
+        self.records.append(record)
+        if len(self.records) >= self.shard_size or (
+                self.flush_interval is not None and time.monotonic() - self._last_flush >= self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        self._last_flush = time.monotonic()
+        if not self.records:
+            return
+        path = os.path.join(self.output_dir, f"{self.prefix}-{self.shards_written:05d}.{self.fmt}")
+        fd, tmp_path = tempfile.mkstemp(dir=self.output_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                if self.fmt == 'parquet':
+                    pq.write_table(pa.Table.from_pylist(self.records), f)
+                else:
+                    f.write(''.join(json.dumps(record) + '\n' for record in self.records).encode('utf-8'))
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self.shards_written += 1
+        self.records = []
+
+
+class ProgressReporter:
+    """Mencetak jumlah selesai, images/s dan ETA paling sering setiap `interval` detik.
+
+    Kecepatan dihitung sejak batch pertama selesai supaya waktu memuat model
+    tidak membuat ETA awal meleset.
+    """
+
+    def __init__(self, total, interval=10.0):
+        self.total = total
+        self.interval = interval
+        self.done = 0
+        self.errors = 0
+        self.started = None
+        self._baseline = 0
+        self._last_print = 0.0
+
+    def update(self, count, errors=0, force=False):
+        self.done += count
+        self.errors += errors
+        now = time.perf_counter()
+        if self.started is None:
+            self.started, self._baseline = now, self.done
+        if force or now - self._last_print >= self.interval:
+            self._last_print = now
+            print(self.summary(), flush=True)
+
+    def summary(self):
+        elapsed = time.perf_counter() - self.started if self.started is not None else 0.0
+        rate = (self.done - self._baseline) / elapsed if elapsed > 0 else 0.0
+        remaining = self.total - self.done
+        eta = time.strftime('%H:%M:%S', time.gmtime(remaining / rate)) if rate > 0 else '--:--:--'
+        return (f"[{self.done}/{self.total}] {rate:.2f} gambar/detik, "
+                f"error {self.errors}, ETA {eta}")
+
+
+def _load_assets(options, num_threads):
+    if options['bundle_dir']:
+        from inference_bundle import load_inference_bundle
+        return load_inference_bundle(options['bundle_dir'], inference_mode='graph',
+                                     precision=options['precision'], num_threads=num_threads)
+    from caption_generator import load_model_assets
+    return load_model_assets(options['model_dir'], inference_mode='graph', precision=options['precision'])
+
+
+def caption_paths(worker_id, paths, options, report):
+    """Meng-caption `paths` lewat caption_pipeline dan menulis shard milik worker ini.
+
+    `report(count, errors)` dipanggil setiap batch untuk laporan progres.
+    """
+    import tensorflow as tf
+    from caption_pipeline import caption_pipeline
+
+    threads = options['threads_per_worker']
+    if threads:
+        tf.config.threading.set_intra_op_parallelism_threads(threads)
+    encoder, decoder, tokenizer, inception_model, config = _load_assets(options, threads)
+    writer = ShardWriter(options['output_dir'], f"part-{options['run_id']}-w{worker_id}",
+                         shard_size=options['shard_size'], fmt=options['format'],
+                         flush_interval=options['flush_interval'] or None)
+    pending = errors = 0
+    try:
+        for path, caption, error in caption_pipeline(
+                paths, inception_model, encoder, decoder, tokenizer, config,
+                batch_size=options['batch_size'], beam_width=options['beam_width'],
+                length_penalty=options['length_penalty'], decode_workers=threads):
+            writer.add({'path': path, 'caption': caption,
+                        'error': f"{type(error).__name__}: {error}" if error is not None else None})
+            pending += 1
+            errors += error is not None
+            if pending >= options['batch_size']:
+                report(pending, errors)
+                pending = errors = 0
+    finally:
+        # Juga saat Ctrl+C: baris yang sudah selesai tetap tersimpan untuk dilanjutkan.
+        writer.flush()
+        if pending:
+            report(pending, errors)
+
+
+def _worker_main(worker_id, paths, options, progress):
+    try:
+        caption_paths(worker_id, paths, options, lambda count, errors: progress.put(('progress', count, errors)))
+    except KeyboardInterrupt:
+        pass
+    except Exception as e:
+        progress.put(('failed', worker_id, f"{type(e).__name__}: {e}"))
+    progress.put(('finished', worker_id))
+
+
+def main(args):
+    paths = resolve_inputs(args.input)
+    if not paths:
+        print(f"Error: tidak ada gambar yang cocok dengan '{args.input}'.")
+        return 1
+    os.makedirs(args.output_dir, exist_ok=True)
+    done = completed_paths(args.output_dir, retry_errors=args.retry_errors)
+    remaining = [path for path in paths if path not in done]
+    print(f"{len(paths)} gambar ditemukan, {len(paths) - len(remaining)} sudah selesai, "
+          f"{len(remaining)} akan diproses.")
+    if not remaining:
+        return 0
+
+    workers = max(1, min(args.workers, len(remaining)))
+    options = {
+        'model_dir': args.model_dir,
+        'bundle_dir': args.bundle_dir,
+        'precision': args.precision,
+        'output_dir': args.output_dir,
+        'format': args.format,
+        'shard_size': args.shard_size,
+        'flush_interval': args.flush_interval,
+        'batch_size': args.batch_size,
+        'beam_width': args.beam_width,
+        'length_penalty': args.length_penalty,
+        'threads_per_worker': max(1, (os.cpu_count() or 1) // workers) if workers > 1 else None,
+        'run_id': time.strftime('%Y%m%d%H%M%S'),
+    }
+    progress = ProgressReporter(len(remaining), interval=args.log_every)
+
+    if workers == 1:
+        try:
+            caption_paths(0, remaining, options, progress.update)
+        except KeyboardInterrupt:
+            print("Dihentikan; jalankan ulang perintah yang sama untuk melanjutkan.")
+            return 130
+        print(f"Selesai. {progress.summary()}")
+        return 0
+
+    # 'spawn': TensorFlow tidak aman di-fork (lihat serving_pool).
+    ctx = mp.get_context('spawn')
+    progress_queue = ctx.Queue()
+    processes = [ctx.Process(target=_worker_main, args=(i, remaining[i::workers], options, progress_queue),
+                             name=f'bulk-caption-{i}') for i in range(workers)]
+    for process in processes:
+        process.start()
+    finished = failed = 0
+    try:
+        while finished < workers:
+            try:
+                message = progress_queue.get(timeout=1.0)
+            except queue.Empty:
+                if not any(process.is_alive() for process in processes):
+                    break
+                continue
+            if message[0] == 'progress':
+                progress.update(message[1], message[2])
+            elif message[0] == 'failed':
+                failed += 1
+                print(f"Worker {message[1]} gagal: {message[2]}")
+            else:
+                finished += 1
+    except KeyboardInterrupt:
+        print("Dihentikan; menunggu worker menyimpan shard terakhir...")
+        for process in processes:
+            process.join()
+        return 130
+    for process in processes:
+        process.join()
+    print(f"Selesai. {progress.summary()}")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Caption massal offline dengan output shard yang bisa dilanjutkan")
+    parser.add_argument('--input', type=str, required=True,
+                        help='Direktori, pola glob (mendukung **) atau manifest .txt/.csv/.jsonl.')
+    parser.add_argument('--output_dir', type=str, required=True,
+                        help='Direktori shard hasil; juga berfungsi sebagai checkpoint.')
+    parser.add_argument('--model_dir', type=str, default='image_captioning_model_assets')
+    parser.add_argument('--bundle_dir', type=str, default=None,
+                        help='Muat dari bundle inferensi (lebih cepat per worker) alih-alih --model_dir.')
+    parser.add_argument('--precision', type=str, default='float32', choices=['float32', 'float16', 'int8'])
+    parser.add_argument('--format', type=str, default='jsonl', choices=SHARD_FORMATS)
+    parser.add_argument('--workers', type=int, default=1, help='Jumlah proses worker.')
+    parser.add_argument('--batch_size', type=int, default=16)
+    parser.add_argument('--shard_size', type=int, default=1000)
+    parser.add_argument('--flush_interval', type=float, default=60.0,
+                        help='Tulis shard paling lambat setiap N detik walau belum penuh (0 = hanya per --shard_size).')
+    parser.add_argument('--beam_width', type=int, default=1)
+    parser.add_argument('--length_penalty', type=float, default=0.6)
+    parser.add_argument('--retry_errors', action='store_true',
+                        help='Proses ulang gambar yang sebelumnya tercatat error.')
+    parser.add_argument('--log_every', type=float, default=10.0, help='Interval laporan progres (detik).')
+    raise SystemExit(main(parser.parse_args()))
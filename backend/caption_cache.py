@@ -0,0 +1,184 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+def image_cache_key(image_bytes, namespace=''):
+    """Kunci cache berbasis isi: SHA-256 dari byte gambar yang di-upload.
+
+    `namespace` memisahkan hasil dari varian model yang berbeda (mis.
+    precision int8) yang berbagi direktori cache yang sama.
+    """
+    digest = hashlib.sha256(namespace.encode('utf-8')) if namespace else hashlib.sha256()
+    digest.update(image_bytes)
+    return digest.hexdigest()
+
+
+def files_fingerprint(paths):
+    """Sidik jari murah (nama, ukuran, mtime) dari file model; berubah jika salah satunya diganti.
+
+    File yang tidak ada dilewati. Dipakai sebagai bagian `namespace`
+    image_cache_key supaya caption dari model lama tidak terpakai lagi.
+    """
+    digest = hashlib.sha256()
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        digest.update(f"{os.path.basename(path)}:{stat.st_size}:{stat.st_mtime_ns};".encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+class CaptionCache:
+    """Cache fitur Inception (64x2048) dan caption final, dikunci dengan hash gambar.
+
+    Tier memori memakai LRU dengan batas `max_bytes`; fitur dan caption dihitung
+    ke dalam anggaran yang sama. Jika `disk_dir` diisi, fitur disimpan juga
+    sebagai `<hash>.npy` dan caption sebagai `<hash>.json` sehingga bertahan
+    setelah restart. Kunci diberi namespace (lihat image_cache_key dan
+    files_fingerprint) sehingga versi model yang berbeda tidak saling memakai
+    entri; entri versi lama tetap di disk sampai dihapus manual karena tier
+    disk tidak punya eviction.
+    """
+
+    def __init__(self, max_bytes=256 * 1024 * 1024, disk_dir=None):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+        self._entries = OrderedDict()
+        self._current_bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {
+            'feature_hits': 0,
+            'feature_misses': 0,
+            'caption_hits': 0,
+            'caption_misses': 0,
+            'disk_hits': 0,
+            'evictions': 0,
+        }
+
+    @staticmethod
+    def _caption_key(beam_width, length_penalty):
+        return f"{beam_width}:{length_penalty}"
+
+    @staticmethod
+    def _entry_size(entry):
+        size = entry['features'].nbytes if entry['features'] is not None else 0
+        return size + sum(len(k) + len(v) for k, v in entry['captions'].items())
+
+    def _disk_path(self, key, suffix):
+        return os.path.join(self.disk_dir, key[:2], key + suffix)
+
+    def _atomic_write(self, path, write_fn):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                write_fn(f)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def _load_from_disk(self, key):
+        if not self.disk_dir:
+            return None
+        features_path = self._disk_path(key, '.npy')
+        captions_path = self._disk_path(key, '.json')
+        if not os.path.exists(features_path) and not os.path.exists(captions_path):
+            return None
+        entry = {'features': None, 'captions': {}}
+        try:
+            if os.path.exists(features_path):
+                entry['features'] = np.load(features_path)
+            if os.path.exists(captions_path):
+                with open(captions_path, 'r') as f:
+                    entry['captions'] = json.load(f)
+        except Exception as e:
+            print(f"Gagal membaca cache disk untuk {key}: {e}")
+            return None
+        self._stats['disk_hits'] += 1
+        return entry
+
+    def _get_entry(self, key):
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            return entry
+        entry = self._load_from_disk(key)
+        if entry is not None:
+            self._put_entry(key, entry)
+        return entry
+
+    def _put_entry(self, key, entry):
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._current_bytes -= old['size']
+        entry['size'] = self._entry_size(entry)
+        if entry['size'] > self.max_bytes:
+            return
+        self._entries[key] = entry
+        self._current_bytes += entry['size']
+        while self._current_bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._current_bytes -= evicted['size']
+            self._stats['evictions'] += 1
+
+    def get_features(self, key):
+        """Mengembalikan fitur (64, 2048) untuk `key`, atau None jika belum ada."""
+        with self._lock:
+            entry = self._get_entry(key)
+            if entry is None or entry['features'] is None:
+                self._stats['feature_misses'] += 1
+                return None
+            self._stats['feature_hits'] += 1
+            return entry['features']
+
+    def put_features(self, key, features):
+        with self._lock:
+            entry = self._get_entry(key) or {'features': None, 'captions': {}}
+            entry['features'] = np.asarray(features)
+            self._put_entry(key, entry)
+        if self.disk_dir:
+            self._atomic_write(self._disk_path(key, '.npy'),
+                               lambda f: np.save(f, np.asarray(features)))
+
+    def get_caption(self, key, beam_width=1, length_penalty=0.6):
+        """Mengembalikan caption yang pernah dihasilkan dengan parameter decoding yang sama."""
+        with self._lock:
+            entry = self._get_entry(key)
+            caption = None
+            if entry is not None:
+                caption = entry['captions'].get(
+                    self._caption_key(beam_width, length_penalty))
+            if caption is None:
+                self._stats['caption_misses'] += 1
+            else:
+                self._stats['caption_hits'] += 1
+            return caption
+
+    def put_caption(self, key, caption, beam_width=1, length_penalty=0.6):
+        with self._lock:
+            entry = self._get_entry(key) or {'features': None, 'captions': {}}
+            entry['captions'][self._caption_key(beam_width, length_penalty)] = caption
+            self._put_entry(key, entry)
+            captions = dict(entry['captions'])
+        if self.disk_dir:
+            self._atomic_write(self._disk_path(key, '.json'),
+                               lambda f: f.write(json.dumps(captions).encode('utf-8')))
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats,
+                        entries=len(self._entries),
+                        bytes=self._current_bytes,
+                        max_bytes=self.max_bytes,
+                        disk_enabled=bool(self.disk_dir))
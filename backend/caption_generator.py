@@ -1,11 +1,19 @@
 import tensorflow as tf
 import numpy as np
-import matplotlib.pyplot as plt
 from PIL import Image
+import base64
+import io
 import json
 import pickle
 import os
 import argparse
+import time
+
+from attention_heatmap import render_attention
+from image_ingest import decode_image, jpeg_scale_ratio, open_image, read_image_file
+from numpy_decoder import NumpyCNNEncoder, NumpyRNNDecoder, beam_search
+from quantized_inception import PRECISIONS, load_or_convert_inception
+from vocabulary import Vocabulary
 
 
 
@@ -17,16 +25,18 @@ class BahdanauAttention(tf.keras.Model):
         self.W2 = tf.keras.layers.Dense(units)
         self.V = tf.keras.layers.Dense(1)
 
-    def call(self, features, hidden):
+    def call(self, features, hidden, attention_keys=None):
         
-        if tf.rank(hidden) == 1:
+        if len(hidden.shape) == 1:
        
             current_batch_size = tf.shape(features)[0]
             hidden = tf.reshape(hidden, [current_batch_size, self.units])
         hidden_with_time_axis = tf.expand_dims(hidden, 1)
 
- 
-        score = tf.nn.tanh(self.W1(features) + self.W2(hidden_with_time_axis))
+        # W1(features) tidak bergantung pada langkah decode; pakai hasil precompute_keys jika ada.
+        if attention_keys is None:
+            attention_keys = self.W1(features)
+        score = tf.nn.tanh(attention_keys + self.W2(hidden_with_time_axis))
 
       
         attention_weights = tf.nn.softmax(self.V(score), axis=1)
@@ -37,6 +47,10 @@ class BahdanauAttention(tf.keras.Model):
 
         return context_vector, attention_weights
 
+    def precompute_keys(self, features):
+        """W1(features), dihitung sekali per gambar lalu diteruskan ke setiap langkah decode."""
+        return self.W1(features)
+
 
 class CNN_Encoder(tf.keras.Model):
     def __init__(self, embedding_dim):
@@ -62,8 +76,8 @@ class RNN_Decoder(tf.keras.Model):
         self.fc2 = tf.keras.layers.Dense(vocab_size)
         self.attention = BahdanauAttention(self.units)
 
-    def call(self, x, features, hidden, training=False):  
-        context_vector, attention_weights = self.attention(features, hidden)
+    def call(self, x, features, hidden, training=False, attention_keys=None):  
+        context_vector, attention_weights = self.attention(features, hidden, attention_keys=attention_keys)
         x = self.embedding(x)
         x = tf.concat([tf.expand_dims(context_vector, 1), x], axis=-1)
 
@@ -76,95 +90,507 @@ class RNN_Decoder(tf.keras.Model):
     def reset_state(self, batch_size):
         return tf.zeros((batch_size, self.units))
 
+    def precompute_attention_keys(self, features):
+        """Kunci attention (batch, 64, units) untuk `features` hasil CNN_Encoder.
+
+        Hasilnya diteruskan sebagai `attention_keys` ke setiap panggilan
+        decoder selama `features` sama (seluruh caption, semua beam).
+        """
+        return self.attention.precompute_keys(features)
+
 
 
 def load_image_preprocess(image_path):
     """Memuat dan memproses gambar seperti pada training."""
-    img = tf.io.read_file(image_path)
-    img = tf.image.decode_jpeg(img, channels=3)
-    img = tf.image.resize(img, (299, 299))
+    img = tf.image.resize(decode_image_bytes(read_image_file(image_path)), (299, 299))
     img = tf.keras.applications.inception_v3.preprocess_input(img)
     return img, image_path
 
 
-def generate_caption(image_path, inception_model, cnn_encoder, rnn_decoder, tokenizer, model_config):
-    """Menghasilkan caption untuk gambar."""
+def decode_image_bytes(image_bytes):
+    """Decode byte gambar (JPEG/PNG/WebP/...) di memori menjadi tensor uint8 HxWx3.
+
+    Header dibaca dulu (image_ingest.open_image) sehingga payload/dimensi di
+    atas batas ditolak dengan ImageTooLargeError sebelum piksel dialokasikan;
+    byte yang bukan gambar atau rusak menghasilkan ImageDecodeError.
+    JPEG yang cukup besar didecode langsung pada skala DCT 1/2, 1/4 atau 1/8
+    lewat image_ingest.decode_image; gambar lain didecode persis seperti dulu.
+    """
+    with open_image(image_bytes) as img:
+        image_format, size = img.format, img.size
+    if image_format == 'JPEG' and jpeg_scale_ratio(size) > 1:
+        # PIL draft lebih cepat dan jauh lebih hemat memori daripada decode_jpeg(ratio=...).
+        return tf.convert_to_tensor(decode_image(image_bytes))
+    try:
+        return tf.io.decode_image(image_bytes, channels=3, expand_animations=False)
+    except tf.errors.InvalidArgumentError:
+        # Format yang tidak dikenali decoder TF (mis. WebP di versi TF lama) lewat PIL.
+        return tf.convert_to_tensor(decode_image(image_bytes))
+
+
+def decode_image_for_inception(image_bytes):
+    """Decode byte gambar lalu resize ke 299x299 (float32, belum di-preprocess).
+
+    Hasilnya bisa diteruskan sebagai 'image' ke caption_requests_batch dan
+    memberi fitur yang sama persis dengan meneruskan byte aslinya; dipakai
+    untuk men-decode beberapa upload secara paralel sebelum inferensi batch.
+    """
+    # resize menerima uint8 dan mengembalikan float32; tanpa salinan float32 beresolusi penuh.
+    return tf.image.resize(decode_image_bytes(bytes(image_bytes)), (299, 299)).numpy()
+
+
+def _preprocess_input(image):
+    """Memproses satu input menjadi tensor 299x299 siap masuk InceptionV3.
+
+    `image` boleh berupa path file, byte gambar mentah (hasil upload), atau
+    array piksel HxWx3.
+    """
+    if isinstance(image, (str, os.PathLike)):
+        return load_image_preprocess(os.fspath(image))[0]
+    if isinstance(image, (bytes, bytearray, memoryview)):
+        image = decode_image_bytes(bytes(image))
+    img = tf.image.resize(tf.convert_to_tensor(image), (299, 299))
+    return tf.keras.applications.inception_v3.preprocess_input(img)
+
+
+def _greedy_decode_eager(features, rnn_decoder, tokenizer, model_config):
+    """Greedy decoding langkah demi langkah (eager) untuk satu batch fitur encoder."""
     max_length = model_config['max_length']
-    # e.g., 64
     attention_features_shape = model_config['attention_features_shape']
+    batch_size = features.shape[0]
 
-    attention_plot = np.zeros((max_length, attention_features_shape))
-    hidden = rnn_decoder.reset_state(batch_size=1)
+    attention_plots = np.zeros((batch_size, max_length, attention_features_shape))
+    hidden = rnn_decoder.reset_state(batch_size=batch_size)
+    attention_keys = rnn_decoder.precompute_attention_keys(features)
 
-    temp_input = tf.expand_dims(load_image_preprocess(
-        image_path)[0], 0)  
-    img_tensor_val = inception_model(temp_input) 
-    img_tensor_val = tf.reshape(
-        img_tensor_val, (img_tensor_val.shape[0], -1, img_tensor_val.shape[3])) 
-    features = cnn_encoder(img_tensor_val, training=False)
-
-    dec_input = tf.expand_dims([tokenizer.word_index['<start>']], 0)
-    result_caption = []
+    end_id = tokenizer.word_index['<end>']
+    dec_input = tf.fill([batch_size, 1], tokenizer.word_index['<start>'])
+    result_ids = np.zeros((batch_size, max_length), dtype=np.int64)
+    lengths = np.full(batch_size, max_length)
+    finished = np.zeros(batch_size, dtype=bool)
 
     for i in range(max_length):
         predictions, hidden, attention_weights = rnn_decoder(
-            dec_input, features, hidden, training=False)
-        attention_plot[i] = tf.reshape(attention_weights, (-1, )).numpy()
-        predicted_id = tf.argmax(predictions[0]).numpy()
+            dec_input, features, hidden, training=False, attention_keys=attention_keys)
+        attention_plots[:, i] = tf.reshape(
+            attention_weights, (batch_size, -1)).numpy()
+        predicted_ids = tf.argmax(predictions, axis=-1).numpy()
+
+        # Baris yang sudah selesai tetap ikut dihitung, tapi hasilnya diabaikan.
+        predicted_ids[finished] = end_id
+        result_ids[:, i] = predicted_ids
+        newly_finished = (predicted_ids == end_id) & ~finished
+        lengths[newly_finished] = i + 1
+        finished |= newly_finished
+
+        if finished.all():
+            break
 
-        word = tokenizer.index_word.get(
-            predicted_id, "<unk>")  
-        result_caption.append(word)
+        dec_input = tf.expand_dims(predicted_ids, 1)
 
-        if word == '<end>':
-            break
+    return result_ids, lengths, attention_plots
 
-        dec_input = tf.expand_dims([predicted_id], 0)
 
-    attention_plot = attention_plot[:len(result_caption), :]
-    return ' '.join(result_caption), attention_plot
+def build_image_features_fn(inception_model):
+    """Membungkus feature extractor InceptionV3 sebagai tf.function dengan signature tetap."""
+    @tf.function(input_signature=[
+        tf.TensorSpec(shape=[None, 299, 299, 3], dtype=tf.float32)])
+    def image_features(images):
+        return inception_model(images, training=False)
 
+    return image_features
 
-def generate_caption_simple(image_path, encoder, decoder, tokenizer, inception_model, config):
-    caption, _ = generate_caption(
-        image_path, inception_model, encoder, decoder, tokenizer, config
-    )
+
+def build_greedy_caption_fn(cnn_encoder, rnn_decoder, tokenizer, model_config):
+    """Membangun satu graph (tf.function) untuk encoder dan seluruh loop greedy.
+
+    Loop decoder dijalankan sebagai tf.while_loop di dalam graph sehingga satu
+    caption (atau satu batch) cukup dengan satu panggilan, tanpa dispatch eager
+    dan sinkronisasi `.numpy()` di setiap langkah. Input-nya adalah fitur
+    Inception yang sudah di-reshape menjadi (batch, 64, 2048).
+    """
+    max_length = model_config['max_length']
+    start_id = tokenizer.word_index['<start>']
+    end_id = tokenizer.word_index['<end>']
+
+    @tf.function(input_signature=[
+        tf.TensorSpec(shape=[None, model_config['attention_features_shape'],
+                             model_config['features_shape']], dtype=tf.float32)])
+    def greedy_caption(img_features):
+        batch_size = tf.shape(img_features)[0]
+        features = cnn_encoder(img_features, training=False)
+        attention_keys = rnn_decoder.precompute_attention_keys(features)
+
+        hidden = rnn_decoder.reset_state(batch_size=batch_size)
+        dec_input = tf.fill([batch_size, 1], start_id)
+        finished = tf.zeros([batch_size], dtype=tf.bool)
+        lengths = tf.fill([batch_size], max_length)
+        result_ids = tf.TensorArray(tf.int32, size=0, dynamic_size=True)
+        attention_plots = tf.TensorArray(tf.float32, size=0, dynamic_size=True)
+
+        for i in tf.range(max_length):
+            predictions, hidden, attention_weights = rnn_decoder(
+                dec_input, features, hidden, training=False, attention_keys=attention_keys)
+            predicted_ids = tf.argmax(
+                predictions, axis=-1, output_type=tf.int32)
+            predicted_ids = tf.where(finished, end_id, predicted_ids)
+
+            result_ids = result_ids.write(i, predicted_ids)
+            attention_plots = attention_plots.write(
+                i, tf.reshape(attention_weights, (batch_size, -1)))
+            newly_finished = tf.logical_and(
+                tf.equal(predicted_ids, end_id), tf.logical_not(finished))
+            lengths = tf.where(newly_finished, i + 1, lengths)
+            finished = tf.logical_or(finished, newly_finished)
+
+            if tf.reduce_all(finished):
+                break
+
+            dec_input = tf.expand_dims(predicted_ids, 1)
+
+        return (tf.transpose(result_ids.stack()), lengths,
+                tf.transpose(attention_plots.stack(), [1, 0, 2]))
+
+    return greedy_caption
+
+
+def _beam_search_decode(features, rnn_decoder, tokenizer, model_config,
+                        beam_width, length_penalty):
+    """Beam search untuk satu batch fitur encoder (lihat numpy_decoder.beam_search).
+
+    Semua beam dari semua gambar dijalankan sebagai satu panggilan decoder
+    berukuran (batch * beam_width, ...) di atas `features` yang sama.
+    """
+    batch_size = features.shape[0]
+    num_rows = batch_size * beam_width
+
+    # Kunci attention dihitung per gambar, baru diulang untuk setiap beam.
+    attention_keys = tf.repeat(rnn_decoder.precompute_attention_keys(features), beam_width, axis=0)
+    features = tf.repeat(features, beam_width, axis=0)
+    state = {'hidden': rnn_decoder.reset_state(batch_size=num_rows)}
+
+    def step(token_ids, beam_rows):
+        hidden = state['hidden'] if beam_rows is None else tf.gather(state['hidden'], beam_rows)
+        predictions, state['hidden'], attention_weights = rnn_decoder(
+            tf.constant(token_ids[:, None]), features, hidden, training=False, attention_keys=attention_keys)
+        return (tf.nn.log_softmax(predictions, axis=-1).numpy(),
+                tf.reshape(attention_weights, (num_rows, -1)).numpy())
+
+    return beam_search(step, batch_size, beam_width, tokenizer.word_index['<start>'],
+                       tokenizer.word_index['<end>'], model_config['max_length'],
+                       model_config['attention_features_shape'], length_penalty)
+
+
+def _ids_to_captions(result_ids, lengths, attention_plots, tokenizer):
+    if not isinstance(tokenizer, Vocabulary):
+        tokenizer = Vocabulary.from_tokenizer(tokenizer)
+    captions = tokenizer.decode_batch(result_ids, lengths)
+    plots = [plot[:length, :]
+             for plot, length in zip(attention_plots, lengths)]
+    return captions, plots
+
+
+def extract_image_features(images, inception_model):
+    """Menjalankan InceptionV3 untuk sekumpulan gambar.
+
+    Mengembalikan array NumPy (N, 64, 2048) yang bisa di-cache dan diteruskan
+    ke generate_captions_from_features.
+    """
+    return features_from_preprocessed(
+        tf.stack([_preprocess_input(image) for image in images]), inception_model)
+
+
+def features_from_preprocessed(temp_input, inception_model):
+    """InceptionV3 untuk batch (N, 299, 299, 3) yang sudah melewati _preprocess_input."""
+    img_tensor_val = inception_model(temp_input)
+    img_tensor_val = tf.reshape(
+        img_tensor_val, (img_tensor_val.shape[0], -1, img_tensor_val.shape[3]))
+    return img_tensor_val.numpy()
+
+
+def generate_captions_from_features(img_features, cnn_encoder, rnn_decoder, tokenizer, model_config,
+                                    beam_width=1, length_penalty=0.6):
+    """Menghasilkan caption dari fitur Inception (N, 64, 2048) tanpa menjalankan CNN lagi."""
+    if beam_width < 1:
+        raise ValueError("beam_width harus >= 1")
+    if len(img_features) == 0:
+        return [], []
+    if isinstance(rnn_decoder, NumpyRNNDecoder):
+        result_ids, lengths, attention_plots = rnn_decoder.decode(
+            cnn_encoder(img_features), tokenizer.word_index['<start>'], tokenizer.word_index['<end>'],
+            model_config['max_length'], beam_width=beam_width, length_penalty=length_penalty)
+        return _ids_to_captions(result_ids, lengths, attention_plots, tokenizer)
+    img_features = tf.convert_to_tensor(img_features, dtype=tf.float32)
+
+    greedy_caption_fn = getattr(rnn_decoder, 'greedy_caption_fn', None)
+    if beam_width == 1 and greedy_caption_fn is not None:
+        result_ids, lengths, attention_plots = greedy_caption_fn(img_features)
+        return _ids_to_captions(result_ids.numpy(), lengths.numpy(),
+                                attention_plots.numpy(), tokenizer)
+
+    features = cnn_encoder(img_features, training=False)
+    if beam_width > 1:
+        result_ids, lengths, attention_plots = _beam_search_decode(
+            features, rnn_decoder, tokenizer, model_config, beam_width, length_penalty)
+    else:
+        result_ids, lengths, attention_plots = _greedy_decode_eager(
+            features, rnn_decoder, tokenizer, model_config)
+    return _ids_to_captions(result_ids, lengths, attention_plots, tokenizer)
+
+
+def generate_captions_batch(images, inception_model, cnn_encoder, rnn_decoder, tokenizer, model_config,
+                            beam_width=1, length_penalty=0.6):
+    """Menghasilkan caption untuk beberapa gambar sekaligus dalam satu batch.
+
+    `images` berisi path gambar, byte gambar mentah atau array piksel (HxWx3).
+    Semua gambar melewati InceptionV3 dan encoder sebagai satu tensor, lalu
+    seluruh sekuens di-decode bersamaan; baris yang sudah menghasilkan '<end>' di-mask sampai semua selesai.
+    Jika aset dimuat dengan inference_mode='graph', Inception dan loop decoder
+    masing-masing berjalan sebagai satu panggilan graph. `beam_width` > 1 memakai
+    beam search dengan normalisasi panjang `length_penalty` alih-alih greedy.
+    """
+    if beam_width < 1:
+        raise ValueError("beam_width harus >= 1")
+    images = list(images)
+    if not images:
+        return [], []
+
+    img_features = extract_image_features(images, inception_model)
+    return generate_captions_from_features(
+        img_features, cnn_encoder, rnn_decoder, tokenizer, model_config,
+        beam_width=beam_width, length_penalty=length_penalty)
+
+
+def generate_caption(image_path, inception_model, cnn_encoder, rnn_decoder, tokenizer, model_config,
+                     beam_width=1, length_penalty=0.6):
+    """Menghasilkan caption untuk gambar."""
+    captions, attention_plots = generate_captions_batch(
+        [image_path], inception_model, cnn_encoder, rnn_decoder, tokenizer, model_config,
+        beam_width=beam_width, length_penalty=length_penalty)
+    return captions[0], attention_plots[0]
+
+
+def clean_caption(caption):
+    """Membuang token <start>/<end> dari caption."""
     return caption.replace("<start>", "").replace("<end>", "").strip()
 
 
-def plot_attention(image_path, result_caption, attention_plot):
-    """Menampilkan gambar dengan plot attention."""
-    temp_image = np.array(Image.open(image_path))
-    fig = plt.figure(figsize=(10, 10))
-    len_result = len(result_caption.split())
+def generate_caption_simple(image_path, encoder, decoder, tokenizer, inception_model, config,
+                            beam_width=1, length_penalty=0.6):
+    caption, _ = generate_caption(
+        image_path, inception_model, encoder, decoder, tokenizer, config,
+        beam_width=beam_width, length_penalty=length_penalty
+    )
+    return clean_caption(caption)
 
-    
-    if len_result == 0:
+
+def generate_captions_batch_simple(images, encoder, decoder, tokenizer, inception_model, config,
+                                   beam_width=1, length_penalty=0.6):
+    """Versi batch dari generate_caption_simple; mengembalikan list caption bersih."""
+    captions, _ = generate_captions_batch(
+        images, inception_model, encoder, decoder, tokenizer, config,
+        beam_width=beam_width, length_penalty=length_penalty
+    )
+    return [clean_caption(caption) for caption in captions]
+
+
+def caption_requests_batch(requests, inception_model, cnn_encoder, rnn_decoder, tokenizer, model_config):
+    """Memproses satu batch request caption dengan parameter decoding campuran.
+
+    Setiap request adalah dict berisi 'image' (path, byte atau array piksel),
+    'features' (fitur Inception (64, 2048) yang sudah ada, atau None),
+    'beam_width', 'length_penalty' dan opsional 'attention'. Hanya request
+    tanpa fitur yang melewati InceptionV3, dan request dengan parameter
+    decoding yang sama di-decode bersama. Mengembalikan list (features,
+    caption, attention) sesuai urutan request; attention berisi bobot (T, 64)
+    untuk tiap kata caption bersih jika 'attention' bernilai True, selain itu None.
+    """
+    features = [req['features'] for req in requests]
+    missing = [idx for idx, feat in enumerate(features) if feat is None]
+    if missing:
+        new_features = extract_image_features(
+            [requests[idx]['image'] for idx in missing], inception_model)
+        for idx, feat in zip(missing, new_features):
+            features[idx] = feat
+
+    groups = {}
+    for idx, req in enumerate(requests):
+        groups.setdefault((req['beam_width'], req['length_penalty']), []).append(idx)
+    captions = [None] * len(requests)
+    attentions = [None] * len(requests)
+    for (beam_width, length_penalty), indices in groups.items():
+        group_captions, group_plots = generate_captions_from_features(
+            np.stack([features[idx] for idx in indices]),
+            cnn_encoder, rnn_decoder, tokenizer, model_config,
+            beam_width=beam_width, length_penalty=length_penalty)
+        for idx, caption, plot in zip(indices, group_captions, group_plots):
+            captions[idx] = clean_caption(caption)
+            if requests[idx].get('attention'):
+                # Baris attention mengikuti urutan kata; '<end>' selalu di posisi terakhir.
+                attentions[idx] = np.asarray(plot[:len(captions[idx].split())], dtype=np.float32)
+    return list(zip(features, captions, attentions))
+
+
+def warm_up_models(inception_model, cnn_encoder, rnn_decoder, tokenizer, model_config):
+    """Menjalankan satu caption pada gambar JPEG sintetis sebelum melayani request.
+
+    Decode, InceptionV3 dan decoder dieksekusi sekali sehingga alokasi memori
+    dan kernel pertama tidak dibebankan ke request pengguna. Mengembalikan
+    durasi warm-up dalam detik.
+    """
+    started = time.perf_counter()
+    pixels = np.random.default_rng(0).integers(0, 256, size=(299, 299, 3), dtype=np.uint8)
+    image_bytes = tf.io.encode_jpeg(pixels).numpy()
+    caption_requests_batch(
+        [{'image': image_bytes, 'features': None, 'beam_width': 1, 'length_penalty': 0.6}],
+        inception_model, cnn_encoder, rnn_decoder, tokenizer, model_config)
+    return time.perf_counter() - started
+
+
+def plot_attention(image_path, result_caption, attention_plot, output_path=None):
+    """Menyimpan (atau menampilkan) sprite heatmap attention per kata caption.
+
+    Dirender lewat attention_heatmap.render_attention tanpa matplotlib; tanpa
+    `output_path` sprite dibuka dengan penampil gambar bawaan sistem.
+    """
+    words = result_caption.split()[:attention_plot.shape[0]]
+    if not words:
         print("Warning: Hasil caption kosong, tidak bisa plot attention.")
         return
+    with open(image_path, 'rb') as f:
+        rendered = render_attention(f.read(), words, attention_plot)
+    sprite = Image.open(io.BytesIO(base64.b64decode(rendered['data'])))
+    print(f"Urutan tile ({rendered['columns']} kolom): {' '.join(words)}")
+    if output_path:
+        sprite.save(output_path)
+        print(f"Sprite attention disimpan ke: {output_path}")
+    else:
+        sprite.show()
 
-    cols = int(np.ceil(np.sqrt(len_result)))
-    rows = int(np.ceil(len_result / cols))
 
-    for l_idx, word in enumerate(result_caption.split()):
-        if l_idx >= attention_plot.shape[0]:  
-            break
-      
-        temp_att = np.resize(attention_plot[l_idx], (8, 8))
-        ax = fig.add_subplot(rows, cols, l_idx + 1)
-        ax.set_title(word)
-        img_display = ax.imshow(temp_image)
-        ax.imshow(temp_att, cmap='gray', alpha=0.6,
-                  extent=img_display.get_extent())
-        ax.axis('off')
+# 'numpy': Inception sebagai graph TF, encoder + decoder lewat runtime NumPy (numpy_decoder).
+INFERENCE_MODES = ('eager', 'graph', 'numpy')
 
-    plt.tight_layout()
-    plt.show()
 
+def build_caption_models(config):
+    """Membuat CNN_Encoder dan RNN_Decoder lalu "build" setiap layer dari shape-nya agar bobot bisa dimuat.
 
-def load_model_assets(model_dir='image_captioning_model_assets'):
-    """Memuat semua aset yang diperlukan untuk caption generation."""
+    Urutan variabel sama dengan build lewat forward pass dummy, jadi file
+    .weights.h5 lama tetap cocok, tetapi tanpa menjalankan kernel apa pun.
+    """
+    embedding_dim = config['embedding_dim']
+    units = config['units']
+    attention_features_shape = config['attention_features_shape']
+
+    encoder = CNN_Encoder(embedding_dim)
+    decoder = RNN_Decoder(embedding_dim, units, config['vocab_size'])
+    print("Instance model CNN_Encoder dan RNN_Decoder dibuat.")
+
+    encoder.fc.build((None, attention_features_shape, config['features_shape']))
+    encoder.built = True
+
+    attention = decoder.attention
+    attention.W1.build((None, attention_features_shape, embedding_dim))
+    attention.W2.build((None, 1, units))
+    attention.V.build((None, attention_features_shape, units))
+    attention.built = True
+    decoder.embedding.build((None, 1))
+    # Input GRU = context vector (embedding_dim) digabung embedding token.
+    decoder.gru.build((None, 1, embedding_dim * 2))
+    decoder.fc1.build((None, 1, units))
+    decoder.fc2.build((None, units))
+    decoder.built = True
+    print("Model Encoder dan Decoder dibangun.")
+    return encoder, decoder
+
+
+def _mark_phase(timings, phase, started):
+    """Mencatat durasi fase startup (detik) ke `timings` jika diisi; mengembalikan waktu sekarang."""
+    now = time.perf_counter()
+    if timings is not None:
+        timings[phase] = round(now - started, 4)
+    return now
+
+
+def to_numpy_caption_models(inception_model, encoder, decoder, stateful_gru=False):
+    """Mode 'numpy': Inception di-trace sebagai graph, encoder/decoder diganti versi NumPy.
+
+    `stateful_gru` diteruskan ke NumpyRNNDecoder (lihat numpy_decoder).
+    Mengembalikan (inception_model, encoder, decoder) pengganti.
+    """
+    image_features_fn = inception_model
+    if isinstance(inception_model, tf.keras.Model):
+        image_features_fn = build_image_features_fn(inception_model)
+        image_features_fn.get_concrete_function()
+    print("Encoder dan decoder memakai runtime NumPy.")
+    return (image_features_fn, NumpyCNNEncoder.from_arrays(encoder.get_weights()),
+            NumpyRNNDecoder.from_arrays(decoder.get_weights(), stateful_gru=stateful_gru))
+
+
+def compile_inference_graphs(inception_model, encoder, decoder, tokenizer, config):
+    """Men-trace Inception dan encoder + loop greedy sebagai tf.function.
+
+    Fungsi greedy dipasang di `decoder.greedy_caption_fn`; yang dikembalikan
+    adalah pengganti `inception_model` berupa fungsi graph. Inception yang
+    sudah berupa TFLiteFeatureExtractor dikembalikan apa adanya.
+    """
+    print("Men-trace graph InceptionV3 dan greedy decoding...")
+    image_features_fn = inception_model
+    if isinstance(inception_model, tf.keras.Model):
+        image_features_fn = build_image_features_fn(inception_model)
+        image_features_fn.get_concrete_function()
+    decoder.greedy_caption_fn = build_greedy_caption_fn(
+        encoder, decoder, tokenizer, config)
+    decoder.greedy_caption_fn.get_concrete_function()
+    print("Graph InceptionV3 dan greedy decoding siap.")
+    return image_features_fn
+
+
+def load_vocabulary(model_dir):
+    """Memuat vocab dari `vocab.json` (tanpa Keras/pickle); fallback ke tokenizer.pickle lama.
+
+    Tokenizer pickle dikonversi sekali ke Vocabulary supaya detokenisasi
+    selalu lewat tabel NumPy.
+    """
+    vocab_path = os.path.join(model_dir, 'vocab.json')
+    if os.path.exists(vocab_path):
+        return Vocabulary.load(vocab_path)
+    tokenizer_path = os.path.join(model_dir, 'tokenizer.pickle')
+    if not os.path.exists(tokenizer_path):
+        raise FileNotFoundError(
+            f"Error: File tokenizer '{tokenizer_path}' atau '{vocab_path}' tidak ditemukan.")
+    with open(tokenizer_path, 'rb') as handle:
+        return Vocabulary.from_tokenizer(pickle.load(handle))
+
+
+def load_model_assets(model_dir='image_captioning_model_assets', inference_mode='eager', timings=None,
+                      precision='float32', stateful_gru=False):
+    """Memuat semua aset yang diperlukan untuk caption generation.
+
+    inference_mode='graph' men-trace InceptionV3 serta encoder + loop greedy
+    decoder sekali sebagai tf.function (lihat build_image_features_fn dan
+    build_greedy_caption_fn); model Inception yang dikembalikan berupa fungsi
+    graph tersebut. inference_mode='numpy' juga men-trace InceptionV3, tetapi
+    encoder dan decoder (greedy maupun beam) dijalankan oleh numpy_decoder;
+    `stateful_gru=True` memilih sel GRU yang meneruskan hidden state antar
+    langkah (hanya berlaku pada mode ini).
+
+    precision='int8' atau 'float16' menjalankan InceptionV3 lewat TFLite
+    dengan bobot terkuantisasi (lihat quantized_inception); hasil konversi
+    di-cache sebagai `inception_feature_extractor.<precision>.tflite` di
+    `model_dir`. Encoder dan decoder tetap float32.
+
+    Jika `timings` berupa dict, durasi setiap fase startup (detik) dicatat di
+    dalamnya untuk dibandingkan dengan inference_bundle.load_inference_bundle.
+    """
+    if inference_mode not in INFERENCE_MODES:
+        raise ValueError(
+            f"inference_mode harus salah satu dari {INFERENCE_MODES}, bukan '{inference_mode}'.")
+    if precision not in PRECISIONS:
+        raise ValueError(
+            f"precision harus salah satu dari {PRECISIONS}, bukan '{precision}'.")
     print(f"Memuat aset dari direktori: {model_dir}")
+    load_started = phase_started = time.perf_counter()
 
     if not os.path.exists(model_dir):
         raise FileNotFoundError(
@@ -177,47 +603,33 @@ def load_model_assets(model_dir='image_captioning_model_assets'):
     with open(config_path, 'r') as f:
         config = json.load(f)
     print("Konfigurasi model dimuat.")
+    phase_started = _mark_phase(timings, 'config', phase_started)
 
-    embedding_dim = config['embedding_dim']
-    units = config['units']
-    vocab_size = config['vocab_size']
-    features_shape = config['features_shape']
-    attention_features_shape = config['attention_features_shape']
-
-    tokenizer_path = os.path.join(model_dir, 'tokenizer.pickle')
-    if not os.path.exists(tokenizer_path):
-        raise FileNotFoundError(
-            f"Error: File tokenizer '{tokenizer_path}' tidak ditemukan.")
-    with open(tokenizer_path, 'rb') as handle:
-        tokenizer = pickle.load(handle)
+    tokenizer = load_vocabulary(model_dir)
     print("Tokenizer dimuat.")
-
-    encoder = CNN_Encoder(embedding_dim)
-    decoder = RNN_Decoder(embedding_dim, units, vocab_size)
-    print("Instance model CNN_Encoder dan RNN_Decoder dibuat.")
+    phase_started = _mark_phase(timings, 'tokenizer', phase_started)
 
     inception_model_path = os.path.join(
         model_dir, 'inception_feature_extractor.keras')
-    if not os.path.exists(inception_model_path):
+    tflite_path = os.path.join(
+        model_dir, f'inception_feature_extractor.{precision}.tflite')
+    if not os.path.exists(inception_model_path) and not (
+            precision != 'float32' and os.path.exists(tflite_path)):
         raise FileNotFoundError(
             f"Error: File Inception model '{inception_model_path}' tidak ditemukan.")
-    image_features_extract_model = tf.keras.models.load_model(
-        inception_model_path, compile=False)
-    print("InceptionV3 feature extractor berhasil dimuat.")
-
-    print("Membangun CNN_Encoder...")
-    dummy_encoder_input = tf.random.uniform(
-        shape=[1, attention_features_shape, features_shape])
-    _ = encoder(dummy_encoder_input, training=False)
-
-    print("Membangun RNN_Decoder...")
-    dummy_decoder_token_input = tf.zeros(shape=[1, 1], dtype=tf.int32)
-    dummy_decoder_features_input = tf.random.uniform(
-        shape=[1, attention_features_shape, embedding_dim])
-    dummy_hidden_state = decoder.reset_state(batch_size=1)
-    _ = decoder(dummy_decoder_token_input, dummy_decoder_features_input,
-                dummy_hidden_state, training=False)
-    print("Model Encoder dan Decoder dibangun.")
+    if precision == 'float32':
+        image_features_extract_model = tf.keras.models.load_model(
+            inception_model_path, compile=False)
+    else:
+        image_features_extract_model = load_or_convert_inception(
+            tflite_path,
+            lambda: tf.keras.models.load_model(inception_model_path, compile=False),
+            precision, source_path=inception_model_path)
+    print(f"InceptionV3 feature extractor ({precision}) berhasil dimuat.")
+    phase_started = _mark_phase(timings, 'inception', phase_started)
+
+    encoder, decoder = build_caption_models(config)
+    phase_started = _mark_phase(timings, 'caption_models', phase_started)
 
     encoder_weights_path = os.path.join(model_dir, 'cnn_encoder.weights.h5')
     if not os.path.exists(encoder_weights_path):
@@ -232,7 +644,18 @@ def load_model_assets(model_dir='image_captioning_model_assets'):
             f"Error: File bobot decoder '{decoder_weights_path}' tidak ditemukan.")
     decoder.load_weights(decoder_weights_path)
     print("Bobot RNN_Decoder berhasil dimuat.")
-
+    phase_started = _mark_phase(timings, 'caption_weights', phase_started)
+
+    if inference_mode == 'graph':
+        image_features_extract_model = compile_inference_graphs(
+            image_features_extract_model, encoder, decoder, tokenizer, config)
+        _mark_phase(timings, 'compile', phase_started)
+    elif inference_mode == 'numpy':
+        image_features_extract_model, encoder, decoder = to_numpy_caption_models(
+            image_features_extract_model, encoder, decoder, stateful_gru=stateful_gru)
+        _mark_phase(timings, 'compile', phase_started)
+
+    _mark_phase(timings, 'total', load_started)
     print("Semua aset model berhasil dimuat.")
     return encoder, decoder, tokenizer, image_features_extract_model, config
 
@@ -259,8 +682,7 @@ def main(args):
     attention_features_shape = config['attention_features_shape']
 
     print("Memuat tokenizer...")
-    with open(os.path.join(model_dir, 'tokenizer.pickle'), 'rb') as handle:
-        tokenizer = pickle.load(handle)
+    tokenizer = load_vocabulary(model_dir)
 
     print("Membuat instance model CNN_Encoder dan RNN_Decoder...")
     encoder = CNN_Encoder(embedding_dim)
@@ -316,7 +738,9 @@ def main(args):
         encoder,
         decoder,
         tokenizer,
-        config
+        config,
+        beam_width=args.beam_width,
+        length_penalty=args.length_penalty
     )
 
     print("\nPredicted Caption:")
@@ -328,7 +752,7 @@ def main(args):
         plot_caption_tokens = [word for word in caption.split() if word not in [
             '<start>', '<end>']]
         plot_attention(image_path, ' '.join(
-            plot_caption_tokens), attention_plot)
+            plot_caption_tokens), attention_plot, output_path=args.attention_output)
 
 
 if __name__ == '__main__':
@@ -340,7 +764,13 @@ if __name__ == '__main__':
     parser.add_argument('--image_path', type=str, required=True,
                         help='Path ke gambar yang akan diberi caption.')
     parser.add_argument('--show_attention', action='store_true',
-                        help='Tampilkan plot attention (membutuhkan matplotlib).')
+                        help='Tampilkan sprite heatmap attention per kata.')
+    parser.add_argument('--attention_output', type=str, default=None,
+                        help='Simpan sprite attention (PNG) ke path ini alih-alih menampilkannya.')
+    parser.add_argument('--beam_width', type=int, default=1,
+                        help='Lebar beam search; 1 = greedy decoding.')
+    parser.add_argument('--length_penalty', type=float, default=0.6,
+                        help='Alpha normalisasi panjang untuk beam search.')
 
     # os.environ["CUDA_VISIBLE_DEVICES"] = "-1"
     # print(f"TensorFlow version: {tf.__version__}")
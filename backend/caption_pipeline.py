@@ -0,0 +1,136 @@
+import itertools
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import tensorflow as tf
+
+from caption_generator import (_preprocess_input, features_from_preprocessed,
+                               generate_captions_from_features, clean_caption)
+
+_DONE = object()
+
+
+def _put(q, item, stop):
+    """queue.put yang berhenti menunggu ketika pipeline dihentikan."""
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _decode_stage(images, batch_size, decode_workers, out_queue, stop):
+    """Tahap 1: decode + resize + preprocess paralel, dikelompokkan per batch.
+
+    Gambar dibaca dari iterator secara malas; paling banyak dua batch yang
+    sedang di-decode sekaligus sehingga memori tetap terbatas untuk iterator
+    yang sangat panjang.
+    """
+    try:
+        with ThreadPoolExecutor(max_workers=decode_workers, thread_name_prefix='caption-decode') as pool:
+            iterator = iter(images)
+            pending = None
+            while not stop.is_set():
+                chunk = list(itertools.islice(iterator, batch_size))
+                current = (chunk, [pool.submit(_preprocess_input, image) for image in chunk]) if chunk else None
+                if pending is not None:
+                    items, futures = pending
+                    pixels = []
+                    for future in futures:
+                        try:
+                            pixels.append(future.result())
+                        except Exception as e:
+                            pixels.append(e)
+                    if not _put(out_queue, (items, pixels), stop):
+                        return
+                if current is None:
+                    break
+                pending = current
+        _put(out_queue, _DONE, stop)
+    except Exception as e:
+        _put(out_queue, e, stop)
+
+
+def _feature_stage(inception_model, in_queue, out_queue, stop):
+    """Tahap 2: InceptionV3 untuk setiap batch yang berhasil di-decode."""
+    try:
+        while not stop.is_set():
+            try:
+                batch = in_queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if batch is _DONE or isinstance(batch, Exception):
+                _put(out_queue, batch, stop)
+                return
+            items, pixels = batch
+            valid = [idx for idx, pixel in enumerate(pixels) if not isinstance(pixel, Exception)]
+            features = None
+            if valid:
+                features = features_from_preprocessed(
+                    tf.stack([pixels[idx] for idx in valid]), inception_model)
+            if not _put(out_queue, (items, pixels, valid, features), stop):
+                return
+    except Exception as e:
+        _put(out_queue, e, stop)
+
+
+def caption_pipeline(images, inception_model, cnn_encoder, rnn_decoder, tokenizer, model_config,
+                     batch_size=8, beam_width=1, length_penalty=0.6, decode_workers=None, prefetch=2):
+    """Meng-caption iterator gambar dengan decode, InceptionV3 dan decoder yang saling tumpang tindih.
+
+    Tiga tahap berjalan bersamaan dan dihubungkan antrean berukuran
+    `prefetch` batch: thread pool decode JPEG/PNG (`decode_workers`, default
+    jumlah CPU), satu thread InceptionV3, dan decoder caption di thread
+    pemanggil. Saat batch k di-decode menjadi kata, batch k+1 berada di
+    Inception dan batch k+2 sedang di-decode dari file.
+
+    `images` boleh berisi path, byte gambar atau array piksel dan dibaca
+    secara malas. Menghasilkan tuple (image, caption, error) sesuai urutan
+    input; gambar yang gagal dibaca memberi caption None dan error berisi
+    exception, tanpa menghentikan pipeline.
+    """
+    decoded = queue.Queue(maxsize=prefetch)
+    featurized = queue.Queue(maxsize=prefetch)
+    stop = threading.Event()
+    threads = [
+        threading.Thread(target=_decode_stage, name='caption-pipeline-decode', daemon=True,
+                         args=(images, batch_size, decode_workers or os.cpu_count(), decoded, stop)),
+        threading.Thread(target=_feature_stage, name='caption-pipeline-inception', daemon=True,
+                         args=(inception_model, decoded, featurized, stop)),
+    ]
+    for thread in threads:
+        thread.start()
+    try:
+        while True:
+            batch = featurized.get()
+            if batch is _DONE:
+                return
+            if isinstance(batch, Exception):
+                raise batch
+            items, pixels, valid, features = batch
+            captions = {}
+            if valid:
+                batch_captions, _ = generate_captions_from_features(
+                    features, cnn_encoder, rnn_decoder, tokenizer, model_config,
+                    beam_width=beam_width, length_penalty=length_penalty)
+                captions = dict(zip(valid, batch_captions))
+            for idx, item in enumerate(items):
+                if idx in captions:
+                    yield item, clean_caption(captions[idx]), None
+                else:
+                    yield item, None, pixels[idx]
+    finally:
+        # Konsumen berhenti lebih awal (break/close) atau terjadi error: hentikan tahap lain.
+        stop.set()
+        for q in (decoded, featurized):
+            try:
+                while True:
+                    q.get_nowait()
+            except queue.Empty:
+                pass
+        for thread in threads:
+            thread.join(timeout=5)
@@ -0,0 +1,217 @@
+"""Penyimpanan fitur InceptionV3 dalam satu array float16 ter-memory-map (N x 64 x 2048).
+
+Menggantikan satu file `<gambar>.jpg.npy` per gambar di notebook training:
+semua fitur ada di `features.f16` yang dibaca lewat np.memmap, dan
+`index.json` memetakan path gambar ke nomor baris. Dataset training cukup
+membuka satu file, jadi waktu epoch tidak lagi bergantung pada latensi
+metadata NFS.
+
+Contoh:
+    python feature_store.py --input train2014/ --store features_store --model_dir image_captioning_model_assets
+    python feature_store.py --from_npy train2014/ --store features_store
+"""
+import argparse
+import json
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+STORE_FORMAT_VERSION = 1
+DATA_FILE = 'features.f16'
+INDEX_FILE = 'index.json'
+
+
+class FeatureStore:
+    """Array fitur float16 kontigu + indeks path -> baris, dengan append per batch.
+
+    Data ditulis ke akhir `features.f16` lebih dulu, baru kemudian
+    `index.json` diganti secara atomik; jumlah baris di indeks yang berlaku,
+    jadi sisa data dari append yang terputus diabaikan dan ditimpa pada
+    append berikutnya. Hanya boleh ada satu penulis dalam satu waktu.
+    """
+
+    def __init__(self, store_dir, feature_shape=(64, 2048)):
+        self.store_dir = store_dir
+        self.data_path = os.path.join(store_dir, DATA_FILE)
+        self.index_path = os.path.join(store_dir, INDEX_FILE)
+        os.makedirs(store_dir, exist_ok=True)
+        if os.path.exists(self.index_path):
+            with open(self.index_path, 'r') as f:
+                index = json.load(f)
+            if index.get('version') != STORE_FORMAT_VERSION:
+                raise ValueError(f"Versi feature store {index.get('version')} tidak didukung "
+                                 f"(diharapkan {STORE_FORMAT_VERSION}).")
+            self.feature_shape = tuple(index['feature_shape'])
+            self.paths = index['paths']
+        else:
+            self.feature_shape = tuple(feature_shape)
+            self.paths = []
+        self.row_of = {path: row for row, path in enumerate(self.paths)}
+        self.row_bytes = int(np.prod(self.feature_shape)) * np.dtype(np.float16).itemsize
+        self._view = None
+
+    def __len__(self):
+        return len(self.paths)
+
+    def __contains__(self, path):
+        return path in self.row_of
+
+    @property
+    def array(self):
+        """np.memmap read-only (N, *feature_shape) float16; tidak menyalin data ke RAM."""
+        if self._view is None or self._view.shape[0] != len(self.paths):
+            if not self.paths:
+                return np.zeros((0,) + self.feature_shape, dtype=np.float16)
+            self._view = np.memmap(self.data_path, dtype=np.float16, mode='r',
+                                   shape=(len(self.paths),) + self.feature_shape)
+        return self._view
+
+    def rows(self, paths):
+        """Nomor baris untuk setiap path; KeyError jika ada yang belum diekstrak."""
+        return np.array([self.row_of[path] for path in paths], dtype=np.int64)
+
+    def get(self, path):
+        return self.array[self.row_of[path]]
+
+    def append(self, paths, features):
+        """Menambahkan satu batch fitur (N, *feature_shape); path yang sudah ada dilewati."""
+        features = np.asarray(features).reshape((-1,) + self.feature_shape)
+        keep = [i for i, path in enumerate(paths) if path not in self.row_of]
+        if not keep:
+            return
+        paths = [paths[i] for i in keep]
+        if len(set(paths)) != len(paths):
+            raise ValueError("Path duplikat dalam satu batch append.")
+        with open(self.data_path, 'ab') as f:
+            # Potong sisa append yang tidak sempat tercatat di indeks.
+            f.truncate(len(self.paths) * self.row_bytes)
+            f.write(np.ascontiguousarray(features[keep], dtype=np.float16).tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        for path in paths:
+            self.row_of[path] = len(self.paths)
+            self.paths.append(path)
+        self._write_index()
+
+    def _write_index(self):
+        fd, tmp_path = tempfile.mkstemp(dir=self.store_dir, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump({
+                'version': STORE_FORMAT_VERSION,
+                'dtype': 'float16',
+                'feature_shape': list(self.feature_shape),
+                'paths': self.paths,
+            }, f)
+        os.replace(tmp_path, self.index_path)
+
+    def make_dataset(self, paths, targets, batch_size, shuffle_buffer=None,
+                     drop_remainder=False, seed=None):
+        """tf.data (features float32, target) untuk training, dibaca dari memmap.
+
+        Batch dibentuk dari nomor baris dulu, lalu fitur satu batch diambil
+        dengan satu indexing ke memmap (tanpa membuka file per sampel) dan
+        di-cast ke float32 di dalam graph.
+        """
+        import tensorflow as tf
+
+        rows = self.rows(paths)
+        dataset = tf.data.Dataset.from_tensor_slices((rows, targets))
+        if shuffle_buffer:
+            dataset = dataset.shuffle(shuffle_buffer, seed=seed, reshuffle_each_iteration=True)
+        dataset = dataset.batch(batch_size, drop_remainder=drop_remainder)
+
+        def gather(batch_rows):
+            return self.array[batch_rows]
+
+        def load(batch_rows, batch_targets):
+            features = tf.numpy_function(gather, [batch_rows], tf.float16)
+            features.set_shape((batch_size if drop_remainder else None,) + self.feature_shape)
+            # Target boleh disimpan int16 (TokenizedCaptions); model memakai int32.
+            return tf.cast(features, tf.float32), tf.cast(batch_targets, tf.int32)
+
+        dataset = dataset.map(load, num_parallel_calls=tf.data.AUTOTUNE)
+        return dataset.prefetch(tf.data.AUTOTUNE)
+
+
+def extract_features_to_store(image_paths, inception_model, store, batch_size=16, decode_workers=None):
+    """Menjalankan InceptionV3 untuk gambar yang belum ada di `store` dan menambahkannya per batch.
+
+    Decode berjalan paralel di thread pool; gambar yang gagal dibaca
+    dilewati dan dikembalikan sebagai list (path, error).
+    """
+    import tensorflow as tf
+    from caption_generator import _preprocess_input, features_from_preprocessed
+
+    pending = [path for path in dict.fromkeys(image_paths) if path not in store]
+    failed = []
+    with ThreadPoolExecutor(max_workers=decode_workers or os.cpu_count()) as pool:
+        for start in range(0, len(pending), batch_size):
+            chunk = pending[start:start + batch_size]
+            futures = [pool.submit(_preprocess_input, path) for path in chunk]
+            ok_paths, pixels = [], []
+            for path, future in zip(chunk, futures):
+                try:
+                    pixels.append(future.result())
+                    ok_paths.append(path)
+                except Exception as e:
+                    failed.append((path, f"{type(e).__name__}: {e}"))
+            if ok_paths:
+                store.append(ok_paths, features_from_preprocessed(tf.stack(pixels), inception_model))
+            print(f"[{min(start + batch_size, len(pending))}/{len(pending)}] fitur diekstrak "
+                  f"({len(store)} baris di store).", flush=True)
+    return failed
+
+
+def import_npy_features(image_paths, store, batch_size=256):
+    """Memindahkan cache lama `<gambar>.npy` ke store tanpa menjalankan InceptionV3 lagi."""
+    missing = []
+    pending = [path for path in dict.fromkeys(image_paths) if path not in store]
+    for start in range(0, len(pending), batch_size):
+        paths, features = [], []
+        for path in pending[start:start + batch_size]:
+            if os.path.exists(path + '.npy'):
+                paths.append(path)
+                features.append(np.load(path + '.npy'))
+            else:
+                missing.append(path)
+        if paths:
+            store.append(paths, np.stack(features))
+    return missing
+
+
+def main(args):
+    from bulk_caption import resolve_inputs
+
+    store = FeatureStore(args.store)
+    if args.from_npy:
+        npy_paths = resolve_inputs(os.path.join(args.from_npy, '**', '*.npy'))
+        missing = import_npy_features([path[:-len('.npy')] for path in npy_paths], store)
+        print(f"{len(store)} baris di store, {len(missing)} path tanpa file .npy.")
+        return
+    from caption_generator import load_model_assets
+
+    image_paths = resolve_inputs(args.input)
+    _, _, _, inception_model, _ = load_model_assets(args.model_dir, inference_mode='graph',
+                                                    precision=args.precision)
+    failed = extract_features_to_store(image_paths, inception_model, store, batch_size=args.batch_size)
+    for path, error in failed:
+        print(f"Gagal: {path}: {error}")
+    print(f"Selesai: {len(store)} baris di {args.store}, {len(failed)} gambar gagal.")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Ekstraksi fitur InceptionV3 ke feature store memmap")
+    parser.add_argument('--store', type=str, required=True, help='Direktori feature store.')
+    parser.add_argument('--input', type=str, default=None,
+                        help='Direktori, pola glob atau manifest gambar (lihat bulk_caption.py).')
+    parser.add_argument('--from_npy', type=str, default=None,
+                        help='Impor file <gambar>.npy lama dari direktori ini alih-alih ekstraksi ulang.')
+    parser.add_argument('--model_dir', type=str, default='image_captioning_model_assets')
+    parser.add_argument('--precision', type=str, default='float32', choices=['float32', 'float16', 'int8'])
+    parser.add_argument('--batch_size', type=int, default=16)
+    parsed = parser.parse_args()
+    if not parsed.input and not parsed.from_npy:
+        parser.error("--input atau --from_npy wajib diisi.")
+    main(parsed)
@@ -0,0 +1,72 @@
+import httpx
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+class PooledHttpClient:
+    """httpx.AsyncClient seumur aplikasi untuk satu layanan hulu.
+
+    Koneksi dipakai ulang lintas request (keep-alive) sehingga handshake
+    TCP/TLS hanya dibayar sekali per koneksi. HTTP/2 dipakai jika paket `h2`
+    terpasang dan diminta. Jumlah request dan koneksi baru dicatat lewat
+    trace httpcore untuk stats().
+    """
+
+    def __init__(self, name, max_connections=20, max_keepalive_connections=10,
+                 keepalive_expiry=60.0, connect_timeout=10.0, read_timeout=180.0,
+                 http2=True):
+        self.name = name
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry)
+        self.timeout = httpx.Timeout(
+            connect=connect_timeout, read=read_timeout, write=connect_timeout, pool=connect_timeout)
+        self.http2 = http2 and HTTP2_AVAILABLE
+        self.client = None
+        self._stats = {'requests': 0, 'connections_opened': 0, 'errors': 0}
+
+    async def _trace(self, event_name, info):
+        if event_name == 'connection.connect_tcp.complete':
+            self._stats['connections_opened'] += 1
+
+    async def _on_request(self, request):
+        self._stats['requests'] += 1
+        request.extensions['trace'] = self._trace
+
+    def get(self):
+        """Mengembalikan client bersama, dibuat saat pertama kali dipakai."""
+        if self.client is None:
+            self.client = httpx.AsyncClient(
+                limits=self.limits, timeout=self.timeout, http2=self.http2,
+                event_hooks={'request': [self._on_request]})
+        return self.client
+
+    async def aclose(self):
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+    def record_error(self):
+        self._stats['errors'] += 1
+
+    def stats(self):
+        connections = []
+        if self.client is not None:
+            # httpx tidak punya API publik untuk isi pool; baca dari httpcore jika ada.
+            pool = getattr(self.client._transport, '_pool', None)
+            connections = list(getattr(pool, 'connections', []))
+        requests = self._stats['requests']
+        return dict(self._stats,
+                    name=self.name,
+                    http2_enabled=self.http2,
+                    max_connections=self.limits.max_connections,
+                    max_keepalive_connections=self.limits.max_keepalive_connections,
+                    open_connections=len(connections),
+                    idle_connections=sum(1 for conn in connections if conn.is_idle()),
+                    http2_connections=sum(1 for conn in connections if 'HTTP/2' in conn.info()),
+                    connection_reuse_ratio=(1 - self._stats['connections_opened'] / requests) if requests else 0.0)
@@ -0,0 +1,83 @@
+import io
+import os
+
+import numpy as np
+from PIL import Image, UnidentifiedImageError
+
+DECODE_MIN_SIDE = int(os.getenv("IMAGE_DECODE_MIN_SIDE", "598")) # 2x sisi input InceptionV3; 0 = decode resolusi penuh
+MAX_IMAGE_BYTES = int(os.getenv("IMAGE_MAX_BYTES", str(25 * 1024 * 1024)))
+MAX_IMAGE_PIXELS = int(os.getenv("IMAGE_MAX_PIXELS", "64000000")) # Foto ponsel 48 MP masih lolos
+
+
+class ImageTooLargeError(ValueError):
+    """Payload atau dimensi gambar melewati batas ingest."""
+
+
+class ImageDecodeError(ValueError):
+    """Byte bukan gambar yang dikenali atau isinya rusak/terpotong."""
+
+
+def check_payload_size(num_bytes, max_bytes=MAX_IMAGE_BYTES):
+    """ImageTooLargeError jika `num_bytes` melebihi `max_bytes` (None = tanpa batas)."""
+    if max_bytes is not None and num_bytes > max_bytes:
+        raise ImageTooLargeError(
+            f"Ukuran gambar melebihi batas {max_bytes / (1024 * 1024):.0f} MB.")
+
+
+def open_image(image_bytes, max_bytes=MAX_IMAGE_BYTES, max_pixels=MAX_IMAGE_PIXELS):
+    """Membuka gambar dari byte tanpa men-decode piksel dan memeriksa batasnya.
+
+    PIL hanya membaca header, jadi dimensi diperiksa sebelum memori untuk
+    piksel dialokasikan. Kembalikan objek PIL.Image yang masih lazy.
+    """
+    check_payload_size(len(image_bytes), max_bytes)
+    try:
+        img = Image.open(io.BytesIO(image_bytes))
+    except Image.DecompressionBombError as e:
+        raise ImageTooLargeError(str(e)) from e
+    except UnidentifiedImageError as e:
+        raise ImageDecodeError("Format gambar tidak dikenali.") from e
+    width, height = img.size
+    if max_pixels is not None and width * height > max_pixels:
+        img.close()
+        raise ImageTooLargeError(
+            f"Dimensi gambar {width}x{height} melebihi batas {max_pixels / 1e6:.0f} MP.")
+    return img
+
+
+def jpeg_scale_ratio(size, min_side=DECODE_MIN_SIDE):
+    """Skala DCT libjpeg (1, 2, 4 atau 8) terbesar yang menyisakan kedua sisi `size` >= `min_side`."""
+    scale = min(size[0] // min_side, size[1] // min_side) if min_side else 1
+    return next(ratio for ratio in (8, 4, 2, 1) if ratio <= max(scale, 1))
+
+
+def decode_image(image_bytes, min_side=DECODE_MIN_SIDE, max_bytes=MAX_IMAGE_BYTES,
+                 max_pixels=MAX_IMAGE_PIXELS):
+    """Decode byte gambar menjadi array uint8 HxWx3, diperkecil sedini mungkin.
+
+    Gambar akhirnya di-resize ke 299x299, jadi cukup didecode sampai kedua
+    sisinya masih >= `min_side`. JPEG langsung didecode pada skala DCT 1/2,
+    1/4 atau 1/8 (`Image.draft`, scaling libjpeg) sehingga piksel resolusi
+    penuh tidak pernah dialokasikan; format lain diperkecil dengan
+    `Image.reduce` setelah decode. Orientasi EXIF diabaikan seperti pada
+    `tf.io.decode_image` yang dipakai saat training.
+    """
+    with open_image(image_bytes, max_bytes, max_pixels) as img:
+        if min_side and img.format == 'JPEG':
+            img.draft('RGB', (min_side, min_side))
+        try:
+            rgb = img if img.mode == 'RGB' else img.convert('RGB')
+            factor = min(rgb.size[0] // min_side, rgb.size[1] // min_side) if min_side else 1
+            if factor >= 2:
+                rgb = rgb.reduce(factor)
+            return np.asarray(rgb)
+        except OSError as e:
+            # PIL melaporkan data terpotong/rusak sebagai OSError saat piksel dibaca.
+            raise ImageDecodeError(f"Gambar rusak: {e}") from e
+
+
+def read_image_file(image_path, max_bytes=MAX_IMAGE_BYTES):
+    """Membaca file gambar; ukurannya diperiksa dulu sebelum isinya dibaca."""
+    check_payload_size(os.path.getsize(image_path), max_bytes)
+    with open(image_path, 'rb') as f:
+        return f.read()
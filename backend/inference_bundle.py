@@ -0,0 +1,256 @@
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import tensorflow as tf
+
+from caption_generator import (
+    INFERENCE_MODES, build_caption_models, build_image_features_fn, compile_inference_graphs, load_model_assets,
+    _mark_phase
+)
+from numpy_decoder import NumpyCNNEncoder, NumpyRNNDecoder
+from quantized_inception import PRECISIONS, load_or_convert_inception
+from vocabulary import Vocabulary
+
+BUNDLE_FORMAT_VERSION = 1
+BUNDLE_WEIGHTS_FILE = 'weights.bin'
+BUNDLE_MANIFEST_FILE = 'manifest.json'
+BUNDLE_VOCAB_FILE = 'vocab.json'
+BUNDLE_ALIGNMENT = 64
+# File di direktori aset model yang menjadi sumber bundle (lihat load_model_assets).
+MODEL_ASSET_FILES = (
+    'model_config.json', 'vocab.json', 'tokenizer.pickle', 'inception_feature_extractor.keras',
+    'cnn_encoder.weights.h5', 'rnn_decoder.weights.h5',
+)
+
+
+def export_inference_bundle(bundle_dir, inception_model, cnn_encoder, rnn_decoder, tokenizer, config):
+    """Menulis bundle inferensi siap pakai: satu file bobot kontigu, manifest dan vocab JSON.
+
+    `weights.bin` berisi array bobot Inception, encoder dan decoder berurutan
+    (offset rata 64 byte); `manifest.json` menyimpan config, arsitektur
+    Inception (JSON Keras) serta dtype/shape/offset setiap array; `vocab.json`
+    menggantikan tokenizer.pickle. Bundle dibaca dengan mmap sehingga tidak
+    perlu mem-parse .keras/.h5 maupun menjalankan forward pass dummy.
+    Grup 'numpy_decoder' menyimpan tabel `token_gates` NumpyRNNDecoder
+    (vocab_size x 3*units) supaya runtime NumPy tidak menghitung salinannya
+    sendiri di setiap proses.
+    """
+    os.makedirs(bundle_dir, exist_ok=True)
+    groups = {
+        'inception': inception_model.get_weights(),
+        'encoder': cnn_encoder.get_weights(),
+        'decoder': rnn_decoder.get_weights(),
+    }
+    groups['numpy_decoder'] = [NumpyRNNDecoder.from_arrays(groups['decoder']).token_gates]
+    manifest = {
+        'format_version': BUNDLE_FORMAT_VERSION,
+        'config': config,
+        'inception_architecture': inception_model.to_json(),
+        'tensors': {},
+    }
+    tmp_weights_path = os.path.join(bundle_dir, BUNDLE_WEIGHTS_FILE + '.tmp')
+    offset = 0
+    with open(tmp_weights_path, 'wb') as f:
+        for name, arrays in groups.items():
+            entries = []
+            for array in arrays:
+                array = np.ascontiguousarray(array)
+                padding = -offset % BUNDLE_ALIGNMENT
+                f.write(b'\0' * padding)
+                offset += padding
+                entries.append({'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset})
+                f.write(array.tobytes())
+                offset += array.nbytes
+            manifest['tensors'][name] = entries
+    os.replace(tmp_weights_path, os.path.join(bundle_dir, BUNDLE_WEIGHTS_FILE))
+    Vocabulary.from_tokenizer(tokenizer).save(os.path.join(bundle_dir, BUNDLE_VOCAB_FILE))
+    # Manifest ditulis terakhir: bundle tanpa manifest dianggap belum lengkap.
+    with open(os.path.join(bundle_dir, BUNDLE_MANIFEST_FILE), 'w') as f:
+        json.dump(manifest, f)
+    print(f"Bundle inferensi ({offset / 1e6:.1f} MB) ditulis ke {bundle_dir}")
+    return bundle_dir
+
+
+def bundle_exists(bundle_dir):
+    return os.path.exists(os.path.join(bundle_dir, BUNDLE_MANIFEST_FILE))
+
+
+def bundle_is_current(bundle_dir, model_dir=None):
+    """True jika bundle lengkap, versinya BUNDLE_FORMAT_VERSION dan tidak lebih tua dari aset model.
+
+    Manifest ditulis paling akhir saat ekspor, jadi mtime-nya dibandingkan
+    dengan file MODEL_ASSET_FILES yang ada di `model_dir` (None = tidak dicek).
+    """
+    manifest_path = os.path.join(bundle_dir, BUNDLE_MANIFEST_FILE)
+    try:
+        with open(manifest_path, 'r') as f:
+            format_version = json.load(f).get('format_version')
+    except (OSError, ValueError):
+        return False
+    if format_version != BUNDLE_FORMAT_VERSION:
+        return False
+    if model_dir is None:
+        return True
+    bundle_mtime = os.path.getmtime(manifest_path)
+    asset_paths = [os.path.join(model_dir, name) for name in MODEL_ASSET_FILES]
+    return all(os.path.getmtime(path) <= bundle_mtime for path in asset_paths if os.path.exists(path))
+
+
+def load_bundle_weights(bundle_dir, mode='r'):
+    """Memetakan bobot bundle dengan mmap; mengembalikan (manifest, {grup: [array]}).
+
+    mode='r' menghasilkan array read-only. mode='c' (copy-on-write) dipakai
+    untuk tensor DLPack yang butuh buffer writable; halaman yang tidak pernah
+    ditulis tetap berupa page cache file yang dipakai bersama antar proses.
+    """
+    with open(os.path.join(bundle_dir, BUNDLE_MANIFEST_FILE), 'r') as f:
+        manifest = json.load(f)
+    if manifest.get('format_version') != BUNDLE_FORMAT_VERSION:
+        raise ValueError(
+            f"Versi bundle '{manifest.get('format_version')}' tidak didukung "
+            f"(harus {BUNDLE_FORMAT_VERSION}); ekspor ulang bundle.")
+    buffer = np.memmap(os.path.join(bundle_dir, BUNDLE_WEIGHTS_FILE), dtype=np.uint8, mode=mode)
+    arrays = {}
+    for name, entries in manifest['tensors'].items():
+        arrays[name] = []
+        for entry in entries:
+            dtype = np.dtype(entry['dtype'])
+            count = int(np.prod(entry['shape'], dtype=np.int64))
+            start = entry['offset']
+            view = buffer[start:start + count * dtype.itemsize].view(dtype)
+            arrays[name].append(view.reshape(entry['shape']))
+    return manifest, arrays
+
+
+def build_shared_image_features_fn(architecture_json, arrays):
+    """InceptionV3 sebagai tf.function yang membaca bobotnya langsung dari mmap bundle.
+
+    Model dibangun di dalam StatelessScope tanpa inisialisasi variabel, lalu
+    dijalankan lewat `stateless_call` dengan tensor DLPack yang menunjuk ke
+    `arrays` (view mmap copy-on-write yang tidak pernah ditulis). Bobot tidak
+    disalin ke variabel TF, jadi semua proses worker memakai halaman page
+    cache `weights.bin` yang sama.
+    """
+    with tf.keras.StatelessScope(initialize_variables=False):
+        model = tf.keras.models.model_from_json(architecture_json)
+    values = {id(variable): tf.experimental.dlpack.from_dlpack(np.asarray(array).__dlpack__())
+              for variable, array in zip(model.weights, arrays)}
+    trainable = [values[id(variable)] for variable in model.trainable_variables]
+    non_trainable = [values[id(variable)] for variable in model.non_trainable_variables]
+
+    @tf.function(input_signature=[
+        tf.TensorSpec(shape=[None, 299, 299, 3], dtype=tf.float32)])
+    def image_features(images):
+        # Scope luar mencegah stateless_call menginisialisasi variabel model (bobot acak).
+        with tf.keras.StatelessScope(initialize_variables=False):
+            features, _ = model.stateless_call(trainable, non_trainable, images, training=False)
+        return features
+
+    image_features.get_concrete_function()
+    return image_features
+
+
+def load_inference_bundle(bundle_dir, inference_mode='graph', timings=None, precision='float32',
+                          num_threads=None, share_weights=False, stateful_gru=False):
+    """Memulihkan model dari bundle; hasilnya sama dengan load_model_assets.
+
+    Jika `timings` berupa dict, durasi setiap fase (detik) dicatat di dalamnya:
+    manifest, vocab, caption_models, caption_weights, inception_architecture,
+    inception_weights, compile (mode graph/numpy) dan total.
+
+    precision='int8'/'float16' menjalankan InceptionV3 lewat TFLite (dengan
+    `num_threads` thread); hasil konversi di-cache sebagai
+    `inception.<precision>.tflite` di dalam bundle sehingga hanya dikonversi
+    sekali. Pada mode ini fase Inception dicatat sebagai inception_tflite.
+
+    inference_mode='numpy' membuat encoder/decoder NumPy langsung dari view
+    mmap bundle tanpa model Keras (`stateful_gru` seperti pada
+    load_model_assets). share_weights=True juga menjalankan
+    InceptionV3 float32 dari mmap (build_shared_image_features_fn, fase
+    inception_shared), sehingga bobot tidak disalin per proses; dipakai oleh
+    worker ProcessInferencePool. Pada mode 'graph'/'eager' encoder dan decoder
+    Keras tetap menyalin bobotnya.
+    """
+    if inference_mode not in INFERENCE_MODES:
+        raise ValueError(
+            f"inference_mode harus salah satu dari {INFERENCE_MODES}, bukan '{inference_mode}'.")
+    if precision not in PRECISIONS:
+        raise ValueError(
+            f"precision harus salah satu dari {PRECISIONS}, bukan '{precision}'.")
+    if not bundle_exists(bundle_dir):
+        raise FileNotFoundError(
+            f"Error: Bundle inferensi '{bundle_dir}' tidak ditemukan.")
+    load_started = phase_started = time.perf_counter()
+
+    manifest, arrays = load_bundle_weights(bundle_dir, mode='c' if share_weights else 'r')
+    config = manifest['config']
+    phase_started = _mark_phase(timings, 'manifest', phase_started)
+
+    tokenizer = Vocabulary.load(os.path.join(bundle_dir, BUNDLE_VOCAB_FILE))
+    phase_started = _mark_phase(timings, 'vocab', phase_started)
+
+    # Encoder/decoder Keras dibangun sebelum Inception bersama: build Keras
+    # memakai StatelessScope yang akan menginisialisasi variabel yang tertunda.
+    if inference_mode == 'numpy':
+        encoder = NumpyCNNEncoder.from_arrays(arrays['encoder'])
+        decoder = NumpyRNNDecoder.from_arrays(
+            arrays['decoder'], stateful_gru=stateful_gru, token_gates=arrays.get('numpy_decoder', [None])[0])
+        phase_started = _mark_phase(timings, 'caption_weights', phase_started)
+    else:
+        encoder, decoder = build_caption_models(config)
+        phase_started = _mark_phase(timings, 'caption_models', phase_started)
+        encoder.set_weights(arrays['encoder'])
+        decoder.set_weights(arrays['decoder'])
+        phase_started = _mark_phase(timings, 'caption_weights', phase_started)
+
+    def load_keras_inception():
+        model = tf.keras.models.model_from_json(manifest['inception_architecture'])
+        model.set_weights(arrays['inception'])
+        return model
+
+    if precision == 'float32' and share_weights:
+        inception_model = build_shared_image_features_fn(
+            manifest['inception_architecture'], arrays['inception'])
+        phase_started = _mark_phase(timings, 'inception_shared', phase_started)
+    elif precision == 'float32':
+        inception_model = tf.keras.models.model_from_json(manifest['inception_architecture'])
+        phase_started = _mark_phase(timings, 'inception_architecture', phase_started)
+        inception_model.set_weights(arrays['inception'])
+        phase_started = _mark_phase(timings, 'inception_weights', phase_started)
+    else:
+        inception_model = load_or_convert_inception(
+            os.path.join(bundle_dir, f'inception.{precision}.tflite'), load_keras_inception, precision,
+            source_path=os.path.join(bundle_dir, BUNDLE_WEIGHTS_FILE), num_threads=num_threads)
+        phase_started = _mark_phase(timings, 'inception_tflite', phase_started)
+
+    if inference_mode == 'graph':
+        inception_model = compile_inference_graphs(
+            inception_model, encoder, decoder, tokenizer, config)
+        _mark_phase(timings, 'compile', phase_started)
+    elif inference_mode == 'numpy' and isinstance(inception_model, tf.keras.Model):
+        inception_model = build_image_features_fn(inception_model)
+        inception_model.get_concrete_function()
+        _mark_phase(timings, 'compile', phase_started)
+
+    _mark_phase(timings, 'total', load_started)
+    print(f"Bundle inferensi dimuat dari {bundle_dir}.")
+    return encoder, decoder, tokenizer, inception_model, config
+
+
+def main(args):
+    encoder, decoder, tokenizer, inception_model, config = load_model_assets(args.model_dir)
+    export_inference_bundle(args.output, inception_model, encoder, decoder, tokenizer, config)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Ekspor aset model caption menjadi bundle inferensi siap pakai")
+    parser.add_argument('--model_dir', type=str,
+                        default='image_captioning_model_assets',
+                        help='Direktori aset model (.keras, .weights.h5, tokenizer.pickle).')
+    parser.add_argument('--output', type=str, default='caption_bundle',
+                        help='Direktori tujuan bundle.')
+    main(parser.parse_args())
@@ -1,5 +1,15 @@
+import hashlib
+import hmac
+import json
+import os
+import tempfile
+import threading
+
 from instagrapi import Client
+from instagrapi.exceptions import LoginRequired
 
+# Berisi cookie/token sesi dan hash password: di luar git (lihat .gitignore), dibuat dengan izin 0600.
+SESSION_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".sessions", "ig_session.json")
 
 
 def login_instagram(username: str, password: str) -> Client:
@@ -13,124 +23,133 @@ def upload_image_to_instagram(client: Client, image_path: str, caption: str):
     client.photo_upload(image_path, caption)
 
 
+def _password_digest(password, salt, iterations=100_000):
+    return hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), bytes.fromhex(salt), iterations).hex()
+
+
+class _Account:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.client = None
+        self.verified = None # Digest password yang sudah dicocokkan di proses ini
+
+
+class InstagramClientPool:
+    """Client instagrapi per akun yang dipakai ulang antar request, dengan sesi tersimpan.
+
+    Settings setiap akun (cookie, authorization, uuid perangkat) disimpan di
+    `session_file` setelah login sehingga restart server tidak memicu login
+    penuh. Client yang masih hidup dipakai langsung; sesi hanya diperbarui
+    ketika Instagram menolaknya (LoginRequired), lalu unggahan diulang satu
+    kali. Operasi per akun diserialisasi dengan lock (Client tidak thread-safe),
+    akun berbeda berjalan paralel. Sesi hanya dipakai ulang untuk password
+    yang sama dengan login terakhir yang berhasil (disimpan sebagai hash PBKDF2).
+    """
+
+    def __init__(self, session_file=SESSION_FILE, client_factory=Client):
+        self.session_file = session_file
+        self.client_factory = client_factory
+        self._lock = threading.Lock()
+        self._file_lock = threading.Lock()
+        self._accounts = {}
+        self._sessions = self._read_sessions()
+        self._stats = {'posts': 0, 'client_reuses': 0, 'session_restores': 0, 'logins': 0, 'relogins': 0}
+
+    def _read_sessions(self):
+        if not self.session_file or not os.path.exists(self.session_file):
+            return {}
+        try:
+            with open(self.session_file, encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"File sesi Instagram {self.session_file} tidak bisa dibaca, diabaikan: {e}")
+            return {}
+        if data.get('version') != 1:
+            # Format lama (settings satu akun tanpa username) tidak bisa dipastikan pemiliknya.
+            print(f"File sesi Instagram {self.session_file} berformat lama, akan ditimpa setelah login berikutnya.")
+            return {}
+        return data.get('accounts', {})
+
+    def _save_session(self, username, client, password):
+        salt = os.urandom(16).hex()
+        entry = {'settings': client.get_settings(), 'salt': salt, 'password_hash': _password_digest(password, salt)}
+        with self._file_lock:
+            self._sessions[username] = entry
+            if not self.session_file:
+                return
+            directory = os.path.dirname(os.path.abspath(self.session_file))
+            try:
+                os.makedirs(directory, mode=0o700, exist_ok=True)
+                fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            except OSError as e:
+                print(f"Gagal menyimpan sesi Instagram: {e}")
+                return
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump({'version': 1, 'accounts': self._sessions}, f, default=str)
+                os.replace(tmp_path, self.session_file)
+            except OSError as e:
+                print(f"Gagal menyimpan sesi Instagram: {e}")
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+
+    def _count(self, key):
+        with self._lock:
+            self._stats[key] += 1
+
+    def _account(self, username):
+        with self._lock:
+            return self._accounts.setdefault(username, _Account())
+
+    def _login(self, account, username, password):
+        """Client yang sudah login untuk akun ini; dipanggil dengan account.lock terkunci."""
+        digest = hashlib.sha256(password.encode('utf-8')).hexdigest()
+        if account.client is not None and account.verified is not None and hmac.compare_digest(account.verified, digest):
+            self._count('client_reuses')
+            return account.client
+
+        saved = self._sessions.get(username)
+        if saved is not None and hmac.compare_digest(saved['password_hash'], _password_digest(password, saved['salt'])):
+            # login() memvalidasi sesi tersimpan dengan satu request dan login ulang sendiri jika ditolak.
+            client = self.client_factory(settings=saved['settings'])
+            self._count('session_restores')
+        else:
+            client = self.client_factory()
+            self._count('logins')
+        client.login(username, password)
+        client.relogin_attempt = 0
+        account.client, account.verified = client, digest
+        self._save_session(username, client, password)
+        return client
+
+    def post_photo(self, username, password, image_path, caption):
+        """Mengunggah foto dengan client akun `username`; login hanya jika perlu."""
+        account = self._account(username)
+        with account.lock:
+            client = self._login(account, username, password)
+            try:
+                media = client.photo_upload(image_path, caption)
+            except LoginRequired:
+                print(f"Sesi Instagram {username} ditolak, login ulang lalu unggah sekali lagi.")
+                self._count('relogins')
+                try:
+                    client.relogin()
+                except Exception:
+                    # Client ini tidak dipakai lagi; request berikutnya mulai dari sesi tersimpan/login baru.
+                    account.client, account.verified = None, None
+                    raise
+                client.relogin_attempt = 0
+                self._save_session(username, client, password)
+                media = client.photo_upload(image_path, caption)
+            self._count('posts')
+            return media
+
+    def stats(self):
+        with self._lock:
+            live = sum(1 for account in self._accounts.values() if account.client is not None)
+            return dict(self._stats, live_clients=live, saved_sessions=len(self._sessions))
+
+
 if __name__ == "__main__":
     cl = login_instagram("shortstorydaily_", "titikkoma")
     upload_image_to_instagram(cl, "load.jpg", "Ini caption dari AI 🤖")
-
-
-# # instagram_uploader.py
-# from instagrapi import Client
-# from instagrapi.exceptions import LoginRequired, ChallengeRequired, TwoFactorRequired # Impor exception yang relevan
-# import os
-# import time # Untuk jeda jika diperlukan
-
-# SESSION_FILE = "ig_session.json" # Nama file untuk menyimpan data sesi
-# # File ini akan dibuat di direktori yang sama dengan instagram_uploader.py (yaitu, di dalam backend/)
-
-# def login_instagram(username: str, password: str) -> Client:
-#     cl = Client()
-#     cl.delay_range = [1, 3] # Tambahkan jeda acak kecil antar request internal instagrapi
-
-#     if os.path.exists(SESSION_FILE):
-#         try:
-#             print(f"Mencoba memuat sesi dari {SESSION_FILE}...")
-#             cl.load_settings(SESSION_FILE)
-#             print(f"Sesi dimuat. Mencoba login dengan sesi untuk username: {username}")
-#             # Login masih diperlukan untuk memverifikasi sesi dan mendapatkan data terbaru
-#             # Jika sesi valid, login ini akan cepat dan tidak meminta kredensial ulang (biasanya)
-#             cl.login(username, password)
-#             print("Login dengan sesi berhasil dan sesi terverifikasi.")
-
-#             # Lakukan operasi ringan untuk memastikan sesi benar-benar aktif
-#             # Contoh: cl.get_timeline_feed(amount=1)
-#             # Atau:
-#             # user_id = cl.user_id_from_username(username)
-#             # print(f"User ID berhasil didapatkan: {user_id}. Sesi aktif.")
-
-#         except LoginRequired:
-#             print("Sesi tidak valid atau kedaluwarsa (LoginRequired). Melakukan login baru...")
-#             # Hapus file sesi yang tidak valid agar tidak dicoba lagi
-#             if os.path.exists(SESSION_FILE):
-#                 os.remove(SESSION_FILE)
-#             cl.login(username, password) # Lakukan login standar
-#             print("Login baru berhasil.")
-#         except ChallengeRequired as e:
-#             print(f"ChallengeRequired saat mencoba menggunakan sesi: {e}. Ini berarti Instagram meminta verifikasi.")
-#             print("Anda mungkin perlu memasukkan kode verifikasi di terminal jika ini adalah proses interaktif.")
-#             print("Menghapus sesi lama dan mencoba login baru yang mungkin memicu input kode.")
-#             if os.path.exists(SESSION_FILE):
-#                 os.remove(SESSION_FILE)
-#             # Pada titik ini, jika challenge terjadi, instagrapi akan mem-print prompt untuk input kode di terminal
-#             # di mana server FastAPI (app.py) berjalan.
-#             cl.login(username, password)
-#             print("Login baru setelah challenge berhasil (atau menunggu input kode).")
-
-#         except TwoFactorRequired as e:
-#             print(f"TwoFactorRequired saat mencoba menggunakan sesi: {e}.")
-#             print("Akun ini menggunakan 2FA yang mungkin memerlukan input kode dari aplikasi authenticator atau SMS.")
-#             print("Menghapus sesi lama dan mencoba login baru yang mungkin memicu input kode 2FA.")
-#             if os.path.exists(SESSION_FILE):
-#                 os.remove(SESSION_FILE)
-#             # Instagrapi akan meminta input kode 2FA di terminal
-#             cl.login(username, password)
-#             print("Login baru setelah permintaan 2FA berhasil (atau menunggu input kode).")
-
-#         except Exception as e:
-#             print(f"Terjadi error tidak terduga saat memuat atau memverifikasi sesi: {e}")
-#             print("Mencoba melakukan login baru sebagai fallback.")
-#             if os.path.exists(SESSION_FILE):
-#                 os.remove(SESSION_FILE) # Hapus sesi bermasalah
-#             cl.login(username, password)
-#             print("Login baru (fallback) berhasil.")
-#     else:
-#         print(f"File sesi '{SESSION_FILE}' tidak ditemukan. Melakukan login baru untuk username: {username}")
-#         cl.login(username, password)
-#         print("Login baru berhasil.")
-
-#     # Selalu simpan/perbarui sesi setelah login berhasil
-#     try:
-#         print(f"Menyimpan/memperbarui sesi ke {SESSION_FILE}")
-#         cl.dump_settings(SESSION_FILE)
-#     except Exception as e:
-#         print(f"Gagal menyimpan sesi: {e}")
-#         # Ini tidak fatal, aplikasi masih bisa berjalan, tapi sesi tidak akan persisten
-
-#     return cl
-
-# def upload_image_to_instagram(client: Client, image_path: str, caption: str):
-#     print(f"Mengunggah gambar '{image_path}' dengan caption: '{caption[:70]}...'")
-#     try:
-#         media = client.photo_upload(image_path, caption[:2200])
-#         print(f"Gambar '{image_path}' berhasil diunggah. Media ID: {media.id if media else 'N/A'}")
-#     except Exception as e:
-#         print(f"Gagal mengunggah gambar '{image_path}': {e}")
-#         raise # Re-throw exception agar bisa ditangani oleh pemanggil (app.py)
-
-# if __name__ == "__main__":
-#     # Contoh penggunaan untuk testing langsung file ini
-#     # Ganti dengan username dan password Anda yang valid
-#     test_username = "roy_kiyoshin1"  # Ganti ini
-#     test_password = "roy123"  # Ganti ini
-#     test_image = "path/ke/gambar/tes.jpg" # Ganti dengan path gambar valid
-#     test_caption = "Caption tes dari skrip instagram_uploader.py 🤖"
-
-#     if test_username == "roy_kiyoshin1" or test_password == "roy123":
-#         print("Harap ganti USERNAME_ANDA dan PASSWORD_ANDA di bagian __main__ untuk testing.")
-#     elif not os.path.exists(test_image):
-#         print(f"File gambar tes '{test_image}' tidak ditemukan. Harap sediakan path yang benar.")
-#     else:
-#         print(f"Memulai tes login untuk {test_username}...")
-#         try:
-#             cl = login_instagram(test_username, test_password)
-#             print(f"Login berhasil. Mencoba mengunggah {test_image}...")
-#             upload_image_to_instagram(cl, test_image, test_caption)
-#             print("Tes unggah gambar selesai.")
-#         except ChallengeRequired:
-#             print("Tes dihentikan karena Instagram meminta Challenge (misalnya, input kode verifikasi).")
-#             print("Jika ini adalah server, kode harus dimasukkan di terminal server.")
-#         except TwoFactorRequired:
-#             print("Tes dihentikan karena Instagram meminta kode Two-Factor Authentication.")
-#         except LoginRequired:
-#             print("Tes gagal: LoginRequired. Periksa username/password.")
-#         except Exception as e:
-#             print(f"Tes gagal dengan error: {e}")
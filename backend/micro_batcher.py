@@ -0,0 +1,201 @@
+import asyncio
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List
+
+
+class QueueFullError(Exception):
+    """Antrean batcher penuh; request sebaiknya dicoba lagi setelah `retry_after` detik."""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Antrean inferensi penuh, coba lagi dalam {retry_after} detik.")
+        self.retry_after = retry_after
+
+
+class MicroBatcher:
+    """Menggabungkan request yang datang bersamaan menjadi satu panggilan batch.
+
+    `batch_fn` menerima list item dan mengembalikan list hasil dengan urutan
+    yang sama. Batch dikirim ketika sudah berisi `max_batch_size` item atau
+    ketika item pertama sudah menunggu `max_wait_ms` milidetik.
+
+    `batch_fn` dijalankan di thread pool khusus berukuran `num_workers` agar
+    inferensi yang blocking tidak menahan event loop. Antrean dibatasi
+    `max_queue_size` item (0 = tanpa batas); jika penuh, submit() langsung
+    melempar QueueFullError alih-alih menumpuk latensi.
+    """
+
+    def __init__(self, batch_fn: Callable[[List[Any]], List[Any]],
+                 max_batch_size: int = 8, max_wait_ms: float = 10.0,
+                 num_workers: int = 1, max_queue_size: int = 64):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size harus >= 1")
+        if num_workers < 1:
+            raise ValueError("num_workers harus >= 1")
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.num_workers = num_workers
+        self.max_queue_size = max_queue_size
+        self._executor = None
+        self._queue = None
+        self._workers = []
+        self._in_flight = 0
+        self._stats = {
+            'submitted': 0,
+            'rejected': 0,
+            'batches': 0,
+            'batched_items': 0,
+            'wait_ms_total': 0.0,
+            'wait_ms_max': 0.0,
+            'batch_ms_total': 0.0,
+        }
+
+    def _ensure_started(self):
+        if self._workers and not all(worker.done() for worker in self._workers):
+            return
+        loop = asyncio.get_running_loop()
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.num_workers, thread_name_prefix='caption-inference')
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._workers = [loop.create_task(self._run())
+                         for _ in range(self.num_workers)]
+
+    def retry_after_seconds(self):
+        """Perkiraan kasar (detik) sampai antrean saat ini selesai diproses."""
+        batches = self._stats['batches']
+        avg_batch_s = (self._stats['batch_ms_total'] / batches / 1000.0) if batches else 1.0
+        queued = self._queue.qsize() if self._queue is not None else 0
+        pending_batches = queued / (self.max_batch_size * self.num_workers)
+        return max(1, math.ceil(pending_batches * avg_batch_s))
+
+    async def submit(self, item):
+        """Memasukkan satu item ke antrean dan menunggu hasilnya."""
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait((item, future, time.perf_counter()))
+        except asyncio.QueueFull:
+            self._stats['rejected'] += 1
+            raise QueueFullError(self.retry_after_seconds())
+        self._stats['submitted'] += 1
+        return await future
+
+    async def submit_many(self, items):
+        """Memasukkan beberapa item sekaligus (mis. satu set gambar) dan menunggu semua hasilnya.
+
+        Item dimasukkan berurutan tanpa jeda sehingga terambil bersama ke batch
+        yang sama (dipecah per `max_batch_size`). Ditolak seluruhnya dengan
+        QueueFullError jika sisa kapasitas antrean tidak cukup. Hasil sesuai
+        urutan `items`; item yang gagal dikembalikan sebagai objek Exception.
+        """
+        self._ensure_started()
+        if self.max_queue_size and self._queue.qsize() + len(items) > self.max_queue_size:
+            self._stats['rejected'] += len(items)
+            raise QueueFullError(self.retry_after_seconds())
+        loop = asyncio.get_running_loop()
+        enqueued = time.perf_counter()
+        futures = []
+        for item in items:
+            future = loop.create_future()
+            self._queue.put_nowait((item, future, enqueued))
+            futures.append(future)
+        self._stats['submitted'] += len(items)
+        return await asyncio.gather(*futures, return_exceptions=True)
+
+    async def _collect_batch(self):
+        batch = [await self._queue.get()]
+        deadline = asyncio.get_running_loop().time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - asyncio.get_running_loop().time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect_batch()
+            items = [item for item, _, _ in batch]
+            futures = [future for _, future, _ in batch]
+
+            started = time.perf_counter()
+            for _, _, enqueued in batch:
+                wait_ms = (started - enqueued) * 1000.0
+                self._stats['wait_ms_total'] += wait_ms
+                self._stats['wait_ms_max'] = max(self._stats['wait_ms_max'], wait_ms)
+            self._stats['batches'] += 1
+            self._stats['batched_items'] += len(items)
+
+            self._in_flight += len(items)
+            try:
+                results = await loop.run_in_executor(self._executor, self._run_batch, items)
+            except Exception as e:
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            finally:
+                self._in_flight -= len(items)
+                self._stats['batch_ms_total'] += (time.perf_counter() - started) * 1000.0
+            for future, result in zip(futures, results):
+                if future.done():
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+    def _run_batch(self, items):
+        try:
+            return self.batch_fn(items)
+        except Exception:
+            if len(items) == 1:
+                raise
+        # Satu item rusak (mis. gambar tidak valid) tidak boleh menggagalkan
+        # seluruh batch: ulangi per item supaya error hanya kembali ke pemiliknya.
+        results = []
+        for item in items:
+            try:
+                results.append(self.batch_fn([item])[0])
+            except Exception as e:
+                results.append(e)
+        return results
+
+    def stats(self):
+        """Kedalaman antrean, waktu tunggu dan ukuran batch untuk sizing worker."""
+        batches = self._stats['batches']
+        batched_items = self._stats['batched_items']
+        return {
+            'queue_depth': self._queue.qsize() if self._queue is not None else 0,
+            'max_queue_size': self.max_queue_size,
+            'in_flight': self._in_flight,
+            'num_workers': self.num_workers,
+            'submitted': self._stats['submitted'],
+            'rejected': self._stats['rejected'],
+            'batches': batches,
+            'avg_batch_size': batched_items / batches if batches else 0.0,
+            'avg_wait_ms': self._stats['wait_ms_total'] / batched_items if batched_items else 0.0,
+            'max_wait_ms': self._stats['wait_ms_max'],
+            'avg_batch_ms': self._stats['batch_ms_total'] / batches if batches else 0.0,
+        }
+
+    async def close(self):
+        """Menghentikan worker batch dan thread pool inferensi."""
+        for worker in self._workers:
+            worker.cancel()
+        for worker in self._workers:
+            try:
+                await worker
+            except asyncio.CancelledError:
+                pass
+        self._workers = []
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
@@ -0,0 +1,379 @@
+"""Runtime NumPy untuk CNN_Encoder + RNN_Decoder: decoding caption tanpa TensorFlow.
+
+Decoder caption hanya berisi Embedding, satu langkah GRU, dua Dense dan
+attention Bahdanau, jadi setiap langkah bisa dijalankan sebagai beberapa
+operasi BLAS di atas array NumPy biasa tanpa overhead dispatch layer Keras
+per token. Modul ini tidak mengimpor TensorFlow: bobot dibaca langsung dari
+`cnn_encoder.weights.h5` / `rnn_decoder.weights.h5` (h5py) atau dari array
+`get_weights()` model Keras.
+
+Catatan GRU: RNN_Decoder.call memanggil `self.gru(x)` tanpa
+`initial_state`, jadi pada model Keras (dan saat training) GRU selalu mulai
+dari state nol di setiap langkah; `hidden` yang dibawa antar langkah hanya
+dipakai attention. Default `stateful_gru=False` meniru perilaku itu supaya
+hasilnya sama dengan bobot yang sudah dilatih. `stateful_gru=True`
+meneruskan `hidden` ke sel GRU (seperti GRU dengan initial_state) dan hanya
+tepat untuk bobot yang dilatih dengan cara itu.
+
+Contoh (fitur dari FeatureStore, tanpa TensorFlow):
+    python numpy_decoder.py --model_dir image_captioning_model_assets --feature_store processed_features --limit 8
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+
+# Urutan array `get_weights()` RNN_Decoder (sama dengan urutan di bundle inferensi).
+DECODER_WEIGHT_NAMES = (
+    'embedding',
+    'gru_kernel', 'gru_recurrent_kernel', 'gru_bias',
+    'fc1_kernel', 'fc1_bias',
+    'fc2_kernel', 'fc2_bias',
+    'W1_kernel', 'W1_bias',
+    'W2_kernel', 'W2_bias',
+    'V_kernel', 'V_bias',
+)
+ENCODER_WEIGHT_NAMES = ('fc_kernel', 'fc_bias')
+
+# Path dataset di file .weights.h5 Keras 3 (nama atribut layer di kelas model).
+_DECODER_H5_PATHS = {
+    'embedding': 'embedding/vars/0',
+    'gru_kernel': 'gru/cell/vars/0',
+    'gru_recurrent_kernel': 'gru/cell/vars/1',
+    'gru_bias': 'gru/cell/vars/2',
+    'fc1_kernel': 'fc1/vars/0', 'fc1_bias': 'fc1/vars/1',
+    'fc2_kernel': 'fc2/vars/0', 'fc2_bias': 'fc2/vars/1',
+    'W1_kernel': 'attention/W1/vars/0', 'W1_bias': 'attention/W1/vars/1',
+    'W2_kernel': 'attention/W2/vars/0', 'W2_bias': 'attention/W2/vars/1',
+    'V_kernel': 'attention/V/vars/0', 'V_bias': 'attention/V/vars/1',
+}
+_ENCODER_H5_PATHS = {'fc_kernel': 'fc/vars/0', 'fc_bias': 'fc/vars/1'}
+
+
+def read_h5_weights(path, dataset_paths):
+    """Membaca array bobot dari file .weights.h5 Keras 3 menjadi dict nama -> array float32."""
+    try:
+        import h5py
+    except ImportError as e:
+        raise ImportError("Membaca .weights.h5 tanpa TensorFlow membutuhkan paket h5py.") from e
+    with h5py.File(path, 'r') as f:
+        missing = [dataset for dataset in dataset_paths.values() if dataset not in f]
+        if missing:
+            raise ValueError(f"Format bobot '{path}' tidak dikenali (tidak ada {missing[0]}); "
+                             f"simpan ulang dengan Keras 3 (model.save_weights).")
+        return {name: np.asarray(f[dataset], dtype=np.float32) for name, dataset in dataset_paths.items()}
+
+
+def length_penalty_factor(length, alpha):
+    """Penalti panjang ala GNMT: ((5 + panjang) / 6) ** alpha."""
+    return ((5.0 + length) / 6.0) ** alpha
+
+
+def _sigmoid(x):
+    return 0.5 * (np.tanh(0.5 * x) + 1.0)
+
+
+def _log_softmax(logits):
+    shifted = logits - logits.max(axis=-1, keepdims=True)
+    return shifted - np.log(np.exp(shifted).sum(axis=-1, keepdims=True))
+
+
+class NumpyCNNEncoder:
+    """CNN_Encoder versi NumPy: relu(features @ kernel + bias)."""
+
+    def __init__(self, weights):
+        self.kernel = np.ascontiguousarray(weights['fc_kernel'], dtype=np.float32)
+        self.bias = np.asarray(weights['fc_bias'], dtype=np.float32)
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        return cls(dict(zip(ENCODER_WEIGHT_NAMES, arrays)))
+
+    @classmethod
+    def from_h5(cls, path):
+        return cls(read_h5_weights(path, _ENCODER_H5_PATHS))
+
+    def __call__(self, img_features, training=False):
+        x = np.asarray(img_features, dtype=np.float32) @ self.kernel
+        x += self.bias
+        return np.maximum(x, 0.0, out=x)
+
+
+class NumpyRNNDecoder:
+    """RNN_Decoder versi NumPy dengan langkah decode ter-vektorisasi untuk satu batch gambar.
+
+    Kernel GRU dipecah menjadi bagian context vector dan bagian embedding;
+    bagian embedding di-precompute untuk seluruh vocab (`embedding @ kernel`),
+    sehingga kontribusi token input di setiap langkah cukup berupa lookup baris.
+    """
+
+    def __init__(self, weights, stateful_gru=False):
+        self.stateful_gru = stateful_gru
+        self.embedding = np.asarray(weights['embedding'], dtype=np.float32)
+        self.vocab_size, embedding_dim = self.embedding.shape
+        kernel = np.asarray(weights['gru_kernel'], dtype=np.float32)
+        self.units = kernel.shape[1] // 3
+        if kernel.shape[0] != 2 * embedding_dim:
+            raise ValueError(f"Kernel GRU {kernel.shape} tidak cocok dengan embedding_dim {embedding_dim}.")
+        gru_bias = np.asarray(weights['gru_bias'], dtype=np.float32)
+        # Input GRU = concat(context_vector, embedding token), lihat RNN_Decoder.call.
+        self.gru_context_kernel = np.ascontiguousarray(kernel[:embedding_dim])
+        if 'token_gates' in weights:
+            # Sudah di-precompute (bundle inferensi), bisa langsung berupa view mmap.
+            self.token_gates = np.asarray(weights['token_gates'], dtype=np.float32)
+        else:
+            self.token_gates = self.embedding @ kernel[embedding_dim:] + gru_bias[0]
+        self.gru_recurrent_kernel = np.ascontiguousarray(weights['gru_recurrent_kernel'], dtype=np.float32)
+        self.gru_recurrent_bias = gru_bias[1]
+        self.fc1_kernel = np.ascontiguousarray(weights['fc1_kernel'], dtype=np.float32)
+        self.fc1_bias = np.asarray(weights['fc1_bias'], dtype=np.float32)
+        self.fc2_kernel = np.ascontiguousarray(weights['fc2_kernel'], dtype=np.float32)
+        self.fc2_bias = np.asarray(weights['fc2_bias'], dtype=np.float32)
+        self.W1_kernel = np.ascontiguousarray(weights['W1_kernel'], dtype=np.float32)
+        self.W1_bias = np.asarray(weights['W1_bias'], dtype=np.float32)
+        self.W2_kernel = np.ascontiguousarray(weights['W2_kernel'], dtype=np.float32)
+        self.W2_bias = np.asarray(weights['W2_bias'], dtype=np.float32)
+        self.V_kernel = np.ascontiguousarray(weights['V_kernel'][:, 0], dtype=np.float32)
+
+    @classmethod
+    def from_arrays(cls, arrays, stateful_gru=False, token_gates=None):
+        """Dari list `RNN_Decoder.get_weights()` (atau grup 'decoder' bundle inferensi).
+
+        `token_gates` opsional: tabel (vocab_size, 3 * units) hasil precompute
+        sebelumnya, misalnya dari bundle inferensi.
+        """
+        weights = dict(zip(DECODER_WEIGHT_NAMES, arrays))
+        if token_gates is not None:
+            weights['token_gates'] = token_gates
+        return cls(weights, stateful_gru=stateful_gru)
+
+    @classmethod
+    def from_h5(cls, path, stateful_gru=False):
+        return cls(read_h5_weights(path, _DECODER_H5_PATHS), stateful_gru=stateful_gru)
+
+    def reset_state(self, batch_size):
+        return np.zeros((batch_size, self.units), dtype=np.float32)
+
+    def precompute_attention_keys(self, features):
+        """W1(features) (batch, 64, units), dihitung sekali per gambar."""
+        keys = features @ self.W1_kernel
+        keys += self.W1_bias
+        return keys
+
+    def gru_cell(self, input_gates, hidden):
+        """Satu langkah sel GRU Keras (reset_after=True, urutan gate z, r, h).
+
+        `input_gates` = x @ kernel + bias_input (batch, 3 * units).
+        """
+        units = self.units
+        if hidden is None:
+            # State nol: kontribusi recurrent hanya bias-nya.
+            recurrent = np.broadcast_to(self.gru_recurrent_bias, input_gates.shape)
+        else:
+            recurrent = hidden @ self.gru_recurrent_kernel
+            recurrent += self.gru_recurrent_bias
+        z = _sigmoid(input_gates[:, :units] + recurrent[:, :units])
+        r = _sigmoid(input_gates[:, units:2 * units] + recurrent[:, units:2 * units])
+        candidate = np.tanh(input_gates[:, 2 * units:] + r * recurrent[:, 2 * units:])
+        if hidden is None:
+            return (1.0 - z) * candidate
+        return z * hidden + (1.0 - z) * candidate
+
+    def step(self, token_ids, features, hidden, attention_keys):
+        """Satu langkah decode untuk batch: (logits, hidden baru, bobot attention (batch, 64))."""
+        score = hidden @ self.W2_kernel
+        score += self.W2_bias
+        score = np.add(attention_keys, score[:, None, :])
+        score = np.tanh(score, out=score) @ self.V_kernel
+        # Bias V sama untuk semua lokasi, jadi tidak mengubah softmax.
+        score -= score.max(axis=1, keepdims=True)
+        attention_weights = np.exp(score)
+        attention_weights /= attention_weights.sum(axis=1, keepdims=True)
+        context_vector = np.matmul(attention_weights[:, None, :], features)[:, 0]
+
+        input_gates = context_vector @ self.gru_context_kernel
+        input_gates += self.token_gates[token_ids]
+        hidden = self.gru_cell(input_gates, hidden if self.stateful_gru else None)
+        x = hidden @ self.fc1_kernel
+        x += self.fc1_bias
+        logits = x @ self.fc2_kernel
+        logits += self.fc2_bias
+        return logits, hidden, attention_weights
+
+    def greedy_decode(self, features, start_id, end_id, max_length):
+        """Greedy decoding; keluaran sama dengan caption_generator._greedy_decode_eager.
+
+        Berbeda dengan loop TF yang tetap menghitung baris yang sudah selesai,
+        baris yang sudah menghasilkan '<end>' dikeluarkan dari batch sehingga
+        langkah berikutnya hanya menghitung caption yang masih berjalan.
+        """
+        batch_size, attention_features_shape = features.shape[0], features.shape[1]
+        attention_keys = self.precompute_attention_keys(features)
+        hidden = self.reset_state(batch_size)
+        token_ids = np.full(batch_size, start_id, dtype=np.int64)
+        result_ids = np.full((batch_size, max_length), end_id, dtype=np.int64)
+        attention_plots = np.zeros((batch_size, max_length, attention_features_shape))
+        lengths = np.full(batch_size, max_length)
+        active = np.arange(batch_size)
+        for i in range(max_length):
+            logits, hidden, attention_weights = self.step(token_ids, features, hidden, attention_keys)
+            attention_plots[active, i] = attention_weights
+            token_ids = logits.argmax(axis=-1)
+            result_ids[active, i] = token_ids
+            ended = token_ids == end_id
+            if ended.any():
+                lengths[active[ended]] = i + 1
+                keep = ~ended
+                if not keep.any():
+                    break
+                active, token_ids, hidden = active[keep], token_ids[keep], hidden[keep]
+                features, attention_keys = features[keep], attention_keys[keep]
+        return result_ids, lengths, attention_plots
+
+    def beam_search_decode(self, features, start_id, end_id, max_length, beam_width, length_penalty):
+        """Beam search di atas `step`; lihat beam_search."""
+        batch_size = features.shape[0]
+        attention_keys = np.repeat(self.precompute_attention_keys(features), beam_width, axis=0)
+        features = np.repeat(features, beam_width, axis=0)
+        state = {'hidden': self.reset_state(batch_size * beam_width)}
+
+        def step(token_ids, beam_rows):
+            hidden = state['hidden'] if beam_rows is None else state['hidden'][beam_rows]
+            logits, state['hidden'], attention_weights = self.step(token_ids, features, hidden, attention_keys)
+            return _log_softmax(logits), attention_weights
+
+        return beam_search(step, batch_size, beam_width, start_id, end_id, max_length,
+                           features.shape[1], length_penalty)
+
+    def decode(self, features, start_id, end_id, max_length, beam_width=1, length_penalty=0.6):
+        features = np.asarray(features, dtype=np.float32)
+        if beam_width > 1:
+            return self.beam_search_decode(features, start_id, end_id, max_length, beam_width, length_penalty)
+        return self.greedy_decode(features, start_id, end_id, max_length)
+
+
+def beam_search(step, batch_size, beam_width, start_id, end_id, max_length, attention_features_shape,
+                length_penalty):
+    """Beam search untuk satu batch gambar, terlepas dari backend decoder.
+
+    `step(token_ids, beam_rows)` menjalankan satu langkah decoder untuk
+    batch_size * beam_width baris dan mengembalikan (log_probs (baris, vocab),
+    bobot attention (baris, 64)); `beam_rows` (None di langkah pertama) adalah
+    baris asal setiap beam, untuk menyusun ulang state decoder sebelum langkah.
+    Skor hipotesis dinormalisasi dengan length_penalty_factor; pencarian untuk
+    satu gambar berhenti begitu sudah ada `beam_width` hipotesis yang
+    berakhir '<end>'.
+    """
+    # Di awal semua beam identik, jadi hanya beam pertama yang boleh diekspansi.
+    scores = np.full((batch_size, beam_width), -np.inf)
+    scores[:, 0] = 0.0
+    sequences = np.zeros((batch_size, beam_width, 0), dtype=np.int64)
+    attentions = np.zeros((batch_size, beam_width, 0, attention_features_shape))
+    hypotheses = [[] for _ in range(batch_size)]
+    done = np.zeros(batch_size, dtype=bool)
+    token_ids = np.full((batch_size, beam_width), start_id, dtype=np.int64)
+    beam_rows = None
+
+    for i in range(max_length):
+        log_probs, attention_weights = step(token_ids.reshape(-1), beam_rows)
+        vocab_size = log_probs.shape[-1]
+        attention_weights = np.asarray(attention_weights).reshape(batch_size, beam_width, -1)
+
+        candidates = scores[:, :, None] + log_probs.reshape(batch_size, beam_width, vocab_size)
+        candidates = candidates.reshape(batch_size, -1)
+        top = np.argpartition(-candidates, beam_width - 1, axis=1)[:, :beam_width]
+        top = np.take_along_axis(
+            top, np.argsort(-np.take_along_axis(candidates, top, axis=1), axis=1), axis=1)
+        beam_idx, token_ids = np.divmod(top, vocab_size)
+
+        scores = np.take_along_axis(candidates, top, axis=1)
+        rows = np.arange(batch_size)[:, None]
+        sequences = np.concatenate(
+            [sequences[rows, beam_idx], token_ids[:, :, None]], axis=2)
+        attentions = np.concatenate(
+            [attentions[rows, beam_idx],
+             attention_weights[rows, beam_idx][:, :, None, :]], axis=2)
+
+        for b, k in zip(*np.nonzero((token_ids == end_id) & np.isfinite(scores))):
+            if not done[b]:
+                hypotheses[b].append((scores[b, k] / length_penalty_factor(i + 1, length_penalty),
+                                      sequences[b, k], attentions[b, k]))
+        # Beam yang sudah '<end>' dimatikan; skor -inf tidak akan terpilih lagi.
+        scores[token_ids == end_id] = -np.inf
+        done |= np.array([len(h) >= beam_width for h in hypotheses])
+        done |= ~np.isfinite(scores).any(axis=1)
+        if done.all():
+            break
+
+        beam_rows = (np.arange(batch_size)[:, None] * beam_width + beam_idx).reshape(-1)
+
+    result_ids = np.full((batch_size, max_length), end_id, dtype=np.int64)
+    lengths = np.zeros(batch_size, dtype=np.int64)
+    attention_plots = np.zeros((batch_size, max_length, attention_features_shape))
+    for b in range(batch_size):
+        candidates = list(hypotheses[b])
+        if not candidates:
+            # Tidak ada beam yang mencapai '<end>' dalam max_length langkah.
+            length = sequences.shape[2]
+            candidates = [(scores[b, k] / length_penalty_factor(length, length_penalty),
+                           sequences[b, k], attentions[b, k])
+                          for k in range(beam_width) if np.isfinite(scores[b, k])]
+        _, ids, attention = max(candidates, key=lambda hyp: hyp[0])
+        lengths[b] = len(ids)
+        result_ids[b, :len(ids)] = ids
+        attention_plots[b, :len(ids)] = attention
+    return result_ids, lengths, attention_plots
+
+
+def load_numpy_caption_models(model_dir, stateful_gru=False):
+    """Memuat (encoder, decoder, vocab, config) NumPy dari direktori aset model, tanpa TensorFlow."""
+    from vocabulary import Vocabulary
+
+    with open(os.path.join(model_dir, 'model_config.json'), 'r') as f:
+        config = json.load(f)
+    vocab_path = os.path.join(model_dir, 'vocab.json')
+    if not os.path.exists(vocab_path):
+        raise FileNotFoundError(
+            f"Error: '{vocab_path}' tidak ditemukan; runtime NumPy tidak membaca tokenizer.pickle "
+            f"(ekspor dengan training.py atau Vocabulary.from_tokenizer(...).save).")
+    encoder = NumpyCNNEncoder.from_h5(os.path.join(model_dir, 'cnn_encoder.weights.h5'))
+    decoder = NumpyRNNDecoder.from_h5(os.path.join(model_dir, 'rnn_decoder.weights.h5'),
+                                      stateful_gru=stateful_gru)
+    return encoder, decoder, Vocabulary.load(vocab_path), config
+
+
+def caption_features(img_features, encoder, decoder, vocab, config, beam_width=1, length_penalty=0.6):
+    """Caption (dengan token <start>/<end>) dan attention plot dari fitur Inception (N, 64, 2048)."""
+    features = encoder(img_features)
+    result_ids, lengths, attention_plots = decoder.decode(
+        features, vocab.word_index['<start>'], vocab.word_index['<end>'], config['max_length'],
+        beam_width=beam_width, length_penalty=length_penalty)
+    captions = vocab.decode_batch(result_ids, lengths)
+    return captions, [plot[:length] for plot, length in zip(attention_plots, lengths)]
+
+
+def main(args):
+    from feature_store import FeatureStore
+
+    encoder, decoder, vocab, config = load_numpy_caption_models(args.model_dir, stateful_gru=args.stateful_gru)
+    store = FeatureStore(args.feature_store)
+    paths = store.paths[:args.limit] if args.limit else store.paths
+    for start in range(0, len(paths), args.batch_size):
+        chunk = paths[start:start + args.batch_size]
+        captions, _ = caption_features(store.array[store.rows(chunk)].astype(np.float32),
+                                       encoder, decoder, vocab, config, beam_width=args.beam_width)
+        for path, caption in zip(chunk, captions):
+            print(f"{path}\t{caption.replace('<start>', '').replace('<end>', '').strip()}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Caption dari feature store dengan runtime NumPy (tanpa TensorFlow)")
+    parser.add_argument('--model_dir', type=str, default='image_captioning_model_assets')
+    parser.add_argument('--feature_store', type=str, required=True)
+    parser.add_argument('--limit', type=int, default=None)
+    parser.add_argument('--batch_size', type=int, default=32)
+    parser.add_argument('--beam_width', type=int, default=1)
+    parser.add_argument('--stateful_gru', action='store_true',
+                        help='Teruskan hidden state ke sel GRU (hanya untuk bobot yang dilatih seperti itu).')
+    main(parser.parse_args())
@@ -0,0 +1,82 @@
+import os
+import tempfile
+import threading
+
+import numpy as np
+import tensorflow as tf
+
+try:
+    # Runtime LiteRT menggantikan tf.lite.Interpreter di rilis TF berikutnya.
+    from ai_edge_litert.interpreter import Interpreter
+except ImportError:
+    Interpreter = tf.lite.Interpreter
+
+PRECISIONS = ('float32', 'float16', 'int8')
+
+
+def convert_inception_to_tflite(inception_model, precision):
+    """Mengonversi feature extractor InceptionV3 (Keras) ke TFLite dengan bobot tereduksi.
+
+    'int8' memakai dynamic-range quantization (bobot int8, aktivasi float)
+    sehingga tidak perlu dataset kalibrasi; 'float16' menyimpan bobot float16
+    dan didekuantisasi saat dimuat. Mengembalikan byte model .tflite.
+    """
+    if precision not in PRECISIONS or precision == 'float32':
+        raise ValueError(f"precision untuk TFLite harus 'float16' atau 'int8', bukan '{precision}'.")
+    converter = tf.lite.TFLiteConverter.from_keras_model(inception_model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if precision == 'float16':
+        converter.target_spec.supported_types = [tf.float16]
+    return converter.convert()
+
+
+def load_or_convert_inception(tflite_path, load_keras_fn, precision, source_path=None, num_threads=None):
+    """Memuat InceptionV3 terkuantisasi dari `tflite_path`, atau mengonversinya jika belum ada.
+
+    `load_keras_fn` dipanggil (tanpa argumen) hanya jika konversi diperlukan,
+    jadi model Keras float tidak dimuat sama sekali ketika cache .tflite ada.
+    Cache dianggap basi jika `source_path` lebih baru. File ditulis atomik
+    sehingga beberapa worker boleh mengonversi bersamaan.
+    """
+    stale = (source_path is not None and os.path.exists(tflite_path) and os.path.exists(source_path)
+             and os.path.getmtime(source_path) > os.path.getmtime(tflite_path))
+    if stale or not os.path.exists(tflite_path):
+        print(f"Mengonversi InceptionV3 ke TFLite ({precision})...")
+        model_content = convert_inception_to_tflite(load_keras_fn(), precision)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(tflite_path) or '.')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(model_content)
+        os.replace(tmp_path, tflite_path)
+        print(f"Model TFLite disimpan ke {tflite_path} ({len(model_content) / 1e6:.1f} MB).")
+    return TFLiteFeatureExtractor(tflite_path, num_threads=num_threads)
+
+
+class TFLiteFeatureExtractor:
+    """Pengganti `inception_model` yang menjalankan InceptionV3 lewat interpreter TFLite.
+
+    Dipanggil seperti model Keras: input (N, 299, 299, 3) float32 yang sudah
+    di-preprocess, output tensor (N, 8, 8, 2048). Interpreter tidak thread-safe
+    dan ukuran batch-nya tetap, jadi pemanggilan diserialkan dengan lock dan
+    input di-resize hanya ketika ukuran batch berubah.
+    """
+
+    def __init__(self, model_path, num_threads=None):
+        self.model_path = model_path
+        self.model_bytes = os.path.getsize(model_path)
+        # Default interpreter TFLite hanya memakai satu thread.
+        self._interpreter = Interpreter(model_path=model_path, num_threads=num_threads or os.cpu_count())
+        self._input_index = self._interpreter.get_input_details()[0]['index']
+        self._output_index = self._interpreter.get_output_details()[0]['index']
+        self._batch_size = None
+        self._lock = threading.Lock()
+
+    def __call__(self, images):
+        images = np.asarray(images, dtype=np.float32)
+        with self._lock:
+            if images.shape[0] != self._batch_size:
+                self._interpreter.resize_tensor_input(self._input_index, images.shape)
+                self._interpreter.allocate_tensors()
+                self._batch_size = images.shape[0]
+            self._interpreter.set_tensor(self._input_index, images)
+            self._interpreter.invoke()
+            return tf.convert_to_tensor(self._interpreter.get_tensor(self._output_index))
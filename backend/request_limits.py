@@ -0,0 +1,47 @@
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+
+
+def _too_large_detail(limit):
+    return f"Ukuran request melebihi batas {limit / (1024 * 1024):.0f} MB."
+
+
+class BodySizeLimitMiddleware:
+    """Middleware ASGI yang membatasi ukuran body request per path, sebelum multipart di-parse.
+
+    `limits` memetakan path ke batas byte. Request dengan Content-Length di
+    atas batas langsung dijawab 413 tanpa membaca body sama sekali. Body
+    tanpa Content-Length (chunked) atau yang lebih panjang dari header-nya
+    dihitung saat stream diterima: begitu melewati batas, pembacaan
+    dihentikan dengan HTTPException 413, jadi parser form berhenti menulis
+    ke file sementara paling lambat satu chunk setelah batas.
+    """
+
+    def __init__(self, app, limits):
+        self.app = app
+        self.limits = dict(limits)
+
+    async def __call__(self, scope, receive, send):
+        limit = self.limits.get(scope.get('path')) if scope['type'] == 'http' else None
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        content_length = dict(scope['headers']).get(b'content-length')
+        if content_length is not None and (not content_length.isdigit() or int(content_length) > limit):
+            response = JSONResponse(status_code=413, content={"detail": _too_large_detail(limit)})
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message['type'] == 'http.request':
+                received += len(message.get('body', b''))
+                if received > limit:
+                    raise HTTPException(status_code=413, detail=_too_large_detail(limit))
+            return message
+
+        await self.app(scope, limited_receive, send)
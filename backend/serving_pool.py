@@ -0,0 +1,224 @@
+import itertools
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from caption_generator import INFERENCE_MODES, caption_requests_batch, warm_up_models
+from inference_bundle import load_inference_bundle
+
+# Field /proc/<pid>/smaps_rollup yang dilaporkan per worker (kB -> MB).
+_MEMORY_FIELDS = {'Rss': 'rss_mb', 'Pss': 'pss_mb', 'Pss_File': 'pss_file_mb', 'Anonymous': 'anonymous_mb'}
+
+
+def process_memory(pid):
+    """RSS/PSS proses dari /proc/<pid>/smaps_rollup (Linux) dalam MB; None jika tidak tersedia.
+
+    PSS membagi halaman bersama (mmap `weights.bin`) dengan jumlah proses
+    yang memetakannya, jadi jumlah PSS semua worker = memori pool sebenarnya.
+    Salinan bobot di variabel TF/NumPy akan muncul sebagai Anonymous.
+    """
+    try:
+        with open(f'/proc/{pid}/smaps_rollup', 'r') as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return None
+    memory = {}
+    for line in lines[1:]:
+        name, _, value = line.partition(':')
+        if name in _MEMORY_FIELDS:
+            memory[_MEMORY_FIELDS[name]] = round(int(value.split()[0]) / 1024, 1)
+    return memory
+
+
+def _worker_main(worker_id, bundle_dir, inference_mode, precision, stateful_gru, threads_per_worker, tasks, results):
+    """Loop proses worker: muat model dari bundle inferensi, lalu kerjakan batch dari antrean."""
+    import tensorflow as tf
+
+    # Bagi core antar worker supaya thread pool TF tidak saling berebut CPU.
+    tf.config.threading.set_intra_op_parallelism_threads(threads_per_worker)
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+    # Bobot dibaca dari mmap bundle (tidak disalin ke variabel TF) supaya
+    # halaman `weights.bin` dipakai bersama oleh semua worker.
+    encoder, decoder, tokenizer, inception_model, config = load_inference_bundle(
+        bundle_dir, inference_mode, precision=precision, num_threads=threads_per_worker,
+        share_weights=True, stateful_gru=stateful_gru)
+    # Worker baru dilaporkan siap setelah warm-up, termasuk worker pengganti.
+    warm_up_models(inception_model, encoder, decoder, tokenizer, config)
+    results.put(('ready', worker_id, os.getpid()))
+
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        task_id, requests = task
+        results.put(('taken', worker_id, task_id))
+        try:
+            output = caption_requests_batch(
+                requests, inception_model, encoder, decoder, tokenizer, config)
+            results.put(('done', task_id, True, output))
+        except Exception as e:
+            results.put(('done', task_id, False, f"{type(e).__name__}: {e}"))
+
+
+class ProcessInferencePool:
+    """Pool proses worker inferensi yang memuat model dari bundle inferensi bersama.
+
+    Worker dijalankan dengan konteks 'spawn': runtime TensorFlow tidak aman
+    di-fork setelah diinisialisasi (tf.function di proses anak bisa hang),
+    jadi setiap worker memulai interpreter baru dan memetakan `weights.bin`
+    lewat mmap. Worker menjalankan InceptionV3 langsung dari mmap tersebut
+    (load_inference_bundle share_weights=True) dan, pada inference_mode
+    'numpy' (default), encoder/decoder juga, sehingga bobot ada sekali di
+    page cache, bukan N salinan; `stats()` melaporkan RSS/PSS per worker.
+    Batch dikirim lewat satu antrean tugas lokal; worker mana pun
+    yang bebas mengambilnya. Worker yang mati otomatis diganti dan batch yang
+    sedang dikerjakannya digagalkan.
+    """
+
+    def __init__(self, bundle_dir, num_workers=2, inference_mode='numpy', precision='float32',
+                 threads_per_worker=None, start_timeout=300.0, task_timeout=300.0, stateful_gru=False):
+        if inference_mode not in INFERENCE_MODES:
+            raise ValueError(
+                f"inference_mode harus salah satu dari {INFERENCE_MODES}, bukan '{inference_mode}'.")
+        self.bundle_dir = bundle_dir
+        self.num_workers = num_workers
+        self.inference_mode = inference_mode
+        self.precision = precision
+        self.stateful_gru = stateful_gru
+        self.threads_per_worker = threads_per_worker or max(1, (os.cpu_count() or 1) // num_workers)
+        self.start_timeout = start_timeout
+        self.task_timeout = task_timeout
+        self._ctx = mp.get_context('spawn')
+        self._tasks = None
+        self._results = None
+        self._workers = {}
+        self._ready = {}
+        self._assigned = {}
+        self._pending = {}
+        self._task_ids = itertools.count()
+        self._lock = threading.Lock()
+        self._reader = None
+        self._closing = False
+        self._stats = {'completed': 0, 'failed': 0, 'restarts': 0}
+
+    def _spawn_worker(self, worker_id):
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(worker_id, self.bundle_dir, self.inference_mode, self.precision, self.stateful_gru,
+                  self.threads_per_worker, self._tasks, self._results),
+            name=f'caption-worker-{worker_id}',
+            daemon=True)
+        process.start()
+        self._workers[worker_id] = process
+        self._ready[worker_id] = False
+
+    def start(self):
+        """Menjalankan semua worker dan menunggu sampai model di setiap worker siap."""
+        self._tasks = self._ctx.Queue()
+        self._results = self._ctx.Queue()
+        for worker_id in range(self.num_workers):
+            self._spawn_worker(worker_id)
+        self._reader = threading.Thread(target=self._read_results, daemon=True)
+        self._reader.start()
+
+        deadline = time.monotonic() + self.start_timeout
+        while not all(self._ready.values()):
+            if time.monotonic() > deadline:
+                raise TimeoutError("Worker inferensi tidak siap dalam batas waktu.")
+            time.sleep(0.1)
+        print(f"{self.num_workers} worker inferensi siap "
+              f"({self.threads_per_worker} thread TF per worker).")
+
+    def _fail_task(self, task_id, message):
+        future = self._pending.pop(task_id, None)
+        if future is not None and not future.done():
+            self._stats['failed'] += 1
+            future.set_exception(RuntimeError(message))
+
+    def _check_workers(self):
+        for worker_id, process in list(self._workers.items()):
+            if process.is_alive() or self._closing:
+                continue
+            print(f"Worker inferensi {worker_id} (pid {process.pid}) mati "
+                  f"dengan exit code {process.exitcode}; menjalankan ulang.")
+            with self._lock:
+                task_id = self._assigned.pop(worker_id, None)
+                if task_id is not None:
+                    self._fail_task(task_id, f"Worker inferensi {worker_id} mati saat memproses batch.")
+            self._stats['restarts'] += 1
+            self._spawn_worker(worker_id)
+
+    def _read_results(self):
+        while not self._closing:
+            try:
+                message = self._results.get(timeout=1.0)
+            except queue.Empty:
+                self._check_workers()
+                continue
+            except (EOFError, OSError):
+                break
+            kind = message[0]
+            with self._lock:
+                if kind == 'ready':
+                    self._ready[message[1]] = True
+                elif kind == 'taken':
+                    self._assigned[message[1]] = message[2]
+                elif kind == 'done':
+                    _, task_id, ok, payload = message
+                    for worker_id, assigned in list(self._assigned.items()):
+                        if assigned == task_id:
+                            del self._assigned[worker_id]
+                    if not ok:
+                        self._fail_task(task_id, payload)
+                        continue
+                    future = self._pending.pop(task_id, None)
+                    if future is not None and not future.done():
+                        self._stats['completed'] += 1
+                        future.set_result(payload)
+            self._check_workers()
+
+    def run(self, requests):
+        """Mengirim satu batch ke worker dan menunggu hasilnya (blocking).
+
+        Format request dan hasil sama dengan caption_generator.caption_requests_batch.
+        """
+        if self._tasks is None:
+            raise RuntimeError("ProcessInferencePool belum dijalankan.")
+        future = Future()
+        with self._lock:
+            task_id = next(self._task_ids)
+            self._pending[task_id] = future
+        self._tasks.put((task_id, requests))
+        try:
+            return future.result(timeout=self.task_timeout)
+        finally:
+            with self._lock:
+                self._pending.pop(task_id, None)
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats,
+                        num_workers=self.num_workers,
+                        workers_ready=sum(self._ready.values()),
+                        threads_per_worker=self.threads_per_worker,
+                        pending_batches=len(self._pending),
+                        pids=[p.pid for p in self._workers.values()],
+                        worker_memory={p.pid: process_memory(p.pid) for p in self._workers.values()})
+
+    def close(self):
+        """Menghentikan semua worker."""
+        self._closing = True
+        if self._tasks is not None:
+            for _ in self._workers:
+                self._tasks.put(None)
+        for process in self._workers.values():
+            process.join(timeout=10)
+            if process.is_alive():
+                process.terminate()
+        with self._lock:
+            for task_id in list(self._pending):
+                self._fail_task(task_id, "ProcessInferencePool ditutup.")
+        self._workers = {}
@@ -0,0 +1,314 @@
+"""Training headless model caption (CNN_Encoder + RNN_Decoder) di atas FeatureStore.
+
+Memakai kelas model yang sama dengan caption_generator, jadi hasil export
+langsung bisa dimuat oleh load_model_assets / app-backend.
+
+Contoh:
+    python training.py --feature_store processed_features --captions captions.jsonl --output_dir trained_model
+    python training.py ... --precision mixed_bfloat16 --strategy mirrored --cpu_replicas 2
+    python training.py --feature_store processed_features --captions captions.jsonl --tokenized captions_tok ...
+
+`--captions` berisi satu JSON per baris: {"path": "<path gambar di store>", "caption": "..."}.
+Dengan `--tokenized`, caption ditokenisasi sekali ke matriks int16 dan run
+berikutnya memuatnya langsung tanpa membaca JSONL lagi. Checkpoint disimpan
+di `<output_dir>/checkpoints`; menjalankan ulang perintah yang sama
+melanjutkan dari checkpoint terakhir.
+"""
+import argparse
+import json
+import os
+import shutil
+import time
+import types
+import pickle
+
+import numpy as np
+import tensorflow as tf
+
+from caption_generator import build_caption_models
+from feature_store import FeatureStore
+from vocabulary import TokenizedCaptions, Vocabulary
+
+TRAINING_PRECISIONS = ('float32', 'mixed_float16', 'mixed_bfloat16')
+STRATEGIES = ('default', 'mirrored')
+
+
+def make_strategy(name='default', cpu_replicas=1):
+    """tf.distribute strategy untuk data parallelism.
+
+    'mirrored' memakai semua GPU jika ada; tanpa GPU, CPU dipecah menjadi
+    `cpu_replicas` device logis sehingga setiap replika mendapat bagian batch
+    dan thread pool sendiri. Harus dipanggil sebelum TensorFlow membuat
+    tensor pertama.
+    """
+    if name not in STRATEGIES:
+        raise ValueError(f"strategy harus salah satu dari {STRATEGIES}, bukan '{name}'.")
+    if name == 'default':
+        return tf.distribute.get_strategy()
+    gpus = tf.config.list_physical_devices('GPU')
+    if gpus:
+        return tf.distribute.MirroredStrategy()
+    cpu = tf.config.list_physical_devices('CPU')[0]
+    if cpu_replicas > 1:
+        tf.config.set_logical_device_configuration(
+            cpu, [tf.config.LogicalDeviceConfiguration() for _ in range(cpu_replicas)])
+    devices = [device.name for device in tf.config.list_logical_devices('CPU')]
+    return tf.distribute.MirroredStrategy(devices=devices,
+                                          cross_device_ops=tf.distribute.ReductionToOneDevice())
+
+
+def load_caption_manifest(path):
+    """List (image_path, caption) dari file JSONL {"path", "caption"}."""
+    pairs = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                pairs.append((record['path'], record['caption']))
+    return pairs
+
+
+class CaptionTrainer:
+    """Loop training custom dengan teacher forcing satu pass, mixed precision dan tf.distribute.
+
+    Berbeda dengan `train_step` di notebook (decoder dipanggil penuh per
+    token), embedding seluruh sekuens target, proyeksi W1(features) attention
+    serta fc1/fc2 + loss dihitung sekali per batch di luar loop waktu; di
+    dalam loop hanya tersisa attention terhadap hidden sebelumnya dan langkah
+    GRU. Hasilnya identik dengan RNN_Decoder.call langkah demi langkah.
+    Input decoder adalah target[:, :-1] (diawali <start>), jadi batch
+    terakhir yang lebih kecil tidak perlu penanganan khusus.
+    """
+
+    def __init__(self, config, strategy=None, precision='float32', learning_rate=1e-3,
+                 checkpoint_dir=None, max_to_keep=5):
+        if precision not in TRAINING_PRECISIONS:
+            raise ValueError(
+                f"precision harus salah satu dari {TRAINING_PRECISIONS}, bukan '{precision}'.")
+        self.config = config
+        self.strategy = strategy or tf.distribute.get_strategy()
+        self.precision = precision
+        # Policy global harus aktif saat layer dibuat; dikembalikan lagi sesudahnya.
+        previous_policy = tf.keras.mixed_precision.global_policy()
+        tf.keras.mixed_precision.set_global_policy(precision)
+        try:
+            with self.strategy.scope():
+                self.encoder, self.decoder = build_caption_models(config)
+                optimizer = tf.keras.optimizers.Adam(learning_rate)
+                if precision == 'mixed_float16':
+                    optimizer = tf.keras.mixed_precision.LossScaleOptimizer(optimizer)
+                self.optimizer = optimizer
+                self.epoch = tf.Variable(0, dtype=tf.int64, trainable=False)
+        finally:
+            tf.keras.mixed_precision.set_global_policy(previous_policy)
+        self.trainable_variables = self.encoder.trainable_variables + self.decoder.trainable_variables
+        self.checkpoint_manager = None
+        if checkpoint_dir:
+            checkpoint = tf.train.Checkpoint(encoder=self.encoder, decoder=self.decoder,
+                                             optimizer=self.optimizer, epoch=self.epoch)
+            self.checkpoint_manager = tf.train.CheckpointManager(checkpoint, checkpoint_dir,
+                                                                 max_to_keep=max_to_keep)
+        self._train_step = tf.function(self._distributed_step, reduce_retracing=True)
+
+    def restore(self):
+        """Memuat checkpoint terakhir jika ada; mengembalikan epoch berikutnya."""
+        if self.checkpoint_manager is not None and self.checkpoint_manager.latest_checkpoint:
+            self.checkpoint_manager.checkpoint.restore(self.checkpoint_manager.latest_checkpoint)
+            print(f"Melanjutkan dari {self.checkpoint_manager.latest_checkpoint} (epoch {int(self.epoch.numpy())}).")
+        return int(self.epoch.numpy())
+
+    def sequence_logits(self, img_tensor, dec_inputs, training=True):
+        """Logit (B, T, vocab) float32 untuk input decoder teacher-forced (B, T)."""
+        features = self.encoder(img_tensor, training=training)
+        attention = self.decoder.attention
+        projected_features = attention.W1(features)
+        embedded = self.decoder.embedding(dec_inputs)
+        hidden = tf.zeros((tf.shape(dec_inputs)[0], self.decoder.units), dtype=features.dtype)
+        sequence_length = tf.shape(dec_inputs)[1]
+        # tf.while_loop (bukan loop Python yang di-unroll): tracing ~5x lebih cepat, step hampir sama.
+        outputs = tf.TensorArray(features.dtype, size=sequence_length)
+        for t in tf.range(sequence_length):
+            score = tf.nn.tanh(projected_features + attention.W2(tf.expand_dims(hidden, 1)))
+            attention_weights = tf.nn.softmax(attention.V(score), axis=1)
+            context_vector = tf.reduce_sum(attention_weights * features, axis=1)
+            x = tf.concat([tf.expand_dims(context_vector, 1), embedded[:, t:t + 1]], axis=-1)
+            output, hidden = self.decoder.gru(x, training=training)
+            outputs = outputs.write(t, output[:, 0])
+        logits = self.decoder.fc2(self.decoder.fc1(tf.transpose(outputs.stack(), [1, 0, 2])))
+        return tf.cast(logits, tf.float32)
+
+    def _replica_step(self, img_tensor, target):
+        replica_context = tf.distribute.get_replica_context()
+        global_batch = replica_context.all_reduce(
+            tf.distribute.ReduceOp.SUM, tf.cast(tf.shape(target)[0], tf.float32))
+        labels = target[:, 1:]
+        with tf.GradientTape() as tape:
+            logits = self.sequence_logits(img_tensor, target[:, :-1], training=True)
+            token_loss = tf.nn.sparse_softmax_cross_entropy_with_logits(labels=labels, logits=logits)
+            token_loss *= tf.cast(tf.not_equal(labels, 0), token_loss.dtype)
+            # Sama dengan notebook: jumlah per langkah dari rata-rata loss per batch (global).
+            loss = tf.reduce_sum(token_loss) / tf.maximum(global_batch, 1.0)
+            scaled_loss = self.optimizer.scale_loss(loss) if self.precision == 'mixed_float16' else loss
+        gradients = tape.gradient(scaled_loss, self.trainable_variables)
+        self.optimizer.apply_gradients(zip(gradients, self.trainable_variables))
+        return loss
+
+    def _distributed_step(self, img_tensor, target):
+        per_replica_loss = self.strategy.run(self._replica_step, args=(img_tensor, target))
+        return self.strategy.reduce(tf.distribute.ReduceOp.SUM, per_replica_loss, axis=None)
+
+    def fit(self, dataset, epochs, log_every=100, checkpoint_every=1):
+        """Melatih sampai `epochs` (termasuk epoch dari checkpoint) dan melaporkan throughput.
+
+        Mengembalikan list ringkasan per epoch: loss, waktu, rata-rata waktu
+        step dan samples/s. Step pertama setiap run (tracing graph) tidak
+        dihitung ke statistik step.
+        """
+        distributed = self.strategy.experimental_distribute_dataset(dataset)
+        history = []
+        for epoch in range(self.restore(), epochs):
+            epoch_started = time.perf_counter()
+            total_loss = 0.0
+            steps = samples = 0
+            step_times = []
+            for img_tensor, target in distributed:
+                step_started = time.perf_counter()
+                batch_loss = float(self._train_step(img_tensor, target))
+                step_times.append(time.perf_counter() - step_started)
+                batch_size = sum(int(t.shape[0]) for t in self.strategy.experimental_local_results(target))
+                sequence_length = int(self.strategy.experimental_local_results(target)[0].shape[1])
+                total_loss += batch_loss / sequence_length
+                samples += batch_size
+                steps += 1
+                if log_every and steps % log_every == 0:
+                    print(f"Epoch {epoch + 1} Batch {steps} Loss {batch_loss / sequence_length:.4f} "
+                          f"({step_times[-1] * 1000:.1f} ms/step)", flush=True)
+            self.epoch.assign(epoch + 1)
+            if self.checkpoint_manager is not None and (epoch + 1) % checkpoint_every == 0:
+                self.checkpoint_manager.save()
+            elapsed = time.perf_counter() - epoch_started
+            timed = step_times[1:] if len(history) == 0 and len(step_times) > 1 else step_times
+            summary = {
+                'epoch': epoch + 1,
+                'loss': total_loss / max(steps, 1),
+                'steps': steps,
+                'samples': samples,
+                'epoch_s': elapsed,
+                'step_ms_mean': 1000.0 * float(np.mean(timed)) if timed else 0.0,
+                'step_ms_p50': 1000.0 * float(np.percentile(timed, 50)) if timed else 0.0,
+                'samples_per_s': samples / elapsed if elapsed > 0 else 0.0,
+            }
+            history.append(summary)
+            print(f"Epoch {summary['epoch']} Loss {summary['loss']:.6f} | {elapsed:.1f} detik, "
+                  f"{summary['step_ms_mean']:.1f} ms/step, {summary['samples_per_s']:.1f} samples/detik",
+                  flush=True)
+        return history
+
+    def export(self, output_dir, vocabulary, inception_model_path=None):
+        """Menulis aset yang bisa dimuat load_model_assets (config, tokenizer, bobot)."""
+        os.makedirs(output_dir, exist_ok=True)
+        with open(os.path.join(output_dir, 'model_config.json'), 'w') as f:
+            json.dump(self.config, f)
+        vocabulary.save(os.path.join(output_dir, 'vocab.json'))
+        # load_model_assets memakai vocab.json; tokenizer.pickle untuk notebook/klien lama.
+        tokenizer = types.SimpleNamespace(word_index=dict(vocabulary.word_index),
+                                          index_word=dict(vocabulary.index_word))
+        with open(os.path.join(output_dir, 'tokenizer.pickle'), 'wb') as handle:
+            pickle.dump(tokenizer, handle, protocol=pickle.HIGHEST_PROTOCOL)
+        self.encoder.save_weights(os.path.join(output_dir, 'cnn_encoder.weights.h5'))
+        self.decoder.save_weights(os.path.join(output_dir, 'rnn_decoder.weights.h5'))
+        if inception_model_path:
+            shutil.copyfile(inception_model_path, os.path.join(output_dir, 'inception_feature_extractor.keras'))
+        print(f"Model hasil training diekspor ke {output_dir}")
+
+
+def prepare_training_data(pairs, vocabulary, max_length=None):
+    """Tokenisasi caption menjadi TokenizedCaptions (matriks int16 + panjang per baris)."""
+    return TokenizedCaptions.from_pairs(pairs, vocabulary, max_length)
+
+
+def main(args):
+    if args.precision == 'mixed_float16' and not tf.config.list_physical_devices('GPU'):
+        print("PERINGATAN: float16 di CPU diemulasi dan jauh lebih lambat; pakai mixed_bfloat16 untuk CPU.")
+    strategy = make_strategy(args.strategy, args.cpu_replicas)
+    print(f"Strategy: {type(strategy).__name__}, {strategy.num_replicas_in_sync} replika; precision {args.precision}")
+
+    store = FeatureStore(args.feature_store)
+    if args.tokenized and os.path.exists(os.path.join(args.tokenized, TokenizedCaptions.PATHS_FILE)):
+        dataset_tokens = TokenizedCaptions.load(args.tokenized)
+        vocabulary = dataset_tokens.vocabulary
+        print(f"Dataset token dimuat dari {args.tokenized}.")
+    else:
+        pairs = load_caption_manifest(args.captions)
+        vocab_path = args.vocab or os.path.join(args.output_dir, 'vocab.json')
+        if os.path.exists(vocab_path):
+            vocabulary = Vocabulary.load(vocab_path)
+        else:
+            vocabulary = Vocabulary.fit([caption for _, caption in pairs], top_k=args.top_k)
+        dataset_tokens = prepare_training_data(pairs, vocabulary, args.max_length)
+        if args.tokenized:
+            dataset_tokens.save(args.tokenized)
+    dataset_tokens = dataset_tokens.subset([path in store for path in dataset_tokens.paths])
+    if not len(dataset_tokens):
+        raise SystemExit("Tidak ada caption yang gambarnya ada di feature store.")
+    print(f"{len(dataset_tokens)} pasangan caption, vocab {len(vocabulary)}, "
+          f"max_length {dataset_tokens.max_length}.")
+
+    config = {
+        'embedding_dim': args.embedding_dim,
+        'units': args.units,
+        'vocab_size': len(vocabulary),
+        'max_length': int(dataset_tokens.max_length),
+        'features_shape': store.feature_shape[-1],
+        'attention_features_shape': store.feature_shape[0],
+    }
+    global_batch_size = args.batch_size * strategy.num_replicas_in_sync
+    dataset = store.make_dataset(dataset_tokens.paths, dataset_tokens.tokens, global_batch_size,
+                                 shuffle_buffer=args.shuffle_buffer, seed=args.seed)
+    trainer = CaptionTrainer(config, strategy=strategy, precision=args.precision,
+                             learning_rate=args.learning_rate,
+                             checkpoint_dir=os.path.join(args.output_dir, 'checkpoints'))
+    history = trainer.fit(dataset, args.epochs, log_every=args.log_every)
+    trainer.export(args.output_dir, vocabulary, inception_model_path=args.inception_model)
+    history_path = os.path.join(args.output_dir, 'training_history.json')
+    # Saat melanjutkan dari checkpoint, epoch run sebelumnya tetap disimpan (dikunci nomor epoch absolut).
+    epochs = {}
+    if os.path.exists(history_path):
+        with open(history_path, 'r', encoding='utf-8') as f:
+            epochs = {entry['epoch']: entry for entry in json.load(f).get('epochs', [])}
+    epochs.update((entry['epoch'], entry) for entry in history)
+    with open(history_path, 'w', encoding='utf-8') as f:
+        json.dump({'precision': args.precision, 'replicas': strategy.num_replicas_in_sync,
+                   'global_batch_size': global_batch_size,
+                   'epochs': [epochs[epoch] for epoch in sorted(epochs)]}, f, indent=2)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Training model caption (headless)")
+    parser.add_argument('--feature_store', type=str, required=True, help='Direktori FeatureStore.')
+    parser.add_argument('--captions', type=str, default=None, help='JSONL {"path", "caption"}.')
+    parser.add_argument('--tokenized', type=str, default=None,
+                        help='Direktori TokenizedCaptions: dipakai jika sudah ada, dibuat dari --captions jika belum.')
+    parser.add_argument('--output_dir', type=str, required=True)
+    parser.add_argument('--vocab', type=str, default=None,
+                        help='vocab.json yang sudah ada; default dibangun dari caption (top_k).')
+    parser.add_argument('--inception_model', type=str, default=None,
+                        help='inception_feature_extractor.keras yang ikut disalin ke output.')
+    parser.add_argument('--top_k', type=int, default=5000)
+    parser.add_argument('--max_length', type=int, default=None)
+    parser.add_argument('--embedding_dim', type=int, default=256)
+    parser.add_argument('--units', type=int, default=512)
+    parser.add_argument('--batch_size', type=int, default=64, help='Ukuran batch per replika.')
+    parser.add_argument('--epochs', type=int, default=20)
+    parser.add_argument('--learning_rate', type=float, default=1e-3)
+    parser.add_argument('--shuffle_buffer', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--precision', type=str, default='float32', choices=TRAINING_PRECISIONS)
+    parser.add_argument('--strategy', type=str, default='default', choices=STRATEGIES)
+    parser.add_argument('--cpu_replicas', type=int, default=1,
+                        help='Jumlah device CPU logis untuk --strategy mirrored tanpa GPU.')
+    parser.add_argument('--log_every', type=int, default=100)
+    parsed = parser.parse_args()
+    if not parsed.captions and not (parsed.tokenized and os.path.isdir(parsed.tokenized)):
+        parser.error("--captions wajib diisi kecuali --tokenized menunjuk dataset token yang sudah ada.")
+    main(parsed)
@@ -0,0 +1,180 @@
+import json
+import os
+import tempfile
+from collections import OrderedDict
+
+import numpy as np
+
+# Sama dengan filter Keras Tokenizer di notebook training ('<' dan '>' dipertahankan).
+CAPTION_FILTERS = '!"#$%&()*+.,-/:;=?@[\\]^_`{|}~ '
+
+TOKENIZED_FORMAT_VERSION = 1
+
+class Vocabulary:
+    """Pengganti ringan Keras Tokenizer untuk inferensi.
+
+    Decoding hanya butuh `word_index` dan `index_word`, jadi vocab disimpan
+    sebagai JSON biasa (list kata berindeks id token) dan bisa dibaca tanpa
+    Keras maupun pickle.
+    """
+
+    def __init__(self, words, unknown='<unk>'):
+        self.words = list(words)
+        self.index_word = {i: word for i, word in enumerate(self.words) if word is not None}
+        self.word_index = {word: i for i, word in self.index_word.items()}
+        # Tabel id -> kata untuk detokenisasi batch; id kosong/di luar vocab jadi `unknown`.
+        self.id_to_word = np.array([unknown if word is None else word for word in self.words] + [unknown],
+                                   dtype=object)
+
+    @classmethod
+    def from_tokenizer(cls, tokenizer):
+        """Membuat Vocabulary dari Keras Tokenizer (atau objek lain dengan `index_word`)."""
+        size = max(int(i) for i in tokenizer.index_word) + 1
+        words = [None] * size
+        for i, word in tokenizer.index_word.items():
+            words[int(i)] = word
+        return cls(words)
+
+    @staticmethod
+    def split_words(text, filters=CAPTION_FILTERS):
+        """Lowercase, ganti karakter filter dengan spasi, lalu pisah per kata (seperti Keras)."""
+        return [word for word in text.lower().translate(str.maketrans(filters, ' ' * len(filters))).split(' ')
+                if word]
+
+    @classmethod
+    def fit(cls, captions, top_k=5000, oov_token='<unk>'):
+        """Membangun vocab dari caption training dengan urutan id yang sama seperti Keras Tokenizer.
+
+        Id 0 = '<pad>', 1 = `oov_token`, lalu kata diurutkan dari frekuensi
+        tertinggi (seri: urutan kemunculan pertama). Hanya `top_k` id pertama
+        yang disimpan, sama seperti `num_words=top_k` pada texts_to_sequences.
+        """
+        counts = OrderedDict()
+        for caption in captions:
+            for word in cls.split_words(caption):
+                counts[word] = counts.get(word, 0) + 1
+        ranked = [word for word, _ in sorted(counts.items(), key=lambda item: item[1], reverse=True)
+                  if word != oov_token]
+        return cls((['<pad>', oov_token] + ranked)[:top_k])
+
+    def texts_to_sequences(self, texts, oov_token='<unk>'):
+        oov_id = self.word_index[oov_token]
+        return [[self.word_index.get(word, oov_id) for word in self.split_words(text)] for text in texts]
+
+    def pad_sequences(self, sequences, max_length=None, dtype=np.int32):
+        """Padding 'post' dengan id 0; sekuens lebih panjang dari `max_length` dipotong di akhir."""
+        return self.pad_with_lengths(sequences, max_length, dtype)[0]
+
+    def pad_with_lengths(self, sequences, max_length=None, dtype=np.int16):
+        """Seperti pad_sequences, tapi juga mengembalikan panjang asli (setelah dipotong) per baris."""
+        max_length = max_length or max((len(seq) for seq in sequences), default=0)
+        if np.issubdtype(dtype, np.integer) and len(self.words) - 1 > np.iinfo(dtype).max:
+            raise ValueError(f"Vocab {len(self.words)} kata tidak muat di {np.dtype(dtype).name}.")
+        lengths = np.fromiter((min(len(seq), max_length) for seq in sequences), dtype=np.int32,
+                              count=len(sequences))
+        padded = np.zeros((len(sequences), max_length), dtype=dtype)
+        # Satu assignment ber-mask alih-alih menyalin baris satu per satu.
+        mask = np.arange(max_length) < lengths[:, None]
+        padded[mask] = np.fromiter((token for seq in sequences for token in seq[:max_length]),
+                                   dtype=dtype, count=int(lengths.sum()))
+        return padded, lengths
+
+    def decode_batch(self, ids, lengths=None, separator=' '):
+        """Detokenisasi matriks id (N, T) sekaligus lewat tabel NumPy.
+
+        Hanya `lengths[i]` token pertama setiap baris yang dipakai (default
+        seluruh baris); id di luar vocab menjadi '<unk>'.
+        """
+        ids = np.asarray(ids)
+        if ids.ndim != 2:
+            raise ValueError(f"ids harus 2 dimensi (N, T), bukan {ids.shape}.")
+        if lengths is None:
+            lengths = np.full(ids.shape[0], ids.shape[1])
+        lengths = np.minimum(np.asarray(lengths), ids.shape[1])
+        unknown_id = len(self.id_to_word) - 1
+        safe_ids = np.where((ids >= 0) & (ids < unknown_id), ids, unknown_id)
+        tokens = self.id_to_word[safe_ids]
+        return [separator.join(row[:length]) for row, length in zip(tokens.tolist(), lengths.tolist())]
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f)['words'])
+
+    def save(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'words': self.words}, f, ensure_ascii=False)
+
+    def __len__(self):
+        return len(self.words)
+
+
+class TokenizedCaptions:
+    """Dataset caption yang sudah ditokenisasi: matriks int16 (N, max_length) + panjang per baris.
+
+    Disimpan sebagai direktori berisi `tokens.npy` (int16, padding 0),
+    `lengths.npy` (int32), `paths.json` (path gambar per baris) dan
+    `vocab.json`, sehingga training cukup memuat array (bisa lewat mmap)
+    tanpa tokenisasi ulang string setiap kali dijalankan.
+    """
+
+    TOKENS_FILE = 'tokens.npy'
+    LENGTHS_FILE = 'lengths.npy'
+    PATHS_FILE = 'paths.json'
+    VOCAB_FILE = 'vocab.json'
+
+    def __init__(self, paths, tokens, lengths, vocabulary):
+        if not (len(paths) == tokens.shape[0] == lengths.shape[0]):
+            raise ValueError("Jumlah paths, baris tokens dan lengths harus sama.")
+        self.paths = list(paths)
+        self.tokens = tokens
+        self.lengths = lengths
+        self.vocabulary = vocabulary
+
+    def __len__(self):
+        return len(self.paths)
+
+    @property
+    def max_length(self):
+        return self.tokens.shape[1]
+
+    @classmethod
+    def from_pairs(cls, pairs, vocabulary, max_length=None, dtype=np.int16):
+        """Tokenisasi list (path, caption) dengan `vocabulary`."""
+        sequences = vocabulary.texts_to_sequences([caption for _, caption in pairs])
+        tokens, lengths = vocabulary.pad_with_lengths(sequences, max_length, dtype)
+        return cls([path for path, _ in pairs], tokens, lengths, vocabulary)
+
+    def subset(self, keep):
+        """Dataset baru berisi baris dengan mask/indeks `keep`."""
+        rows = np.flatnonzero(keep) if np.asarray(keep).dtype == bool else np.asarray(keep)
+        return TokenizedCaptions([self.paths[i] for i in rows], self.tokens[rows], self.lengths[rows],
+                                 self.vocabulary)
+
+    def captions(self, rows=None):
+        """Caption teks untuk `rows` (default semua), didekode batch dari array token."""
+        rows = slice(None) if rows is None else rows
+        return self.vocabulary.decode_batch(self.tokens[rows], self.lengths[rows])
+
+    def save(self, dataset_dir):
+        os.makedirs(dataset_dir, exist_ok=True)
+        for name, array in ((self.TOKENS_FILE, self.tokens), (self.LENGTHS_FILE, self.lengths)):
+            fd, tmp_path = tempfile.mkstemp(dir=dataset_dir, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                np.save(f, np.ascontiguousarray(array))
+            os.replace(tmp_path, os.path.join(dataset_dir, name))
+        with open(os.path.join(dataset_dir, self.PATHS_FILE), 'w', encoding='utf-8') as f:
+            json.dump({'version': TOKENIZED_FORMAT_VERSION, 'paths': self.paths}, f, ensure_ascii=False)
+        self.vocabulary.save(os.path.join(dataset_dir, self.VOCAB_FILE))
+
+    @classmethod
+    def load(cls, dataset_dir, mmap=True):
+        with open(os.path.join(dataset_dir, cls.PATHS_FILE), 'r', encoding='utf-8') as f:
+            index = json.load(f)
+        if index.get('version') != TOKENIZED_FORMAT_VERSION:
+            raise ValueError(f"Versi dataset token {index.get('version')} tidak didukung "
+                             f"(diharapkan {TOKENIZED_FORMAT_VERSION}).")
+        mmap_mode = 'r' if mmap else None
+        tokens = np.load(os.path.join(dataset_dir, cls.TOKENS_FILE), mmap_mode=mmap_mode)
+        lengths = np.load(os.path.join(dataset_dir, cls.LENGTHS_FILE), mmap_mode=mmap_mode)
+        return cls(index['paths'], tokens, lengths, Vocabulary.load(os.path.join(dataset_dir, cls.VOCAB_FILE)))
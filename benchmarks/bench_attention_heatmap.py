@@ -0,0 +1,121 @@
+"""Render heatmap attention per token: plot_attention lama (matplotlib) vs attention_heatmap.
+
+Jalur lama digambar ulang di sini persis seperti plot_attention sebelumnya
+(subplot per kata, np.resize ke 8x8, imshow abu-abu alpha 0.6) tetapi
+disimpan ke PNG lewat backend Agg alih-alih plt.show(). Jalur baru adalah
+render_attention (sprite PNG dan float16). Upsample NumPy dicek terhadap
+tf.image.resize bilinear jika TensorFlow tersedia.
+
+Contoh:
+    python benchmarks/bench_attention_heatmap.py --image /path/foto.jpg --tokens 8 16 30 --runs 10
+"""
+import argparse
+import io
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
+
+from attention_heatmap import render_attention, upsample_attention  # noqa: E402
+
+
+def median_ms(fn, runs):
+    fn()
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000.0)
+    return float(np.median(samples))
+
+
+def matplotlib_png(image_bytes, words, attention_plot):
+    """plot_attention versi lama, disimpan ke PNG (figure 10x10 inci, dpi default)."""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    from PIL import Image
+
+    temp_image = np.array(Image.open(io.BytesIO(image_bytes)))
+    fig = plt.figure(figsize=(10, 10))
+    cols = int(np.ceil(np.sqrt(len(words))))
+    rows = int(np.ceil(len(words) / cols))
+    for l_idx, word in enumerate(words):
+        temp_att = np.resize(attention_plot[l_idx], (8, 8))
+        ax = fig.add_subplot(rows, cols, l_idx + 1)
+        ax.set_title(word)
+        img_display = ax.imshow(temp_image)
+        ax.imshow(temp_att, cmap='gray', alpha=0.6, extent=img_display.get_extent())
+        ax.axis('off')
+    plt.tight_layout()
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png')
+    plt.close(fig)
+    return buffer.getvalue()
+
+
+def synthetic_jpeg(width, height):
+    from PIL import Image
+
+    y, x = np.mgrid[0:height, 0:width]
+    pixels = np.stack([x * 255 // width, y * 255 // height, (x + y) * 255 // (width + height)], axis=-1)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels.astype(np.uint8)).save(buffer, format='JPEG', quality=90)
+    return buffer.getvalue()
+
+
+def check_upsample(attention_plot, height, width):
+    try:
+        import tensorflow as tf
+    except ImportError:
+        return None
+    reference = tf.image.resize(attention_plot.reshape(-1, 8, 8, 1), (height, width)).numpy()[..., 0]
+    reference -= reference.min(axis=(1, 2), keepdims=True)
+    reference /= reference.max(axis=(1, 2), keepdims=True)
+    return float(np.abs(upsample_attention(attention_plot, height, width) - reference).max())
+
+
+def main(args):
+    if args.image:
+        with open(args.image, 'rb') as f:
+            image_bytes = f.read()
+    else:
+        image_bytes = synthetic_jpeg(640, 480)
+    rng = np.random.default_rng(0)
+    report = {'cpu_count': os.cpu_count(), 'tile_size': args.tile_size, 'tokens': {}}
+    for count in args.tokens:
+        logits = rng.normal(size=(count, 64)).astype(np.float32)
+        attention_plot = np.exp(logits) / np.exp(logits).sum(axis=1, keepdims=True)
+        words = [f'kata{i}' for i in range(count)]
+        png = render_attention(image_bytes, words, attention_plot, 'png', args.tile_size)
+        float16 = render_attention(image_bytes, words, attention_plot, 'float16')
+        report['tokens'][str(count)] = {
+            'matplotlib_ms': median_ms(lambda: matplotlib_png(image_bytes, words, attention_plot),
+                                       max(3, args.runs // 3)),
+            'sprite_png_ms': median_ms(
+                lambda: render_attention(image_bytes, words, attention_plot, 'png', args.tile_size), args.runs),
+            'float16_ms': median_ms(lambda: render_attention(image_bytes, words, attention_plot, 'float16'),
+                                    args.runs),
+            'matplotlib_png_kb': len(matplotlib_png(image_bytes, words, attention_plot)) / 1024,
+            'sprite_png_base64_kb': len(png['data']) / 1024,
+            'float16_base64_kb': len(float16['data']) / 1024,
+            'upsample_max_diff_vs_tf': check_upsample(attention_plot, png['tile_height'], png['tile_width']),
+        }
+    print(json.dumps(report, indent=2))
+    for count, stats in report['tokens'].items():
+        print(f"{count} token: matplotlib {stats['matplotlib_ms']:.1f} ms, sprite PNG {stats['sprite_png_ms']:.1f} ms "
+              f"({stats['sprite_png_base64_kb']:.0f} KB), float16 {stats['float16_ms']:.3f} ms "
+              f"({stats['float16_base64_kb']:.1f} KB)")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark render heatmap attention")
+    parser.add_argument('--image', type=str, default=None, help='Default gambar gradien sintetis 640x480.')
+    parser.add_argument('--tokens', type=int, nargs='+', default=[8, 16, 30])
+    parser.add_argument('--tile_size', type=int, default=224)
+    parser.add_argument('--runs', type=int, default=10)
+    main(parser.parse_args())
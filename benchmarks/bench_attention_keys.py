@@ -0,0 +1,93 @@
+"""Biaya per langkah decoder: W1(features) dihitung ulang tiap langkah vs kunci attention yang di-precompute.
+
+Mengukur satu langkah RNN_Decoder (tf.function) untuk beberapa ukuran
+batch, serta satu caption greedy penuh (graph) dan beam search. Logit kedua
+varian dibandingkan supaya hasilnya dipastikan identik.
+
+Contoh:
+    python benchmarks/bench_attention_keys.py --batch_sizes 1 8 24 --runs 50
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import tensorflow as tf
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
+
+from caption_generator import build_caption_models
+
+
+def median_ms(fn, runs):
+    fn()
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000.0)
+    return float(np.median(samples))
+
+
+def bench_step(encoder, decoder, config, batch_size, runs):
+    features = encoder(tf.random.uniform([batch_size, config['attention_features_shape'],
+                                          config['features_shape']]), training=False)
+    keys = decoder.precompute_attention_keys(features)
+    hidden = tf.random.normal([batch_size, config['units']])
+    dec_input = tf.fill([batch_size, 1], 3)
+
+    @tf.function
+    def step_recompute(dec_input, features, hidden):
+        return decoder(dec_input, features, hidden, training=False)[0]
+
+    @tf.function
+    def step_cached(dec_input, features, hidden, keys):
+        return decoder(dec_input, features, hidden, training=False, attention_keys=keys)[0]
+
+    max_diff = float(tf.reduce_max(tf.abs(step_recompute(dec_input, features, hidden)
+                                          - step_cached(dec_input, features, hidden, keys))))
+    before = median_ms(lambda: step_recompute(dec_input, features, hidden).numpy(), runs)
+    after = median_ms(lambda: step_cached(dec_input, features, hidden, keys).numpy(), runs)
+    return {'step_ms_recompute': before, 'step_ms_cached_keys': after,
+            'speedup': before / after, 'max_logit_diff': max_diff}
+
+
+def main(args):
+    from caption_generator import build_greedy_caption_fn, _beam_search_decode
+    from vocabulary import Vocabulary
+
+    config = {'embedding_dim': args.embedding_dim, 'units': args.units, 'vocab_size': args.vocab_size,
+              'max_length': args.max_length, 'features_shape': 2048, 'attention_features_shape': 64}
+    encoder, decoder = build_caption_models(config)
+    report = {'config': config, 'cpu_count': os.cpu_count(), 'decoder_step': {}}
+    for batch_size in args.batch_sizes:
+        report['decoder_step'][str(batch_size)] = bench_step(encoder, decoder, config, batch_size, args.runs)
+
+    # Caption penuh: greedy graph dan beam search (eager), memakai bobot acak dan
+    # tanpa '<end>' yang cepat muncul sehingga semua max_length langkah dijalankan.
+    vocab = Vocabulary(['<pad>', '<unk>', '<start>', '<end>'] + [f'w{i}' for i in range(args.vocab_size - 4)])
+    img_features = tf.random.uniform([1, 64, 2048])
+    greedy = build_greedy_caption_fn(encoder, decoder, vocab, config)
+    report['greedy_caption_ms'] = median_ms(lambda: greedy(img_features)[0].numpy(), max(3, args.runs // 10))
+    features = encoder(img_features, training=False)
+    report['beam_caption_ms'] = median_ms(
+        lambda: _beam_search_decode(features, decoder, vocab, config, args.beam_width, 0.6),
+        max(3, args.runs // 10))
+    print(json.dumps(report, indent=2))
+    for batch_size, stats in report['decoder_step'].items():
+        print(f"batch {batch_size}: {stats['step_ms_recompute']:.3f} -> {stats['step_ms_cached_keys']:.3f} "
+              f"ms/langkah ({stats['speedup']:.2f}x), selisih logit maks {stats['max_logit_diff']:.2e}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark kunci attention yang di-precompute")
+    parser.add_argument('--batch_sizes', type=int, nargs='+', default=[1, 8, 24])
+    parser.add_argument('--runs', type=int, default=50)
+    parser.add_argument('--vocab_size', type=int, default=5000)
+    parser.add_argument('--embedding_dim', type=int, default=256)
+    parser.add_argument('--units', type=int, default=512)
+    parser.add_argument('--max_length', type=int, default=30)
+    parser.add_argument('--beam_width', type=int, default=3)
+    main(parser.parse_args())
@@ -0,0 +1,79 @@
+"""Membandingkan cold start load_model_assets (.keras/.h5/pickle) dengan bundle inferensi.
+
+Setiap loader dijalankan di proses Python baru supaya import TensorFlow dan
+tracing graph ikut terukur seperti saat replika baru dinyalakan.
+
+Contoh:
+    python benchmarks/bench_cold_start.py --runs 3 --inference_mode graph
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend')
+sys.path.insert(0, BACKEND_DIR)
+
+from synthetic_assets import make_synthetic_assets
+
+# Dijalankan di proses anak: cetak satu baris JSON berisi timing per fase.
+CHILD_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+sys.path.insert(0, {backend_dir!r})
+import tensorflow as tf
+from caption_generator import load_model_assets
+from inference_bundle import load_inference_bundle
+timings = {{'import': round(time.perf_counter() - started, 4)}}
+phases = {{}}
+if {loader!r} == 'bundle':
+    load_inference_bundle({path!r}, inference_mode={mode!r}, timings=phases)
+else:
+    load_model_assets({path!r}, inference_mode={mode!r}, timings=phases)
+timings.update(phases)
+timings['process_total'] = round(time.perf_counter() - started, 4)
+print('TIMINGS ' + json.dumps(timings))
+"""
+
+
+def run_child(loader, path, mode):
+    script = CHILD_SCRIPT.format(backend_dir=BACKEND_DIR, loader=loader, path=path, mode=mode)
+    output = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, check=True)
+    for line in output.stdout.splitlines():
+        if line.startswith('TIMINGS '):
+            return json.loads(line[len('TIMINGS '):])
+    raise RuntimeError(f"Proses anak tidak mengembalikan timing:\n{output.stderr[-2000:]}")
+
+
+def main(args):
+    from caption_generator import load_model_assets
+    from inference_bundle import export_inference_bundle
+
+    work_dir = tempfile.mkdtemp(prefix='bench_cold_start_')
+    model_dir = args.model_dir or make_synthetic_assets(os.path.join(work_dir, 'assets'))
+    bundle_dir = os.path.join(work_dir, 'bundle')
+    encoder, decoder, tokenizer, inception_model, config = load_model_assets(model_dir)
+    export_inference_bundle(bundle_dir, inception_model, encoder, decoder, tokenizer, config)
+
+    report = {}
+    for loader, path in (('model_dir', model_dir), ('bundle', bundle_dir)):
+        runs = [run_child(loader, path, args.inference_mode) for _ in range(args.runs)]
+        report[loader] = {phase: min(run[phase] for run in runs) for phase in runs[0]}
+
+    print(json.dumps({'inference_mode': args.inference_mode, 'runs': args.runs,
+                      'best_of_runs_seconds': report}, indent=2))
+    speedup = report['model_dir']['total'] / report['bundle']['total']
+    print(f"Load (tanpa import TF): {report['model_dir']['total']:.2f} s -> "
+          f"{report['bundle']['total']:.2f} s ({speedup:.2f}x)")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark cold start loader model caption")
+    parser.add_argument('--model_dir', type=str, default=None,
+                        help='Direktori aset model; default memakai aset sintetis.')
+    parser.add_argument('--inference_mode', type=str, default='graph', choices=['eager', 'graph'])
+    parser.add_argument('--runs', type=int, default=3)
+    main(parser.parse_args())
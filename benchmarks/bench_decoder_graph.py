@@ -0,0 +1,61 @@
+"""Membandingkan latensi per caption: loop decoder eager vs graph tf.function.
+
+Contoh:
+    python benchmarks/bench_decoder_graph.py --runs 20
+    python benchmarks/bench_decoder_graph.py --model_dir backend/image_captioning_model_assets
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
+
+from synthetic_assets import make_synthetic_assets, make_synthetic_images
+from caption_generator import load_model_assets, generate_captions_batch
+
+
+def time_captions(images, assets, runs):
+    encoder, decoder, tokenizer, inception_model, config = assets
+    # Satu panggilan pemanasan supaya tracing/inisialisasi tidak ikut terukur.
+    generate_captions_batch(images, inception_model, encoder, decoder, tokenizer, config)
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        captions, _ = generate_captions_batch(
+            images, inception_model, encoder, decoder, tokenizer, config)
+        timings.append((time.perf_counter() - start) * 1000.0)
+    return np.array(timings), captions
+
+
+def main(args):
+    work_dir = tempfile.mkdtemp(prefix='bench_decoder_graph_')
+    model_dir = args.model_dir or make_synthetic_assets(os.path.join(work_dir, 'assets'))
+    images = make_synthetic_images(os.path.join(work_dir, 'images'), count=args.batch_size)
+
+    results = {}
+    for mode in ('eager', 'graph'):
+        assets = load_model_assets(model_dir, inference_mode=mode)
+        timings, captions = time_captions(images, assets, args.runs)
+        results[mode] = (timings, captions)
+
+    print(f"\nBatch size: {args.batch_size}, runs: {args.runs}")
+    for mode, (timings, _) in results.items():
+        print(f"{mode:>6}: p50 {np.percentile(timings, 50):8.1f} ms   "
+              f"p95 {np.percentile(timings, 95):8.1f} ms")
+    eager_p50 = np.percentile(results['eager'][0], 50)
+    graph_p50 = np.percentile(results['graph'][0], 50)
+    print(f"Speedup (p50): {eager_p50 / graph_p50:.2f}x")
+    print(f"Caption sama: {results['eager'][1] == results['graph'][1]}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark decoder eager vs graph")
+    parser.add_argument('--model_dir', type=str, default=None,
+                        help='Direktori aset model; default memakai aset sintetis.')
+    parser.add_argument('--batch_size', type=int, default=1)
+    parser.add_argument('--runs', type=int, default=10)
+    main(parser.parse_args())
@@ -0,0 +1,84 @@
+"""Satu epoch baca fitur: file .npy per gambar (pola notebook) vs FeatureStore memmap.
+
+Fitur acak (64x2048) ditulis sebagai `<gambar>.jpg.npy` lalu diimpor ke
+FeatureStore. Kedua dataset dibaca penuh dengan ukuran batch yang sama.
+Di disk lokal dengan page cache hangat selisihnya terutama dari overhead
+open/np.load per sampel; di NFS latensi metadata per file memperbesarnya.
+
+Contoh:
+    python benchmarks/bench_feature_store.py --count 2000 --batch_size 64
+    python benchmarks/bench_feature_store.py --work_dir /mnt/nfs-bulk/tmp/bench_fs
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import tensorflow as tf
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
+
+from feature_store import FeatureStore, import_npy_features
+
+
+def npy_dataset(paths, targets, batch_size):
+    """Pipeline notebook lama: np.load per sampel lewat tf.numpy_function."""
+    def map_func(img_name, cap):
+        return np.load(img_name.decode('utf-8') + '.npy'), cap
+
+    dataset = tf.data.Dataset.from_tensor_slices((paths, targets))
+    dataset = dataset.map(lambda item1, item2: tf.numpy_function(
+        map_func, [item1, item2], [tf.float32, tf.int32]), num_parallel_calls=tf.data.AUTOTUNE)
+    return dataset.batch(batch_size).prefetch(tf.data.AUTOTUNE)
+
+
+def time_epoch(dataset):
+    start = time.perf_counter()
+    samples = 0
+    for features, _ in dataset:
+        samples += int(features.shape[0])
+    return time.perf_counter() - start, samples
+
+
+def main(args):
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix='bench_feature_store_')
+    image_dir = os.path.join(work_dir, 'images')
+    os.makedirs(image_dir, exist_ok=True)
+    rng = np.random.default_rng(0)
+    paths = [os.path.join(image_dir, f'img_{i:06d}.jpg') for i in range(args.count)]
+    for path in paths:
+        if not os.path.exists(path + '.npy'):
+            np.save(path + '.npy', rng.random((64, 2048), dtype=np.float32))
+    targets = rng.integers(0, 5000, size=(args.count, 30), dtype=np.int32)
+
+    start = time.perf_counter()
+    store = FeatureStore(os.path.join(work_dir, 'store'))
+    import_npy_features(paths, store)
+    import_s = time.perf_counter() - start
+
+    report = {'samples': args.count, 'batch_size': args.batch_size, 'import_s': import_s,
+              'npy_bytes': sum(os.path.getsize(p + '.npy') for p in paths),
+              'store_bytes': os.path.getsize(store.data_path)}
+    for name, make in (('npy_per_file', lambda: npy_dataset(paths, targets, args.batch_size)),
+                       ('feature_store', lambda: store.make_dataset(paths, targets, args.batch_size))):
+        epochs = [time_epoch(make()) for _ in range(args.epochs)]
+        seconds = min(elapsed for elapsed, _ in epochs)
+        report[name] = {'epoch_s': seconds, 'samples_per_s': epochs[0][1] / seconds}
+
+    sample = np.load(paths[0] + '.npy')
+    report['max_abs_error_float16'] = float(np.abs(store.get(paths[0]).astype(np.float32) - sample).max())
+    report['speedup'] = report['npy_per_file']['epoch_s'] / report['feature_store']['epoch_s']
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark FeatureStore vs file .npy per gambar")
+    parser.add_argument('--count', type=int, default=1000)
+    parser.add_argument('--batch_size', type=int, default=64)
+    parser.add_argument('--epochs', type=int, default=2)
+    parser.add_argument('--work_dir', type=str, default=None,
+                        help='Lokasi file uji (mis. di NFS); default direktori sementara.')
+    main(parser.parse_args())
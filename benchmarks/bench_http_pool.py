@@ -0,0 +1,130 @@
+"""Membandingkan latensi hop HTTP: client baru per request vs client bersama (pool keep-alive).
+
+Menjalankan stub Ollama lokal (uvicorn, /api/generate non-stream) lalu
+mengukur `query_ollama_for_story` di api.py dengan client httpx bersama, dibanding
+pola lama `async with httpx.AsyncClient()` per request, serta
+PooledHttpClient milik app-backend. Untuk URL https penghematannya lebih
+besar lagi karena handshake TLS juga ikut dihindari.
+
+Contoh:
+    python benchmarks/bench_http_pool.py --requests 200 --concurrency 8
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import sys
+import threading
+import time
+
+import httpx
+import numpy as np
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT_DIR, 'backend'))
+sys.path.insert(0, ROOT_DIR)
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_stub_ollama(port, delay_ms):
+    """Stub /api/generate yang membalas cerita tetap setelah `delay_ms`."""
+    import uvicorn
+    from fastapi import FastAPI
+
+    stub = FastAPI()
+
+    @stub.post('/api/generate')
+    async def generate(body: dict):
+        if delay_ms:
+            await asyncio.sleep(delay_ms / 1000.0)
+        return {'model': body.get('model'), 'response': 'A short story. [SEPARATOR] The end.', 'done': True}
+
+    server = uvicorn.Server(uvicorn.Config(stub, host='127.0.0.1', port=port, log_level='warning'))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+async def measure(call, total, concurrency):
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            await call()
+            latencies.append((time.perf_counter() - start) * 1000.0)
+
+    await call()
+    start = time.perf_counter()
+    await asyncio.gather(*[one() for _ in range(total)])
+    elapsed = time.perf_counter() - start
+    return {
+        'p50_ms': float(np.percentile(latencies, 50)),
+        'p95_ms': float(np.percentile(latencies, 95)),
+        'requests_per_s': total / elapsed,
+    }
+
+
+async def run(args, port):
+    import api
+    from http_clients import PooledHttpClient
+
+    url = f'http://127.0.0.1:{port}/api/generate'
+    payload = {'model': api.OLLAMA_MODEL_ID, 'prompt': 'x', 'stream': False}
+    captions = ['a dog runs on the grass', 'a cat sleeps on a sofa']
+
+    async def per_request_client():
+        async with httpx.AsyncClient(timeout=180.0) as client:
+            (await client.post(url, json=payload)).raise_for_status()
+
+    pooled = PooledHttpClient('bench', max_connections=args.concurrency * 2)
+
+    async def pooled_client():
+        (await pooled.get().post(url, json=payload)).raise_for_status()
+
+    async def api_query():
+        await api.query_ollama_for_story(captions)
+
+    report = {}
+    for name, call in (('per_request_client', per_request_client),
+                       ('pooled_http_client', pooled_client),
+                       ('api_query_ollama_for_story', api_query)):
+        report[name] = await measure(call, args.requests, args.concurrency)
+    report['pooled_http_client']['pool'] = pooled.stats()
+    report['api_query_ollama_for_story']['pool'] = (await api.read_stats())['ollama_pool']
+    await pooled.aclose()
+    await api.close_ollama_client()
+    return report
+
+
+def main(args):
+    port = _free_port()
+    os.environ['OLLAMA_API_URL'] = f'http://127.0.0.1:{port}'
+    server = start_stub_ollama(port, args.delay_ms)
+    try:
+        report = asyncio.run(run(args, port))
+    finally:
+        server.should_exit = True
+    report['config'] = {'requests': args.requests, 'concurrency': args.concurrency, 'stub_delay_ms': args.delay_ms}
+    print(json.dumps(report, indent=2))
+    base = report['per_request_client']['p50_ms']
+    for name in ('pooled_http_client', 'api_query_ollama_for_story'):
+        print(f"{name}: p50 {report[name]['p50_ms']:.2f} ms vs {base:.2f} ms per-request client "
+              f"({base / report[name]['p50_ms']:.2f}x)")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark client HTTP bersama vs per request")
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--delay_ms', type=float, default=0.0,
+                        help='Waktu "generasi" stub Ollama per request.')
+    main(parser.parse_args())
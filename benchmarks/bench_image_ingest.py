@@ -0,0 +1,136 @@
+"""Waktu decode dan puncak RSS ingest gambar per resolusi: decode penuh vs decode tereduksi.
+
+Untuk setiap resolusi dibuat JPEG sintetis, lalu tiga jalur dibandingkan
+sampai tensor 299x299 siap masuk InceptionV3:
+  - tf_full  : tf.io.decode_image resolusi penuh + cast float32 + tf.image.resize (jalur lama)
+  - ingest   : caption_generator.decode_image_bytes (cek header; JPEG besar lewat PIL draft) + tf.image.resize
+  - pil_draft: image_ingest.decode_image (PIL draft, jalur tanpa TensorFlow) + tf.image.resize
+Setiap pengukuran berjalan di proses terpisah supaya puncak RSS (ru_maxrss,
+dikurangi RSS setelah import) tidak tercampur. Selisih piksel rata-rata input
+299x299 terhadap jalur lama ikut dilaporkan, begitu pula waktu menolak gambar yang
+melewati batas piksel (hanya header yang dibaca).
+
+Contoh:
+    python benchmarks/bench_image_ingest.py --resolutions 1920x1080 4000x3000 8000x6000 --runs 5
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+from PIL import Image
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend')
+sys.path.insert(0, BACKEND_DIR)
+
+from image_ingest import ImageTooLargeError, decode_image, jpeg_scale_ratio  # noqa: E402
+
+MEASURE_SCRIPT = """
+import resource, sys, time
+sys.path.insert(0, {backend_dir!r})
+import numpy as np
+import tensorflow as tf
+from caption_generator import decode_image_bytes
+from image_ingest import decode_image
+
+with open({image_path!r}, 'rb') as f:
+    image_bytes = f.read()
+
+def tf_full():
+    img = tf.io.decode_image(image_bytes, channels=3, expand_animations=False)
+    return tf.image.resize(tf.cast(img, tf.float32), (299, 299)).numpy()
+
+def ingest():
+    return tf.image.resize(decode_image_bytes(image_bytes), (299, 299)).numpy()
+
+def pil_draft():
+    return tf.image.resize(decode_image(image_bytes), (299, 299)).numpy()
+
+fn = {{'tf_full': tf_full, 'ingest': ingest, 'pil_draft': pil_draft}}[{method!r}]
+tf.image.resize(tf.zeros([8, 8, 3]), (299, 299))
+baseline_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+samples = []
+for _ in range({runs}):
+    start = time.perf_counter()
+    pixels = fn()
+    samples.append((time.perf_counter() - start) * 1000.0)
+peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+np.save({output_path!r}, pixels)
+print('RESULT', float(np.median(samples)), (peak_kb - baseline_kb) / 1024.0)
+"""
+
+
+def make_jpeg(path, width, height, quality=90):
+    """JPEG sintetis: gradien halus + noise, supaya ukuran file mendekati foto asli."""
+    rng = np.random.default_rng(width * height)
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    x = np.linspace(0, 255, width, dtype=np.float32)[None, :]
+    pixels = np.empty((height, width, 3), dtype=np.uint8)
+    pixels[..., 0] = (x + y) / 2
+    pixels[..., 1] = x
+    pixels[..., 2] = 255 - y
+    pixels += rng.integers(0, 24, size=(height, width, 1), dtype=np.uint8)
+    Image.fromarray(pixels).save(path, quality=quality)
+    return os.path.getsize(path)
+
+
+def measure(method, image_path, work_dir, runs):
+    output_path = os.path.join(work_dir, f'{method}.npy')
+    script = MEASURE_SCRIPT.format(backend_dir=BACKEND_DIR, image_path=image_path, method=method,
+                                   runs=runs, output_path=output_path)
+    output = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, check=True).stdout
+    line = next(line for line in output.splitlines() if line.startswith('RESULT'))
+    _, decode_ms, peak_rss_mb = line.split()
+    return {'decode_ms': float(decode_ms), 'peak_rss_mb': float(peak_rss_mb)}, np.load(output_path)
+
+
+def measure_reject(image_path, runs):
+    with open(image_path, 'rb') as f:
+        image_bytes = f.read()
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        try:
+            decode_image(image_bytes, max_pixels=1)
+        except ImageTooLargeError:
+            pass
+        samples.append((time.perf_counter() - start) * 1000.0)
+    return float(np.median(samples))
+
+
+def main(args):
+    work_dir = tempfile.mkdtemp(prefix='bench_image_ingest_')
+    report = {'cpu_count': os.cpu_count(), 'runs': args.runs, 'resolutions': {}}
+    for resolution in args.resolutions:
+        width, height = (int(v) for v in resolution.lower().split('x'))
+        image_path = os.path.join(work_dir, f'{resolution}.jpg')
+        file_bytes = make_jpeg(image_path, width, height)
+        stats = {'megapixels': width * height / 1e6, 'file_mb': file_bytes / (1024 * 1024),
+                 'dct_scale_ratio': jpeg_scale_ratio((width, height))}
+        pixels = {}
+        for method in ('tf_full', 'ingest', 'pil_draft'):
+            stats[method], pixels[method] = measure(method, image_path, work_dir, args.runs)
+        # Selisih input 299x299 terhadap jalur lama, dalam skala piksel 0-255.
+        for method in ('ingest', 'pil_draft'):
+            stats[method]['mean_abs_pixel_diff_299'] = float(np.abs(pixels['tf_full'] - pixels[method]).mean())
+        stats['reject_over_limit_ms'] = measure_reject(image_path, args.runs)
+        report['resolutions'][resolution] = stats
+    print(json.dumps(report, indent=2))
+    for resolution, stats in report['resolutions'].items():
+        print(f"{resolution} ({stats['megapixels']:.1f} MP, 1/{stats['dct_scale_ratio']}): decode "
+              f"{stats['tf_full']['decode_ms']:.1f} -> {stats['ingest']['decode_ms']:.1f} ms "
+              f"(PIL {stats['pil_draft']['decode_ms']:.1f} ms), puncak RSS {stats['tf_full']['peak_rss_mb']:.0f} -> "
+              f"{stats['ingest']['peak_rss_mb']:.0f} MB (PIL {stats['pil_draft']['peak_rss_mb']:.0f} MB), "
+              f"tolak {stats['reject_over_limit_ms']:.2f} ms")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark decode gambar per resolusi")
+    parser.add_argument('--resolutions', type=str, nargs='+',
+                        default=['640x480', '1920x1080', '4000x3000', '8000x6000'])
+    parser.add_argument('--runs', type=int, default=5)
+    main(parser.parse_args())
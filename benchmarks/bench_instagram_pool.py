@@ -0,0 +1,197 @@
+"""Latensi posting Instagram: login penuh per post vs InstagramClientPool.
+
+Instagram diganti stand-in lokal (StandInClient) dengan latensi tiruan untuk
+login penuh, validasi sesi (account_info) dan unggah foto, sehingga jumlah
+login dan latensi bisa diukur tanpa akun sungguhan. Skenario:
+  - per_post_login : Client baru + login penuh setiap post (perilaku lama)
+  - pool_warm      : client yang sama dipakai ulang
+  - pool_restart   : pool baru (restart server) memulihkan sesi dari file
+  - concurrent     : beberapa thread memposting ke beberapa akun bersamaan;
+                     stand-in mencatat jika satu client dipakai dua thread sekaligus
+  - session_revoked: sesi dicabut server, pool login ulang lalu mengulang unggahan
+
+Contoh:
+    python benchmarks/bench_instagram_pool.py --posts 10 --login_ms 1500 --upload_ms 300
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
+
+from instagrapi.exceptions import LoginRequired  # noqa: E402
+from instagram_uploader import InstagramClientPool  # noqa: E402
+
+
+class StandInServer:
+    """Sisi 'Instagram': token sesi yang masih berlaku dan latensi tiap operasi."""
+
+    def __init__(self, login_s, validate_s, upload_s):
+        self.login_s, self.validate_s, self.upload_s = login_s, validate_s, upload_s
+        self.lock = threading.Lock()
+        self.tokens = set()
+        self.full_logins = 0
+        self.uploads = 0
+        self.concurrent_use = 0
+
+    def issue(self):
+        token = uuid.uuid4().hex
+        with self.lock:
+            self.tokens.add(token)
+            self.full_logins += 1
+        return token
+
+    def valid(self, token):
+        with self.lock:
+            return token in self.tokens
+
+    def revoke_all(self):
+        with self.lock:
+            self.tokens.clear()
+
+
+def stand_in_factory(server):
+    class StandInClient:
+        """Antarmuka instagrapi.Client yang dipakai pool: login, relogin, get_settings, photo_upload."""
+
+        def __init__(self, settings=None):
+            self.settings = dict(settings or {})
+            self.user_id = self.settings.get('user_id')
+            self.username = self.password = None
+            self.relogin_attempt = 0
+            self._in_use = threading.Lock()
+
+        def _enter(self):
+            if not self._in_use.acquire(blocking=False):
+                with server.lock:
+                    server.concurrent_use += 1
+                self._in_use.acquire()
+
+        def login(self, username, password, relogin=False):
+            self._enter()
+            try:
+                self.username, self.password = username, password
+                if self.user_id and not relogin:
+                    time.sleep(server.validate_s)
+                    if server.valid(self.settings.get('sessionid')):
+                        return True
+                time.sleep(server.login_s)
+                self.settings = {'sessionid': server.issue(), 'user_id': username, 'uuids': {'phone_id': username}}
+                self.user_id = username
+                return True
+            finally:
+                self._in_use.release()
+
+        def relogin(self):
+            return self.login(self.username, self.password, relogin=True)
+
+        def get_settings(self):
+            return dict(self.settings)
+
+        def photo_upload(self, image_path, caption):
+            self._enter()
+            try:
+                time.sleep(server.upload_s)
+                if not server.valid(self.settings.get('sessionid')):
+                    raise LoginRequired("login_required")
+                with server.lock:
+                    server.uploads += 1
+                return {'id': uuid.uuid4().hex, 'caption': caption}
+            finally:
+                self._in_use.release()
+
+    return StandInClient
+
+
+def timed_posts(post, count):
+    samples = []
+    for i in range(count):
+        start = time.perf_counter()
+        post(i)
+        samples.append((time.perf_counter() - start) * 1000.0)
+    return samples
+
+
+def summary(samples):
+    return {'first_ms': samples[0], 'median_ms': float(np.median(samples)), 'max_ms': float(np.max(samples))}
+
+
+def main(args):
+    server = StandInServer(args.login_ms / 1000, args.validate_ms / 1000, args.upload_ms / 1000)
+    factory = stand_in_factory(server)
+    session_file = os.path.join(tempfile.mkdtemp(prefix='bench_ig_pool_'), 'ig_session.json')
+    report = {'latency_model_ms': {'login': args.login_ms, 'validate': args.validate_ms, 'upload': args.upload_ms}}
+
+    def per_post_login(i):
+        client = factory()
+        client.login('akun0', 'rahasia')
+        client.photo_upload('foto.jpg', f'caption {i}')
+
+    logins_before = server.full_logins
+    report['per_post_login'] = dict(summary(timed_posts(per_post_login, args.posts)),
+                                    full_logins=server.full_logins - logins_before)
+
+    pool = InstagramClientPool(session_file=session_file, client_factory=factory)
+    logins_before = server.full_logins
+    samples = timed_posts(lambda i: pool.post_photo('akun0', 'rahasia', 'foto.jpg', f'caption {i}'), args.posts)
+    report['pool_warm'] = dict(summary(samples), full_logins=server.full_logins - logins_before)
+
+    restarted = InstagramClientPool(session_file=session_file, client_factory=factory)
+    logins_before = server.full_logins
+    samples = timed_posts(lambda i: restarted.post_photo('akun0', 'rahasia', 'foto.jpg', f'caption {i}'), args.posts)
+    report['pool_restart'] = dict(summary(samples), full_logins=server.full_logins - logins_before,
+                                  stats=restarted.stats())
+
+    pool = InstagramClientPool(session_file=None, client_factory=factory)
+    logins_before, concurrent_before = server.full_logins, server.concurrent_use
+    jobs = [(f'akun{i % args.accounts}', i) for i in range(args.accounts * args.posts)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as executor:
+        list(executor.map(lambda job: pool.post_photo(job[0], 'rahasia', 'foto.jpg', f'caption {job[1]}'), jobs))
+    report['concurrent'] = {
+        'posts': len(jobs), 'accounts': args.accounts, 'threads': args.threads,
+        'wall_s': time.perf_counter() - started,
+        'full_logins': server.full_logins - logins_before,
+        'client_used_concurrently': server.concurrent_use - concurrent_before,
+        'stats': pool.stats(),
+    }
+
+    server.revoke_all()
+    logins_before = server.full_logins
+    start = time.perf_counter()
+    restarted.post_photo('akun0', 'rahasia', 'foto.jpg', 'setelah sesi dicabut')
+    report['session_revoked'] = {'post_ms': (time.perf_counter() - start) * 1000.0,
+                                 'full_logins': server.full_logins - logins_before,
+                                 'relogins': restarted.stats()['relogins']}
+
+    wrong = InstagramClientPool(session_file=session_file, client_factory=factory)
+    logins_before = server.full_logins
+    wrong.post_photo('akun0', 'password-lain', 'foto.jpg', 'password berbeda')
+    report['different_password_full_login'] = server.full_logins - logins_before == 1
+
+    print(json.dumps(report, indent=2))
+    print(f"post per login: {report['per_post_login']['median_ms']:.0f} ms, pool: "
+          f"{report['pool_warm']['median_ms']:.0f} ms (pertama {report['pool_warm']['first_ms']:.0f} ms), "
+          f"setelah restart pertama {report['pool_restart']['first_ms']:.0f} ms tanpa login penuh="
+          f"{report['pool_restart']['full_logins'] == 0}; concurrent {report['concurrent']['posts']} post, "
+          f"{report['concurrent']['full_logins']} login, pemakaian client bersamaan "
+          f"{report['concurrent']['client_used_concurrently']}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark pool client Instagram dengan stand-in lokal")
+    parser.add_argument('--posts', type=int, default=10, help='Post per akun per skenario.')
+    parser.add_argument('--accounts', type=int, default=3)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--login_ms', type=float, default=1500)
+    parser.add_argument('--validate_ms', type=float, default=150)
+    parser.add_argument('--upload_ms', type=float, default=300)
+    main(parser.parse_args())
@@ -0,0 +1,122 @@
+"""Runtime NumPy vs Keras untuk decoder caption: latensi per token.
+
+Paritas NumPy vs Keras (langkah decode, sel GRU stateful, caption greedy dan
+beam) diperiksa oleh tests/test_numpy_decoder.py. Di sini juga dicek bahwa
+decoding dari direktori aset berjalan tanpa mengimpor TensorFlow.
+
+Contoh:
+    python benchmarks/bench_numpy_decoder.py --batch_sizes 1 8 32 --runs 30
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend')
+sys.path.insert(0, BACKEND_DIR)
+
+from synthetic_assets import make_synthetic_assets  # noqa: E402
+import tensorflow as tf  # noqa: E402
+from caption_generator import load_model_assets  # noqa: E402
+from numpy_decoder import NumpyCNNEncoder, NumpyRNNDecoder  # noqa: E402
+
+# Proses anak: decode dari direktori aset, lalu pastikan TensorFlow tidak ikut terimpor.
+NO_TF_SCRIPT = """
+import sys, time
+sys.path.insert(0, {backend_dir!r})
+import numpy as np
+started = time.perf_counter()
+from numpy_decoder import load_numpy_caption_models, caption_features
+encoder, decoder, vocab, config = load_numpy_caption_models({model_dir!r})
+loaded = time.perf_counter()
+features = np.random.default_rng(0).random((4, 64, 2048), dtype=np.float32)
+captions, _ = caption_features(features, encoder, decoder, vocab, config)
+print('NO_TF', 'tensorflow' not in sys.modules, round(loaded - started, 4), len(captions))
+"""
+
+
+def median_ms(fn, runs):
+    fn()
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000.0)
+    return float(np.median(samples))
+
+
+def bench_latency(assets, graph_decoder, np_encoder, np_decoder, batch_size, runs):
+    encoder, decoder, tokenizer, _, config = assets
+    rng = np.random.default_rng(2)
+    img_features = rng.random((batch_size, 64, 2048), dtype=np.float32)
+    features = encoder(img_features)
+    keys = decoder.precompute_attention_keys(features)
+    hidden = decoder.reset_state(batch_size)
+    dec_input = tf.fill([batch_size, 1], 3)
+    np_features = np_encoder(img_features)
+    np_keys = np_decoder.precompute_attention_keys(np_features)
+    np_hidden = np_decoder.reset_state(batch_size)
+    np_tokens = np.full(batch_size, 3)
+    max_length = config['max_length']
+
+    # Caption penuh: paksa semua max_length langkah dengan end_id yang tidak pernah muncul.
+    def numpy_caption():
+        np_decoder.greedy_decode(np_encoder(img_features), 2, -1, max_length)
+
+    return {
+        'keras_eager_step_ms': median_ms(
+            lambda: decoder(dec_input, features, hidden, attention_keys=keys)[0].numpy(), runs),
+        'numpy_step_ms': median_ms(lambda: np_decoder.step(np_tokens, np_features, np_hidden, np_keys), runs),
+        'tf_graph_greedy_caption_ms': median_ms(
+            lambda: graph_decoder.greedy_caption_fn(tf.constant(img_features))[0].numpy(), runs),
+        'numpy_greedy_caption_ms': median_ms(numpy_caption, runs),
+        'max_length': max_length,
+    }
+
+
+def main(args):
+    work_dir = tempfile.mkdtemp(prefix='bench_numpy_decoder_')
+    model_dir = args.model_dir or make_synthetic_assets(
+        os.path.join(work_dir, 'assets'), vocab_size=args.vocab_size, max_length=args.max_length)
+    assets = load_model_assets(model_dir)
+    _, _, tokenizer, _, config = assets
+    graph_decoder = load_model_assets(model_dir, inference_mode='graph')[1]
+    np_encoder = NumpyCNNEncoder.from_h5(os.path.join(model_dir, 'cnn_encoder.weights.h5'))
+    np_decoder = NumpyRNNDecoder.from_h5(os.path.join(model_dir, 'rnn_decoder.weights.h5'))
+
+    report = {'config': config, 'cpu_count': os.cpu_count()}
+
+    if not os.path.exists(os.path.join(model_dir, 'vocab.json')):
+        tokenizer.save(os.path.join(model_dir, 'vocab.json'))
+    output = subprocess.run([sys.executable, '-c', NO_TF_SCRIPT.format(backend_dir=BACKEND_DIR, model_dir=model_dir)],
+                            capture_output=True, text=True, check=True).stdout
+    line = next(line for line in output.splitlines() if line.startswith('NO_TF'))
+    _, no_tf, load_s, _ = line.split()
+    report['no_tensorflow'] = {'tensorflow_not_imported': no_tf == 'True', 'load_s': float(load_s)}
+
+    report['latency'] = {str(batch_size): bench_latency(assets, graph_decoder, np_encoder, np_decoder,
+                                                        batch_size, args.runs)
+                         for batch_size in args.batch_sizes}
+    print(json.dumps(report, indent=2))
+    for batch_size, stats in report['latency'].items():
+        per_token_graph = stats['tf_graph_greedy_caption_ms'] / stats['max_length']
+        per_token_numpy = stats['numpy_greedy_caption_ms'] / stats['max_length']
+        print(f"batch {batch_size}: langkah {stats['keras_eager_step_ms']:.3f} ms (Keras eager) vs "
+              f"{stats['numpy_step_ms']:.3f} ms (NumPy); per token caption penuh {per_token_graph:.3f} ms "
+              f"(graph TF) vs {per_token_numpy:.3f} ms (NumPy)")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Latensi runtime NumPy decoder")
+    parser.add_argument('--model_dir', type=str, default=None,
+                        help='Aset model asli; default aset sintetis berbobot acak.')
+    parser.add_argument('--vocab_size', type=int, default=5000)
+    parser.add_argument('--max_length', type=int, default=30)
+    parser.add_argument('--batch_sizes', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--runs', type=int, default=30)
+    main(parser.parse_args())
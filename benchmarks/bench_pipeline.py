@@ -0,0 +1,82 @@
+"""Throughput caption untuk satu folder: per gambar, batch berurutan, dan caption_pipeline.
+
+Mode `sequential` meniru generate_caption per gambar, `batched` menjalankan
+generate_captions_batch per potongan `--batch_size` (decode, Inception dan
+decoder bergantian), sedangkan `pipeline` memakai caption_pipeline yang
+menumpangtindihkan ketiga tahap. Keuntungan pipeline bertambah dengan jumlah
+core dan resolusi JPEG.
+
+Contoh:
+    python benchmarks/bench_pipeline.py --count 64 --batch_size 8
+    python benchmarks/bench_pipeline.py --model_dir backend/image_captioning_model_assets --images_dir album/
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
+
+from synthetic_assets import make_synthetic_assets, make_synthetic_images
+from caption_generator import load_model_assets, generate_captions_batch_simple
+from caption_pipeline import caption_pipeline
+
+
+def main(args):
+    work_dir = tempfile.mkdtemp(prefix='bench_pipeline_')
+    model_dir = args.model_dir or make_synthetic_assets(os.path.join(work_dir, 'assets'))
+    if args.images_dir:
+        images = sorted(glob.glob(os.path.join(args.images_dir, '*.jp*g')))[:args.count]
+    else:
+        images = make_synthetic_images(os.path.join(work_dir, 'images'), count=args.count,
+                                       size=(args.height, args.width))
+    encoder, decoder, tokenizer, inception_model, config = load_model_assets(model_dir, inference_mode='graph')
+    assets = (encoder, decoder, tokenizer, inception_model, config)
+    # Pemanasan untuk ukuran batch 1 dan --batch_size supaya tracing tidak ikut terukur.
+    generate_captions_batch_simple(images[:1], *assets)
+    generate_captions_batch_simple(images[:args.batch_size], *assets)
+
+    def sequential():
+        return [generate_captions_batch_simple([image], *assets)[0] for image in images]
+
+    def batched():
+        captions = []
+        for i in range(0, len(images), args.batch_size):
+            captions.extend(generate_captions_batch_simple(images[i:i + args.batch_size], *assets))
+        return captions
+
+    def pipelined():
+        return [caption for _, caption, _ in caption_pipeline(
+            iter(images), inception_model, encoder, decoder, tokenizer, config,
+            batch_size=args.batch_size, decode_workers=args.decode_workers)]
+
+    report = {'images': len(images), 'batch_size': args.batch_size, 'cpu_count': os.cpu_count(), 'modes': {}}
+    reference = None
+    for name, fn in (('sequential', sequential), ('batched', batched), ('pipeline', pipelined)):
+        start = time.perf_counter()
+        captions = fn()
+        elapsed = time.perf_counter() - start
+        reference = reference or captions
+        report['modes'][name] = {
+            'seconds': elapsed,
+            'images_per_s': len(images) / elapsed,
+            'captions_match_sequential': captions == reference,
+        }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark caption_pipeline untuk pekerjaan massal")
+    parser.add_argument('--model_dir', type=str, default=None,
+                        help='Direktori aset model; default memakai aset sintetis.')
+    parser.add_argument('--images_dir', type=str, default=None,
+                        help='Folder JPEG; default gambar sintetis.')
+    parser.add_argument('--count', type=int, default=32)
+    parser.add_argument('--height', type=int, default=1200)
+    parser.add_argument('--width', type=int, default=1600)
+    parser.add_argument('--batch_size', type=int, default=8)
+    parser.add_argument('--decode_workers', type=int, default=None)
+    main(parser.parse_args())
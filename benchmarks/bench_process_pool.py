@@ -0,0 +1,84 @@
+"""Mengukur throughput caption (gambar/detik) ProcessInferencePool untuk beberapa jumlah worker.
+
+Setelah pengukuran, RSS/PSS setiap worker (pool.stats()['worker_memory'])
+ikut dilaporkan: jika bobot benar-benar dipakai bersama lewat mmap, total
+PSS naik jauh lebih lambat daripada N x RSS satu worker, dan memori anonim
+per worker tidak memuat salinan bobot.
+
+Contoh:
+    python benchmarks/bench_process_pool.py --workers 1 2 4 --images 32
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
+
+from synthetic_assets import make_synthetic_assets, make_synthetic_images
+from caption_generator import load_model_assets
+from inference_bundle import export_inference_bundle
+from serving_pool import ProcessInferencePool
+
+
+def measure(pool, requests, batch_size, num_workers):
+    batches = [requests[i:i + batch_size] for i in range(0, len(requests), batch_size)]
+    pool.run(batches[0])
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=num_workers) as executor:
+        list(executor.map(pool.run, batches))
+    return len(requests) / (time.perf_counter() - start)
+
+
+def main(args):
+    work_dir = tempfile.mkdtemp(prefix='bench_process_pool_')
+    model_dir = args.model_dir or make_synthetic_assets(os.path.join(work_dir, 'assets'))
+    bundle_dir = os.path.join(work_dir, 'bundle')
+    encoder, decoder, tokenizer, inception_model, config = load_model_assets(model_dir)
+    export_inference_bundle(bundle_dir, inception_model, encoder, decoder, tokenizer, config)
+    del encoder, decoder, inception_model
+
+    images = make_synthetic_images(os.path.join(work_dir, 'images'), count=args.images)
+    requests = [{'image': open(path, 'rb').read(), 'features': None,
+                 'beam_width': 1, 'length_penalty': 0.6} for path in images]
+
+    results = {}
+    for num_workers in args.workers:
+        pool = ProcessInferencePool(bundle_dir, num_workers=num_workers, inference_mode=args.inference_mode)
+        start = time.perf_counter()
+        pool.start()
+        startup_s = time.perf_counter() - start
+        try:
+            throughput = measure(pool, requests, args.batch_size, num_workers)
+            results[num_workers] = (throughput, startup_s, pool.stats()['worker_memory'])
+        finally:
+            pool.close()
+
+    weights_mb = os.path.getsize(os.path.join(bundle_dir, 'weights.bin')) / (1024 * 1024)
+    print(f"\nCPU: {os.cpu_count()}, gambar: {args.images}, batch: {args.batch_size}, "
+          f"mode: {args.inference_mode}, weights.bin: {weights_mb:.1f} MB")
+    base = results[args.workers[0]][0]
+    for num_workers, (throughput, startup_s, memory) in results.items():
+        print(f"{num_workers:>2} worker: {throughput:7.2f} gambar/detik "
+              f"({throughput / base:.2f}x), startup {startup_s:.1f} s")
+        if any(m is None for m in memory.values()):
+            print("    memori worker tidak tersedia (butuh /proc/<pid>/smaps_rollup)")
+            continue
+        for pid, m in memory.items():
+            print(f"    pid {pid}: RSS {m['rss_mb']:.0f} MB, PSS {m['pss_mb']:.0f} MB, "
+                  f"anonim {m['anonymous_mb']:.0f} MB, PSS file {m['pss_file_mb']:.0f} MB")
+        print(f"    total PSS {sum(m['pss_mb'] for m in memory.values()):.0f} MB, "
+              f"total RSS {sum(m['rss_mb'] for m in memory.values()):.0f} MB")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark throughput ProcessInferencePool")
+    parser.add_argument('--model_dir', type=str, default=None,
+                        help='Direktori aset model; default memakai aset sintetis.')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2])
+    parser.add_argument('--images', type=int, default=16)
+    parser.add_argument('--batch_size', type=int, default=4)
+    parser.add_argument('--inference_mode', type=str, default='numpy', choices=['eager', 'graph', 'numpy'])
+    main(parser.parse_args())
@@ -0,0 +1,185 @@
+"""Cek akurasi dan laporan latensi/memori mode precision float16/int8 dibanding float32.
+
+Setiap precision dijalankan di proses terpisah supaya RSS yang dilaporkan
+hanya milik model tersebut. Caption hasil model terkuantisasi dibandingkan
+dengan caption float32 pada sampel gambar yang sama: persentase caption
+identik, BLEU-4 korpus (caption float32 sebagai referensi) dan cosine
+similarity fitur InceptionV3. Exit code 1 jika di bawah ambang --min_bleu
+atau --min_agreement.
+
+Contoh:
+    python benchmarks/bench_quantization.py --images_dir sample_images --min_bleu 0.9
+"""
+import argparse
+import collections
+import glob
+import json
+import math
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
+
+from synthetic_assets import make_synthetic_assets, make_synthetic_images
+
+
+def _rss_mb():
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1e6
+
+
+def _ngrams(tokens, n):
+    return collections.Counter(tuple(tokens[i:i + n]) for i in range(len(tokens) - n + 1))
+
+
+def corpus_bleu(references, hypotheses, max_n=4):
+    """BLEU-4 korpus dengan satu referensi per hipotesis (smoothing epsilon untuk n-gram kosong)."""
+    matches = [0] * max_n
+    totals = [0] * max_n
+    ref_len = hyp_len = 0
+    for ref, hyp in zip(references, hypotheses):
+        ref, hyp = ref.split(), hyp.split()
+        ref_len += len(ref)
+        hyp_len += len(hyp)
+        for n in range(1, max_n + 1):
+            ref_counts = _ngrams(ref, n)
+            hyp_counts = _ngrams(hyp, n)
+            matches[n - 1] += sum(min(count, ref_counts[gram]) for gram, count in hyp_counts.items())
+            totals[n - 1] += max(len(hyp) - n + 1, 0)
+    if hyp_len == 0:
+        return 1.0 if ref_len == 0 else 0.0
+    log_precision = sum(math.log((m or 0.1) / t) if t else 0.0
+                        for m, t in zip(matches, totals)) / max_n
+    brevity = 1.0 if hyp_len > ref_len else math.exp(1 - ref_len / hyp_len)
+    return brevity * math.exp(log_precision)
+
+
+def run_precision(args):
+    """Proses anak: muat model dengan satu precision, ukur, dan tulis hasil ke --result."""
+    from caption_generator import load_model_assets, extract_image_features, generate_captions_batch, clean_caption
+
+    start = time.perf_counter()
+    rss_before = _rss_mb()
+    encoder, decoder, tokenizer, inception_model, config = load_model_assets(
+        args.model_dir, inference_mode='graph', precision=args.child)
+    load_s = time.perf_counter() - start
+    rss_loaded = _rss_mb()
+
+    images = [open(path, 'rb').read() for path in args.images]
+    batch = images[:args.batch_size]
+    extract_image_features(batch[:1], inception_model)
+    extract_image_features(batch, inception_model)
+
+    def timed(fn, runs):
+        samples = []
+        for _ in range(runs):
+            t = time.perf_counter()
+            fn()
+            samples.append((time.perf_counter() - t) * 1000.0)
+        return {'p50_ms': float(np.percentile(samples, 50)), 'p95_ms': float(np.percentile(samples, 95))}
+
+    latency = {
+        'inception_batch1': timed(lambda: extract_image_features(batch[:1], inception_model), args.runs),
+        f'inception_batch{len(batch)}': timed(lambda: extract_image_features(batch, inception_model), args.runs),
+        'caption_batch1': timed(lambda: generate_captions_batch(
+            batch[:1], inception_model, encoder, decoder, tokenizer, config), args.runs),
+    }
+
+    features, captions = [], []
+    for i in range(0, len(images), args.batch_size):
+        chunk = images[i:i + args.batch_size]
+        features.append(extract_image_features(chunk, inception_model))
+        chunk_captions, _ = generate_captions_batch(chunk, inception_model, encoder, decoder, tokenizer, config)
+        captions.extend(clean_caption(caption) for caption in chunk_captions)
+    np.save(args.result + '.npy', np.concatenate(features))
+
+    with open(args.result, 'w') as f:
+        json.dump({
+            'load_s': load_s,
+            'rss_model_mb': rss_loaded - rss_before,
+            'rss_final_mb': _rss_mb(),
+            'inception_model_mb': getattr(inception_model, 'model_bytes', 0) / 1e6 or None,
+            'latency': latency,
+            'captions': captions,
+        }, f)
+
+
+def main(args):
+    work_dir = tempfile.mkdtemp(prefix='bench_quantization_')
+    model_dir = args.model_dir or make_synthetic_assets(os.path.join(work_dir, 'assets'))
+    if args.images_dir:
+        images = sorted(glob.glob(os.path.join(args.images_dir, '*.jp*g')) +
+                        glob.glob(os.path.join(args.images_dir, '*.png')))[:args.count]
+    else:
+        images = make_synthetic_images(os.path.join(work_dir, 'images'), count=args.count)
+
+    results = {}
+    for precision in ['float32'] + args.precisions:
+        result_path = os.path.join(work_dir, f'{precision}.json')
+        subprocess.run([sys.executable, os.path.abspath(__file__), '--child', precision,
+                        '--model_dir', model_dir, '--result', result_path,
+                        '--batch_size', str(args.batch_size), '--runs', str(args.runs),
+                        '--images', *images], check=True, stdout=subprocess.DEVNULL)
+        with open(result_path) as f:
+            results[precision] = json.load(f)
+        results[precision]['features'] = np.load(result_path + '.npy')
+
+    reference = results['float32']
+    report = {'images': len(images), 'batch_size': args.batch_size, 'precisions': {}}
+    passed = True
+    for precision, result in results.items():
+        entry = {key: result[key] for key in ('load_s', 'rss_model_mb', 'rss_final_mb',
+                                              'inception_model_mb', 'latency')}
+        if precision != 'float32':
+            ref_feat = reference['features'].reshape(len(images), -1)
+            feat = result['features'].reshape(len(images), -1)
+            cosine = np.sum(ref_feat * feat, axis=1) / (
+                np.linalg.norm(ref_feat, axis=1) * np.linalg.norm(feat, axis=1) + 1e-12)
+            agreement = float(np.mean([a == b for a, b in zip(reference['captions'], result['captions'])]))
+            bleu = corpus_bleu(reference['captions'], result['captions'])
+            entry.update({
+                'caption_agreement': agreement,
+                'bleu4_vs_float32': bleu,
+                'feature_cosine_min': float(cosine.min()),
+                'feature_cosine_mean': float(cosine.mean()),
+            })
+            passed = passed and agreement >= args.min_agreement and bleu >= args.min_bleu
+        report['precisions'][precision] = entry
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    if not passed:
+        print(f"GAGAL: agreement/BLEU di bawah ambang (min_agreement={args.min_agreement}, "
+              f"min_bleu={args.min_bleu}).")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Cek akurasi dan latensi mode precision terkuantisasi")
+    parser.add_argument('--model_dir', type=str, default=None,
+                        help='Direktori aset model; default memakai aset sintetis.')
+    parser.add_argument('--images_dir', type=str, default=None,
+                        help='Direktori sampel gambar; default gambar sintetis.')
+    parser.add_argument('--count', type=int, default=16)
+    parser.add_argument('--precisions', nargs='+', default=['float16', 'int8'], choices=['float16', 'int8'])
+    parser.add_argument('--batch_size', type=int, default=4)
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--min_agreement', type=float, default=0.0)
+    parser.add_argument('--min_bleu', type=float, default=0.0)
+    parser.add_argument('--output', type=str, default=None, help='Tulis laporan JSON ke file ini.')
+    # Argumen internal untuk proses anak per precision.
+    parser.add_argument('--child', type=str, default=None, help=argparse.SUPPRESS)
+    parser.add_argument('--result', type=str, default=None, help=argparse.SUPPRESS)
+    parser.add_argument('--images', nargs='*', default=None, help=argparse.SUPPRESS)
+    parsed = parser.parse_args()
+    if parsed.child:
+        run_precision(parsed)
+    else:
+        main(parsed)
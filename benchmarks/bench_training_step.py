@@ -0,0 +1,96 @@
+"""Waktu satu step training: train_step notebook (decoder per token) vs CaptionTrainer.
+
+Ukuran model default sama dengan notebook (embedding 256, units 512, vocab
+5000). Tracing graph dilaporkan terpisah dari step steady-state. Di CPU
+tanpa dukungan float16, 'mixed_float16' diemulasi dan sangat lambat, jadi
+tidak diukur kecuali diminta lewat --precisions.
+
+Contoh:
+    python benchmarks/bench_training_step.py --batch_size 32 --seq_len 21
+    python benchmarks/bench_training_step.py --precisions float32 mixed_bfloat16 mixed_float16
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import tensorflow as tf
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
+
+from caption_generator import build_caption_models
+from training import CaptionTrainer
+
+
+def notebook_train_step_fn(config, batch_size):
+    """Salinan train_step dari rnn_attention.ipynb (decoder dipanggil per token)."""
+    encoder, decoder = build_caption_models(config)
+    optimizer = tf.keras.optimizers.Adam()
+    loss_object = tf.keras.losses.SparseCategoricalCrossentropy(from_logits=True, reduction='none')
+
+    def loss_function(real, pred):
+        mask = tf.cast(tf.math.logical_not(tf.math.equal(real, 0)), tf.float32)
+        return tf.reduce_mean(loss_object(real, pred) * mask)
+
+    @tf.function
+    def train_step(img_tensor, target):
+        loss = 0
+        hidden = decoder.reset_state(batch_size=target.shape[0])
+        dec_input = tf.expand_dims(target[:, 0], 1)
+        with tf.GradientTape() as tape:
+            features = encoder(img_tensor)
+            for i in range(1, target.shape[1]):
+                predictions, hidden, _ = decoder(dec_input, features, hidden)
+                loss += loss_function(target[:, i], predictions)
+                dec_input = tf.expand_dims(target[:, i], 1)
+        variables = encoder.trainable_variables + decoder.trainable_variables
+        optimizer.apply_gradients(zip(tape.gradient(loss, variables), variables))
+        return loss
+
+    return train_step
+
+
+def time_step(step_fn, img_tensor, target, runs):
+    start = time.perf_counter()
+    float(step_fn(img_tensor, target))
+    trace_s = time.perf_counter() - start
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        float(step_fn(img_tensor, target))
+        samples.append(time.perf_counter() - start)
+    step_ms = 1000.0 * float(np.median(samples))
+    return {'first_step_s': trace_s, 'step_ms_p50': step_ms,
+            'samples_per_s': img_tensor.shape[0] / (step_ms / 1000.0)}
+
+
+def main(args):
+    config = {'embedding_dim': args.embedding_dim, 'units': args.units, 'vocab_size': args.vocab_size,
+              'max_length': args.seq_len, 'features_shape': 2048, 'attention_features_shape': 64}
+    rng = np.random.default_rng(0)
+    img_tensor = tf.constant(rng.random((args.batch_size, 64, 2048), dtype=np.float32))
+    target = np.asarray(rng.integers(3, args.vocab_size, (args.batch_size, args.seq_len)), dtype=np.int32)
+    target[:, 0] = 2
+    target = tf.constant(target)
+
+    report = {'batch_size': args.batch_size, 'seq_len': args.seq_len, 'cpu_count': os.cpu_count(),
+              'notebook_float32': time_step(notebook_train_step_fn(config, args.batch_size),
+                                            img_tensor, target, args.runs)}
+    for precision in args.precisions:
+        trainer = CaptionTrainer(config, precision=precision)
+        report[f'trainer_{precision}'] = time_step(trainer._train_step, img_tensor, target, args.runs)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark step training notebook vs CaptionTrainer")
+    parser.add_argument('--batch_size', type=int, default=32)
+    parser.add_argument('--seq_len', type=int, default=21)
+    parser.add_argument('--vocab_size', type=int, default=5000)
+    parser.add_argument('--embedding_dim', type=int, default=256)
+    parser.add_argument('--units', type=int, default=512)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--precisions', nargs='+', default=['float32', 'mixed_bfloat16'])
+    main(parser.parse_args())
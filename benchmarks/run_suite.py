@@ -0,0 +1,410 @@
+"""Suite benchmark offline (CPU) untuk layanan caption dan story, hasil dalam satu file JSON.
+
+Yang diukur, semuanya dengan aset sintetis (bobot acak) dan stub Ollama lokal:
+  - cold_start : load_model_assets di proses Python baru (import TF + muat + trace graph)
+  - caption    : latensi generate_caption satu gambar dan generate_captions_batch (p50/p95/p99)
+  - split      : waktu preprocessing vs InceptionV3 vs decoder per batch
+  - http       : throughput dan latensi app-backend.py dan api.py di bawah beban konkuren
+  - peak RSS   : proses benchmark, proses cold start dan setiap server
+
+Contoh:
+    python benchmarks/run_suite.py --output bench-results/$(git rev-parse --short HEAD).json
+    python benchmarks/run_suite.py --skip http --runs 10
+    python benchmarks/run_suite.py --compare bench-results/lama.json bench-results/baru.json
+
+Mode --compare mencetak rasio baru/lama untuk setiap metrik dan keluar
+dengan kode 1 jika ada metrik yang memburuk lebih dari --threshold.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BACKEND_DIR = os.path.join(ROOT_DIR, 'backend')
+sys.path.insert(0, BACKEND_DIR)
+
+SECTIONS = ('cold_start', 'caption', 'split', 'http')
+
+
+def percentiles(samples_ms):
+    samples = np.asarray(samples_ms, dtype=np.float64)
+    return {
+        'p50_ms': float(np.percentile(samples, 50)),
+        'p95_ms': float(np.percentile(samples, 95)),
+        'p99_ms': float(np.percentile(samples, 99)),
+        'mean_ms': float(samples.mean()),
+        'n': int(samples.size),
+    }
+
+
+def peak_rss_mb(children=False):
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF)
+    # ru_maxrss dalam KiB di Linux, byte di macOS.
+    return usage.ru_maxrss / (1024.0 * 1024.0 if sys.platform == 'darwin' else 1024.0)
+
+
+def process_peak_rss_mb(pid):
+    """VmHWM proses lain dari /proc (Linux); None jika tidak tersedia."""
+    try:
+        with open(f'/proc/{pid}/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        return None
+    return None
+
+
+def bench_cold_start(model_dir, args):
+    from bench_cold_start import run_child
+
+    runs = [run_child('assets', model_dir, args.inference_mode) for _ in range(args.cold_runs)]
+    keys = sorted({key for run in runs for key in run})
+    return {
+        'runs': args.cold_runs,
+        'median_s': {key: float(np.median([run[key] for run in runs if key in run])) for key in keys},
+        'peak_rss_mb': peak_rss_mb(children=True),
+    }
+
+
+def bench_caption(assets, images, args):
+    from caption_generator import generate_caption, generate_captions_batch
+
+    encoder, decoder, tokenizer, inception_model, config = assets
+    batch = images[:args.batch_size]
+    generate_captions_batch(batch, inception_model, encoder, decoder, tokenizer, config)
+
+    single = []
+    for i in range(args.runs):
+        start = time.perf_counter()
+        generate_caption(images[i % len(images)], inception_model, encoder, decoder, tokenizer, config)
+        single.append((time.perf_counter() - start) * 1000.0)
+
+    batched = []
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        generate_captions_batch(batch, inception_model, encoder, decoder, tokenizer, config)
+        batched.append((time.perf_counter() - start) * 1000.0)
+    batched_stats = percentiles(batched)
+    batched_stats['batch_size'] = len(batch)
+    batched_stats['images_per_s'] = len(batch) / (batched_stats['p50_ms'] / 1000.0)
+
+    beam = []
+    for i in range(max(1, args.runs // 2)):
+        start = time.perf_counter()
+        generate_caption(images[i % len(images)], inception_model, encoder, decoder, tokenizer, config,
+                         beam_width=args.beam_width)
+        beam.append((time.perf_counter() - start) * 1000.0)
+    beam_stats = percentiles(beam)
+    beam_stats['beam_width'] = args.beam_width
+    return {'single': percentiles(single), 'batched': batched_stats, 'single_beam': beam_stats}
+
+
+def bench_split(assets, images, args):
+    """Memisahkan waktu satu batch menjadi preprocessing, InceptionV3 dan decoder (greedy)."""
+    import tensorflow as tf
+    from caption_generator import _preprocess_input, features_from_preprocessed, generate_captions_from_features
+
+    encoder, decoder, tokenizer, inception_model, config = assets
+    batch = images[:args.batch_size]
+    result = {}
+    for size, paths in (('single', batch[:1]), ('batched', batch)):
+        phases = {'preprocess': [], 'inception': [], 'decoder': []}
+        for run in range(args.runs + 1):
+            started = time.perf_counter()
+            pixels = tf.stack([_preprocess_input(path) for path in paths])
+            preprocessed = time.perf_counter()
+            features = features_from_preprocessed(pixels, inception_model)
+            extracted = time.perf_counter()
+            generate_captions_from_features(features, encoder, decoder, tokenizer, config)
+            decoded = time.perf_counter()
+            if run == 0:
+                continue  # pemanasan
+            phases['preprocess'].append((preprocessed - started) * 1000.0)
+            phases['inception'].append((extracted - preprocessed) * 1000.0)
+            phases['decoder'].append((decoded - extracted) * 1000.0)
+        stats = {name: percentiles(samples) for name, samples in phases.items()}
+        total = sum(stats[name]['p50_ms'] for name in phases)
+        stats['inception_share'] = stats['inception']['p50_ms'] / total
+        stats['decoder_share'] = stats['decoder']['p50_ms'] / total
+        stats['batch_size'] = len(paths)
+        result[size] = stats
+    return result
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(app_spec, port, env, log_path):
+    """Menjalankan `uvicorn <app_spec>` dari direktori backend di proses terpisah."""
+    log = open(log_path, 'w')
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', app_spec, '--host', '127.0.0.1', '--port', str(port),
+         '--app-dir', BACKEND_DIR, '--log-level', 'warning'],
+        cwd=ROOT_DIR, env=dict(os.environ, **env), stdout=log, stderr=subprocess.STDOUT)
+    process.log_file = log
+    return process
+
+
+def stop_server(process):
+    peak = process_peak_rss_mb(process.pid)
+    process.terminate()
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+    process.log_file.close()
+    return peak
+
+
+async def wait_ready(client, url, process, timeout):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server berhenti saat startup (kode {process.returncode}), lihat {process.log_file.name}")
+        try:
+            if (await client.get(url)).status_code == 200:
+                return
+        except Exception:
+            pass
+        await asyncio.sleep(0.2)
+    raise TimeoutError(f"{url} belum siap setelah {timeout} detik, lihat {process.log_file.name}")
+
+
+async def load_test(client, make_request, total, concurrency):
+    """`total` request dengan paling banyak `concurrency` berjalan bersamaan."""
+    latencies, errors = [], {}
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i):
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                response = await make_request(client, i)
+                ok = response.status_code == 200
+                status = response.status_code
+            except Exception as e:
+                ok, status = False, type(e).__name__
+            if ok:
+                latencies.append((time.perf_counter() - start) * 1000.0)
+            else:
+                errors[str(status)] = errors.get(str(status), 0) + 1
+
+    await make_request(client, -1)
+    start = time.perf_counter()
+    await asyncio.gather(*[one(i) for i in range(total)])
+    elapsed = time.perf_counter() - start
+    stats = percentiles(latencies) if latencies else {'n': 0}
+    stats.update({'requests': total, 'concurrency': concurrency, 'errors': errors,
+                  'requests_per_s': len(latencies) / elapsed})
+    return stats
+
+
+async def run_http(bundle_dir, images, args, work_dir):
+    import httpx
+    from bench_http_pool import start_stub_ollama
+
+    stub_port, api_port, backend_port = _free_port(), _free_port(), _free_port()
+    stub = start_stub_ollama(stub_port, args.llm_delay_ms)
+    api = start_server('api:app', api_port, {
+        'OLLAMA_API_URL': f'http://127.0.0.1:{stub_port}',
+        'STORY_CACHE_TTL': '0',  # ukur generasi, bukan hit cache
+    }, os.path.join(work_dir, 'api.log'))
+    backend = start_server('app-backend:app', backend_port, {
+        'CAPTION_BUNDLE_DIR': bundle_dir,
+        'CAPTION_CACHE_MAX_MB': '0',  # setiap request benar-benar menjalankan model
+        'CAPTION_INFERENCE_MODE': args.inference_mode,
+        'STORY_GENERATOR_API_URL': f'http://127.0.0.1:{api_port}/generate-story/',
+        'STORY_GENERATOR_STREAM_URL': f'http://127.0.0.1:{api_port}/generate-story/stream/',
+    }, os.path.join(work_dir, 'app-backend.log'))
+
+    image_bytes = []
+    for path in images:
+        with open(path, 'rb') as f:
+            image_bytes.append(f.read())
+
+    def captions_for(i):
+        # Caption berbeda per request supaya cache story di api.py tidak berperan.
+        return [f'a dog runs on the grass {i}', f'a cat sleeps on a sofa {i}']
+
+    async def caption_request(client, i):
+        return await client.post(f'http://127.0.0.1:{backend_port}/generate-caption/',
+                                 files={'image': (f'{i}.jpg', image_bytes[i % len(image_bytes)], 'image/jpeg')})
+
+    async def story_request(client, i):
+        return await client.post(f'http://127.0.0.1:{api_port}/generate-story/', json={'captions': captions_for(i)})
+
+    async def story_via_backend_request(client, i):
+        return await client.post(f'http://127.0.0.1:{backend_port}/generate-story-from-captions/',
+                                 json={'captions': captions_for(i)})
+
+    report = {}
+    try:
+        limits = httpx.Limits(max_connections=args.concurrency * 2)
+        async with httpx.AsyncClient(timeout=300.0, limits=limits) as client:
+            started = time.perf_counter()
+            await wait_ready(client, f'http://127.0.0.1:{api_port}/', api, args.startup_timeout)
+            await wait_ready(client, f'http://127.0.0.1:{backend_port}/readyz', backend, args.startup_timeout)
+            report['servers_ready_s'] = time.perf_counter() - started
+            report['app_backend_generate_caption'] = await load_test(
+                client, caption_request, args.http_requests, args.concurrency)
+            report['api_generate_story'] = await load_test(
+                client, story_request, args.http_requests * 4, args.concurrency)
+            report['app_backend_generate_story'] = await load_test(
+                client, story_via_backend_request, args.http_requests * 4, args.concurrency)
+    finally:
+        report['api_peak_rss_mb'] = stop_server(api)
+        report['app_backend_peak_rss_mb'] = stop_server(backend)
+        stub.should_exit = True
+    report['llm_stub_delay_ms'] = args.llm_delay_ms
+    return report
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(args):
+    import tensorflow as tf
+    from synthetic_assets import make_synthetic_assets, make_synthetic_images
+    from caption_generator import load_model_assets
+    from inference_bundle import export_inference_bundle
+
+    work_dir = tempfile.mkdtemp(prefix='bench_suite_')
+    model_dir = args.model_dir or make_synthetic_assets(
+        os.path.join(work_dir, 'assets'), vocab_size=args.vocab_size, units=args.units)
+    images = make_synthetic_images(os.path.join(work_dir, 'images'), count=max(args.batch_size, 16))
+    sections = [section for section in SECTIONS if section not in args.skip]
+
+    results = {
+        'meta': {
+            'commit': _git_commit(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'python': platform.python_version(),
+            'tensorflow': tf.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'synthetic_assets': args.model_dir is None,
+            'config': {key: value for key, value in vars(args).items() if key != 'compare'},
+        },
+    }
+    if 'cold_start' in sections:
+        print("== cold start", flush=True)
+        results['cold_start'] = bench_cold_start(model_dir, args)
+
+    assets = load_model_assets(model_dir, inference_mode=args.inference_mode)
+    if 'caption' in sections:
+        print("== latensi caption", flush=True)
+        results['caption'] = bench_caption(assets, images, args)
+    if 'split' in sections:
+        print("== split Inception vs decoder", flush=True)
+        results['split'] = bench_split(assets, images, args)
+    results['bench_process_peak_rss_mb'] = peak_rss_mb()
+
+    if 'http' in sections:
+        print("== HTTP app-backend + api", flush=True)
+        # Bundle diekspor dari model eager (versi graph membungkus InceptionV3 sebagai tf.function).
+        bundle_dir = os.path.join(work_dir, 'bundle')
+        encoder, decoder, tokenizer, inception_model, config = load_model_assets(model_dir)
+        export_inference_bundle(bundle_dir, inception_model, encoder, decoder, tokenizer, config)
+        results['http'] = asyncio.run(run_http(bundle_dir, images, args, work_dir))
+    results['meta']['work_dir'] = work_dir
+    return results
+
+
+def _flatten(tree, prefix=''):
+    flat = {}
+    for key, value in tree.items():
+        name = f'{prefix}{key}'
+        if isinstance(value, dict):
+            flat.update(_flatten(value, name + '.'))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = float(value)
+    return flat
+
+
+def _direction(name):
+    """+1 jika lebih besar lebih baik, -1 jika lebih kecil lebih baik, 0 jika bukan metrik kinerja."""
+    leaf = name.rsplit('.', 1)[-1]
+    if leaf.endswith('_per_s'):
+        return 1
+    if leaf.endswith(('_ms', '_s', '_mb')) or name.startswith('cold_start.median_s.'):
+        return -1
+    return 0
+
+
+def compare(old_path, new_path, threshold):
+    with open(old_path, 'r') as f:
+        old = json.load(f)
+    with open(new_path, 'r') as f:
+        new = json.load(f)
+    old_flat, new_flat = _flatten(old), _flatten(new)
+    regressions = 0
+    print(f"lama: {old['meta'].get('commit')}  baru: {new['meta'].get('commit')}")
+    for name in sorted(set(old_flat) & set(new_flat)):
+        direction = _direction(name)
+        if name.startswith('meta.') or direction == 0 or old_flat[name] == 0:
+            continue
+        ratio = new_flat[name] / old_flat[name]
+        worse = ratio < 1 - threshold if direction > 0 else ratio > 1 + threshold
+        regressions += worse
+        print(f"{'REGRESI ' if worse else '        '}{name}: {old_flat[name]:.3f} -> {new_flat[name]:.3f} "
+              f"({ratio:.2f}x)")
+    print(f"{regressions} metrik memburuk lebih dari {threshold:.0%}.")
+    return 1 if regressions else 0
+
+
+def main(args):
+    if args.compare:
+        return compare(args.compare[0], args.compare[1], args.threshold)
+    results = run_suite(args)
+    text = json.dumps(results, indent=2)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+        print(f"Hasil ditulis ke {args.output}")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Suite benchmark offline layanan caption dan story")
+    parser.add_argument('--output', type=str, default=None, help='File JSON hasil; default dicetak ke stdout.')
+    parser.add_argument('--compare', nargs=2, metavar=('LAMA', 'BARU'), default=None,
+                        help='Bandingkan dua file hasil alih-alih menjalankan benchmark.')
+    parser.add_argument('--threshold', type=float, default=0.10, help='Batas regresi relatif untuk --compare.')
+    parser.add_argument('--skip', nargs='*', default=[], choices=SECTIONS)
+    parser.add_argument('--model_dir', type=str, default=None,
+                        help='Aset model asli; default aset sintetis berbobot acak.')
+    parser.add_argument('--vocab_size', type=int, default=5000)
+    parser.add_argument('--units', type=int, default=512)
+    parser.add_argument('--inference_mode', type=str, default='graph', choices=['eager', 'graph'])
+    parser.add_argument('--runs', type=int, default=20)
+    parser.add_argument('--cold_runs', type=int, default=2)
+    parser.add_argument('--batch_size', type=int, default=8)
+    parser.add_argument('--beam_width', type=int, default=3)
+    parser.add_argument('--http_requests', type=int, default=32, help='Request caption; story memakai 4x lipat.')
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--llm_delay_ms', type=float, default=50.0, help='Waktu "generasi" stub Ollama.')
+    parser.add_argument('--startup_timeout', type=float, default=300.0)
+    raise SystemExit(main(parser.parse_args()))
@@ -0,0 +1,78 @@
+"""Membuat aset model sintetis (bobot acak, ukuran kecil) untuk benchmark offline.
+
+Struktur direktori yang dihasilkan sama dengan `image_captioning_model_assets`
+sehingga bisa langsung dimuat oleh `load_model_assets`.
+"""
+import json
+import os
+import pickle
+import sys
+import types
+
+import numpy as np
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend')
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+import tensorflow as tf  # noqa: E402
+from caption_generator import CNN_Encoder, RNN_Decoder  # noqa: E402
+
+
+def make_synthetic_assets(model_dir, vocab_size=5000, max_length=30, embedding_dim=256,
+                          units=512, seed=0):
+    """Menulis config, tokenizer, Inception pengganti dan bobot encoder/decoder acak."""
+    os.makedirs(model_dir, exist_ok=True)
+    tf.random.set_seed(seed)
+
+    words = ['<unk>', '<start>', '<end>'] + [f'word{i}' for i in range(vocab_size - 4)]
+    word_index = {word: i + 1 for i, word in enumerate(words)}
+    tokenizer = types.SimpleNamespace(
+        word_index=word_index,
+        index_word={i: word for word, i in word_index.items()})
+
+    config = {
+        'embedding_dim': embedding_dim,
+        'units': units,
+        'vocab_size': vocab_size,
+        'max_length': max_length,
+        'features_shape': 2048,
+        'attention_features_shape': 64,
+    }
+    with open(os.path.join(model_dir, 'model_config.json'), 'w') as f:
+        json.dump(config, f)
+    with open(os.path.join(model_dir, 'tokenizer.pickle'), 'wb') as handle:
+        pickle.dump(tokenizer, handle)
+
+    inception_path = os.path.join(model_dir, 'inception_feature_extractor.keras')
+    if not os.path.exists(inception_path):
+        tf.keras.applications.InceptionV3(include_top=False, weights=None).save(inception_path)
+
+    encoder = CNN_Encoder(embedding_dim)
+    decoder = RNN_Decoder(embedding_dim, units, vocab_size)
+    features = encoder(tf.random.uniform([1, 64, 2048]), training=False)
+    decoder(tf.zeros([1, 1], dtype=tf.int32), features, decoder.reset_state(batch_size=1))
+    encoder.save_weights(os.path.join(model_dir, 'cnn_encoder.weights.h5'))
+    decoder.save_weights(os.path.join(model_dir, 'rnn_decoder.weights.h5'))
+    return model_dir
+
+
+def make_synthetic_images(out_dir, count=8, size=(480, 640), seed=0):
+    """Menulis `count` gambar JPEG acak dan mengembalikan path-nya."""
+    from PIL import Image
+
+    os.makedirs(out_dir, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    paths = []
+    for i in range(count):
+        pixels = rng.integers(0, 256, size=(size[0], size[1], 3), dtype=np.uint8)
+        path = os.path.join(out_dir, f'synthetic_{i}.jpg')
+        Image.fromarray(pixels).save(path, quality=90)
+        paths.append(path)
+    return paths
+
+
+if __name__ == '__main__':
+    target = sys.argv[1] if len(sys.argv) > 1 else 'synthetic_model_assets'
+    make_synthetic_assets(target)
+    print(f"Aset sintetis ditulis ke {target}")
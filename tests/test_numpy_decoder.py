@@ -0,0 +1,109 @@
+"""Paritas runtime NumPy (numpy_decoder) dengan CNN_Encoder/RNN_Decoder Keras.
+
+Memakai aset sintetis berbobot acak (benchmarks/synthetic_assets.py) dengan
+ukuran kecil. Jalankan dari root repo:
+    python -m pytest -q tests
+"""
+import os
+import sys
+
+import numpy as np
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT_DIR, 'backend'))
+sys.path.insert(0, os.path.join(ROOT_DIR, 'benchmarks'))
+
+tf = pytest.importorskip('tensorflow')
+
+from synthetic_assets import make_synthetic_assets  # noqa: E402
+from caption_generator import generate_captions_from_features, load_model_assets  # noqa: E402
+from inference_bundle import export_inference_bundle, load_inference_bundle  # noqa: E402
+from numpy_decoder import NumpyCNNEncoder, NumpyRNNDecoder  # noqa: E402
+
+TOLERANCE = 1e-4
+
+
+@pytest.fixture(scope='module')
+def model_dir(tmp_path_factory):
+    return make_synthetic_assets(str(tmp_path_factory.mktemp('assets')), vocab_size=300, max_length=8,
+                                 embedding_dim=32, units=64)
+
+
+@pytest.fixture(scope='module')
+def assets(model_dir):
+    return load_model_assets(model_dir)
+
+
+def numpy_models(model_dir, stateful_gru=False):
+    return (NumpyCNNEncoder.from_h5(os.path.join(model_dir, 'cnn_encoder.weights.h5')),
+            NumpyRNNDecoder.from_h5(os.path.join(model_dir, 'rnn_decoder.weights.h5'), stateful_gru=stateful_gru))
+
+
+def step_inputs(decoder, np_decoder, batch_size=4):
+    rng = np.random.default_rng(0)
+    img_features = rng.random((batch_size, 64, 2048), dtype=np.float32)
+    hidden = rng.normal(size=(batch_size, decoder.units)).astype(np.float32)
+    token_ids = rng.integers(0, np_decoder.vocab_size, batch_size)
+    return img_features, hidden, token_ids
+
+
+def test_step_parity(model_dir, assets):
+    encoder, decoder = assets[0], assets[1]
+    np_encoder, np_decoder = numpy_models(model_dir)
+    img_features, hidden, token_ids = step_inputs(decoder, np_decoder)
+
+    features = encoder(img_features).numpy()
+    np_features = np_encoder(img_features)
+    logits, new_hidden, attention = decoder(tf.constant(token_ids[:, None]), features, hidden)
+    np_logits, np_hidden, np_attention = np_decoder.step(
+        token_ids, np_features, hidden, np_decoder.precompute_attention_keys(np_features))
+
+    np.testing.assert_allclose(np_features, features, atol=TOLERANCE)
+    np.testing.assert_allclose(np_logits, logits.numpy(), atol=TOLERANCE)
+    np.testing.assert_allclose(np_hidden, new_hidden.numpy(), atol=TOLERANCE)
+    np.testing.assert_allclose(np_attention, attention.numpy()[:, :, 0], atol=TOLERANCE)
+
+
+def test_stateful_gru_matches_keras_initial_state(model_dir, assets):
+    """Sel GRU stateful = GRU Keras yang diberi initial_state, pada input GRU yang sama dengan RNN_Decoder."""
+    decoder = assets[1]
+    np_encoder, np_decoder = numpy_models(model_dir, stateful_gru=True)
+    img_features, hidden, token_ids = step_inputs(decoder, np_decoder)
+
+    np_features = np_encoder(img_features)
+    _, np_hidden, np_attention = np_decoder.step(
+        token_ids, np_features, hidden, np_decoder.precompute_attention_keys(np_features))
+
+    context_vector = np.matmul(np_attention[:, None, :], np_features)[:, 0]
+    gru_input = np.concatenate([context_vector, np_decoder.embedding[token_ids]], axis=-1)[:, None, :]
+    _, keras_state = decoder.gru(gru_input, initial_state=hidden)
+    np.testing.assert_allclose(np_hidden, keras_state.numpy(), atol=TOLERANCE)
+
+
+@pytest.mark.parametrize('beam_width', [1, 3])
+def test_caption_parity(model_dir, assets, beam_width):
+    encoder, decoder, tokenizer, _, config = assets
+    np_encoder, np_decoder = numpy_models(model_dir)
+    img_features = np.random.default_rng(1).random((4, 64, 2048), dtype=np.float32)
+
+    keras_captions, _ = generate_captions_from_features(
+        img_features, encoder, decoder, tokenizer, config, beam_width=beam_width)
+    np_captions, _ = generate_captions_from_features(
+        img_features, np_encoder, np_decoder, tokenizer, config, beam_width=beam_width)
+    assert np_captions == keras_captions
+
+
+def test_stateful_gru_reaches_serving_loaders(model_dir, assets, tmp_path):
+    _, decoder, _, _, _ = load_model_assets(model_dir, inference_mode='numpy', stateful_gru=True)
+    assert isinstance(decoder, NumpyRNNDecoder) and decoder.stateful_gru
+
+    encoder, keras_decoder, tokenizer, inception_model, config = assets
+    bundle_dir = export_inference_bundle(str(tmp_path / 'bundle'), inception_model, encoder, keras_decoder,
+                                         tokenizer, config)
+    for share_weights in (False, True):
+        _, bundle_decoder, _, _, _ = load_inference_bundle(
+            bundle_dir, inference_mode='numpy', share_weights=share_weights, stateful_gru=True)
+        assert bundle_decoder.stateful_gru
+        # token_gates dibaca dari bundle, harus sama dengan hasil precompute dari bobot.
+        np.testing.assert_allclose(bundle_decoder.token_gates, decoder.token_gates, atol=TOLERANCE)